@@ -1,18 +1,60 @@
 """Memory decay filter using ACT-R model (ai-now pattern)."""
+import heapq
 import math
-from datetime import datetime, timedelta
+import sys
+import time
+from array import array
+from operator import itemgetter
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import json
 
+try:
+    import numpy as np
+except ImportError:  # optional accelerator
+    np = None
 
-@dataclass
+# dataclass(slots=True) needs Python 3.10+; plain dataclass otherwise
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+_NAN = float("nan")
+
+
+def _epoch(ts: datetime) -> float:
+    """POSIX seconds for a naive-UTC (or aware) datetime."""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def _from_epoch(seconds: float) -> datetime:
+    """Naive-UTC datetime for POSIX seconds (inverse of _epoch)."""
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+
+
+def _relevance(ts_epoch: float, access_count: int, now_epoch: float,
+               decay_rate: float) -> float:
+    """Scalar ACT-R score; see MemoryEntry.relevance_at."""
+    base_relevance = math.exp(-decay_rate * (now_epoch - ts_epoch) / 86400.0)
+    if access_count > 0:
+        boost = math.log(access_count + 1) / 5.0
+        return min(base_relevance * (1 + boost), 1.0)
+    return base_relevance
+
+
+@dataclass(**_SLOTS)
 class MemoryEntry:
     """A memory with decay tracking."""
     content: str
     timestamp: datetime
     access_count: int = 0
     last_access: Optional[datetime] = None
+    ts_epoch: float = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        self.ts_epoch = _epoch(self.timestamp)
     
     def relevance_score(self, current_time: Optional[datetime] = None,
                         half_life_days: float = 30.0) -> float:
@@ -23,18 +65,18 @@ class MemoryEntry:
         Boosted by access frequency.
         """
         now = current_time or datetime.utcnow()
-        age_days = (now - self.timestamp).total_seconds() / 86400
-        
-        # Base decay: exponential
-        decay_rate = math.log(2) / half_life_days
-        base_relevance = math.exp(-decay_rate * age_days)
-        
-        # Access frequency boost: power law
-        if self.access_count > 0:
-            boost = math.log(self.access_count + 1) / 5.0
-            return min(base_relevance * (1 + boost), 1.0)
+        return self.relevance_at(_epoch(now), math.log(2) / half_life_days)
+    
+    def relevance_at(self, now_epoch: float, decay_rate: float) -> float:
+        """
+        relevance_score for callers scoring many entries at one instant.
         
-        return base_relevance
+        Args:
+            now_epoch: Current time as POSIX seconds (sampled once by caller)
+            decay_rate: Precomputed log(2) / half_life_days
+        """
+        # Base decay: exponential; access frequency boost: power law
+        return _relevance(self.ts_epoch, self.access_count, now_epoch, decay_rate)
 
 
 class MemoryDecayFilter:
@@ -45,32 +87,130 @@ class MemoryDecayFilter:
     - 30-day half-life for base memories
     - Access frequency boosts relevance
     - Below threshold = checkpoint/shed
+    
+    Memories are stored column-wise (one list/array per field, row ``i`` of
+    each belongs to ``_ids[i]``) so scoring is a single sweep over compact
+    arrays rather than a walk over per-memory objects.
     """
     
     def __init__(self, half_life_days: float = 30.0, 
                  relevance_threshold: float = 0.3):
         self.half_life_days = half_life_days
         self.threshold = relevance_threshold
-        self._memories: Dict[str, MemoryEntry] = {}
+        
+        self._ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._content: List[str] = []
+        self._timestamps: List[datetime] = []
+        # Numeric columns: NumPy arrays with spare capacity (len(_ids) rows
+        # in use) when available, else array.array grown by append.
+        # _last_access holds POSIX seconds, NaN for never accessed.
+        if np is not None:
+            self._ts = np.empty(64, dtype=np.float64)
+            self._access = np.empty(64, dtype=np.int32)
+            self._last_access = np.empty(64, dtype=np.float64)
+        else:
+            self._ts = array("d")
+            self._access = array("l")
+            self._last_access = array("d")
+    
+    @property
+    def half_life_days(self) -> float:
+        return self._half_life_days
+    
+    @half_life_days.setter
+    def half_life_days(self, value: float):
+        self._half_life_days = value
+        self._decay_rate = math.log(2) / value
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self._index
+    
+    def _store(self, memory_id: str, content: str, timestamp: datetime,
+               access_count: int = 0, last_access: Optional[datetime] = None):
+        """Insert/replace a memory row."""
+        i = self._index.get(memory_id)
+        if i is None:
+            i = len(self._ids)
+            self._ids.append(memory_id)
+            self._content.append(content)
+            self._timestamps.append(timestamp)
+            self._index[memory_id] = i
+            if np is None:
+                self._ts.append(0.0)
+                self._access.append(0)
+                self._last_access.append(_NAN)
+            elif i == len(self._ts):
+                # Grow geometrically so appends stay amortized O(1)
+                cap = 2 * i
+                self._ts = np.resize(self._ts, cap)
+                self._access = np.resize(self._access, cap)
+                self._last_access = np.resize(self._last_access, cap)
+        else:
+            self._content[i] = content
+            self._timestamps[i] = timestamp
+        self._ts[i] = _epoch(timestamp)
+        self._access[i] = access_count
+        self._last_access[i] = _epoch(last_access) if last_access else _NAN
     
     def add(self, memory_id: str, content: str, 
             timestamp: Optional[datetime] = None):
         """Add memory with initial score."""
-        self._memories[memory_id] = MemoryEntry(
-            content=content,
-            timestamp=timestamp or datetime.utcnow(),
-            access_count=0
-        )
+        self._store(memory_id, content, timestamp or datetime.utcnow())
     
     def access(self, memory_id: str) -> Optional[str]:
         """Access memory and boost its score."""
-        if memory_id not in self._memories:
+        i = self._index.get(memory_id)
+        if i is None:
             return None
         
-        entry = self._memories[memory_id]
-        entry.access_count += 1
-        entry.last_access = datetime.utcnow()
-        return entry.content
+        self._access[i] += 1
+        self._last_access[i] = time.time()
+        return self._content[i]
+    
+    def remove(self, memory_id: str) -> bool:
+        """Drop a memory (e.g. after shedding); O(1) swap-remove."""
+        i = self._index.pop(memory_id, None)
+        if i is None:
+            return False
+        
+        last = len(self._ids) - 1
+        columns = (self._ids, self._content, self._timestamps)
+        numeric = (self._ts, self._access, self._last_access)
+        if i != last:
+            for col in columns + numeric:
+                col[i] = col[last]
+            self._index[self._ids[i]] = i
+        for col in columns:
+            col.pop()
+        if np is None:
+            for col in numeric:
+                col.pop()
+        return True
+    
+    def entry(self, memory_id: str) -> Optional[MemoryEntry]:
+        """Snapshot of one memory as a MemoryEntry."""
+        i = self._index.get(memory_id)
+        if i is None:
+            return None
+        last = self._last_access[i]
+        return MemoryEntry(
+            content=self._content[i],
+            timestamp=self._timestamps[i],
+            access_count=int(self._access[i]),
+            last_access=None if last != last else _from_epoch(last)
+        )
+    
+    def _scores(self, now_epoch: float) -> List[float]:
+        """Relevance score per row, in row order."""
+        if np is not None:
+            return self._score_vector(now_epoch).tolist()
+        decay_rate = self._decay_rate
+        return [_relevance(ts, count, now_epoch, decay_rate)
+                for ts, count in zip(self._ts, self._access)]
     
     def filter_by_relevance(self, current_time: Optional[datetime] = None) -> Tuple[List[str], List[str]]:
         """
@@ -78,41 +218,93 @@ class MemoryDecayFilter:
         
         Returns: (ids_to_keep, ids_to_checkpoint_or_shed)
         """
-        now = current_time or datetime.utcnow()
+        now_epoch = _epoch(current_time) if current_time else time.time()
+        if np is not None:
+            return self._filter_vectorized(now_epoch)
+        
         keep = []
         shed = []
-        
-        for memory_id, entry in self._memories.items():
-            score = entry.relevance_score(now, self.half_life_days)
-            if score >= self.threshold:
+        threshold = self.threshold
+        for memory_id, score in zip(self._ids, self._scores(now_epoch)):
+            if score >= threshold:
                 keep.append(memory_id)
             else:
                 shed.append(memory_id)
         
         return keep, shed
     
-    def get_checkpoint_data(self, memory_id: str) -> Optional[Dict]:
-        """Get serialized memory for checkpointing."""
-        entry = self._memories.get(memory_id)
-        if not entry:
+    def scored(self, current_time: Optional[datetime] = None,
+               limit: Optional[int] = None) -> List[Tuple[float, str, str]]:
+        """
+        Score memories above the relevance threshold in a single pass.
+        
+        Returns: [(score, memory_id, content), ...] highest score first.
+        With ``limit``, only the top ``limit`` are selected (heap, O(N log k)).
+        """
+        now_epoch = _epoch(current_time) if current_time else time.time()
+        threshold = self.threshold
+        ids = self._ids
+        content = self._content
+        candidates = [
+            (score, ids[i], content[i])
+            for i, score in enumerate(self._scores(now_epoch))
+            if score >= threshold
+        ]
+        
+        if limit is not None:
+            return heapq.nlargest(limit, candidates, key=itemgetter(0))
+        candidates.sort(key=itemgetter(0), reverse=True)
+        return candidates
+    
+    def _score_vector(self, now_epoch: float):
+        """NumPy relevance scores for all rows, in row order."""
+        n = len(self._ids)
+        age_days = (now_epoch - self._ts[:n]) / 86400.0
+        base = np.exp(-self._decay_rate * age_days)
+        
+        access = self._access[:n]
+        boost = np.log(access + 1.0) / 5.0
+        return np.where(access > 0, np.minimum(base * (1 + boost), 1.0), base)
+    
+    def _filter_vectorized(self, now_epoch: float) -> Tuple[List[str], List[str]]:
+        """NumPy version of filter_by_relevance: one sweep over all entries."""
+        keep_mask = self._score_vector(now_epoch) >= self.threshold
+        ids = self._ids
+        keep = [ids[i] for i in np.flatnonzero(keep_mask)]
+        shed = [ids[i] for i in np.flatnonzero(~keep_mask)]
+        return keep, shed
+    
+    def get_checkpoint_data(self, memory_id: str,
+                            score: Optional[float] = None) -> Optional[Dict]:
+        """
+        Get serialized memory for checkpointing.
+        
+        Pass ``score`` when it is already known (e.g. from scored()) to skip
+        recomputing it.
+        """
+        i = self._index.get(memory_id)
+        if i is None:
             return None
         
-        score = entry.relevance_score(half_life_days=self.half_life_days)
+        if score is None:
+            score = _relevance(self._ts[i], self._access[i], time.time(), self._decay_rate)
+        last = self._last_access[i]
         return {
-            "content": entry.content,
-            "timestamp": entry.timestamp.isoformat(),
-            "access_count": entry.access_count,
-            "last_access": entry.last_access.isoformat() if entry.last_access else None,
-            "relevance_score": score
+            "content": self._content[i],
+            "timestamp": self._timestamps[i].isoformat(),
+            "access_count": int(self._access[i]),
+            "last_access": None if last != last else _from_epoch(last).isoformat(),
+            "relevance_score": float(score)
         }
     
     def post_compression_restore(self, checkpoint_data: List[Dict]):
         """Restore high-value memories after context compression."""
         for data in checkpoint_data:
             memory_id = f"checkpoint_{hash(data['content']) % 10000}"
-            self._memories[memory_id] = MemoryEntry(
-                content=data["content"],
-                timestamp=datetime.fromisoformat(data["timestamp"]),
+            self._store(
+                memory_id,
+                data["content"],
+                datetime.fromisoformat(data["timestamp"]),
                 access_count=data.get("access_count", 0),
                 last_access=datetime.fromisoformat(data["last_access"]) if data.get("last_access") else None
             )
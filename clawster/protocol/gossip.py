@@ -6,20 +6,57 @@ Integrates:
 - ProvenanceTracker: verify capability chains
 """
 import asyncio
+import hashlib
 import json
+import math
 import random
-from datetime import datetime
+import time
+from collections import OrderedDict
 from typing import Dict, List, Set, Any, Optional
 
 from ..schemas.validator import SchemaValidator
 from ..schemas.vector_clock import VectorClock
 from ..memory.decay import MemoryDecayFilter
-from .provenance import ProvenanceTracker
+from .provenance import ProvenanceTracker, _now_iso_cached
+
+try:
+    import orjson
+except ImportError:  # optional accelerator
+    orjson = None
+
+
+def _canonical_bytes(obj: Any) -> bytes:
+    """Canonical (key-sorted, compact) JSON encoding used for digests."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()
+
+
+def _message_digest(message: Dict) -> int:
+    """Stable 64-bit digest of a message's canonical (key-sorted) JSON form."""
+    return int.from_bytes(hashlib.blake2b(_canonical_bytes(message), digest_size=8).digest(), "big")
+
+
+def _payload_digest(obj: Any) -> str:
+    """Compact hex identifier for gossiped content, used for dampening."""
+    return hashlib.blake2b(_canonical_bytes(obj), digest_size=8).hexdigest()
+
+
+def _adaptive_fanout(n: int) -> int:
+    """
+    Peers to push to per round for a mesh of ``n`` known nodes (O(log n)):
+    1.4*ln(n)+9 from 30 nodes up, 2.5*log10(n)+1 below that.
+    """
+    if n >= 30:
+        return int(1.4 * math.log(n) + 9)
+    return max(2, int(2.5 * math.log10(max(n, 2)) + 1))
 
 
 class GossipMessage:
     """Standard gossip message format."""
     
+    __slots__ = ("node_id", "type", "payload", "vector_clock", "timestamp")
+    
     def __init__(self, 
                  node_id: str,
                  message_type: str,  # 'heartbeat', 'state', 'capability', 'alert'
@@ -29,7 +66,7 @@ class GossipMessage:
         self.type = message_type
         self.payload = payload
         self.vector_clock = vector_clock or {node_id: 1}
-        self.timestamp = datetime.utcnow().isoformat()
+        self.timestamp = _now_iso_cached()
     
     def to_dict(self) -> Dict:
         return {
@@ -39,6 +76,12 @@ class GossipMessage:
             "vector_clock": self.vector_clock,
             "timestamp": self.timestamp
         }
+    
+    def to_json(self) -> bytes:
+        """Encode for transport (bytes, ready for a socket or Redis)."""
+        if orjson is not None:
+            return orjson.dumps(self.to_dict())
+        return json.dumps(self.to_dict()).encode()
 
 
 class GossipProtocol:
@@ -47,15 +90,28 @@ class GossipProtocol:
     
     Design choices:
     - Push-based gossip (our node initiates)
-    - Mesh topology (random fanout)
+    - Mesh topology (random fanout; fixed, or logarithmic in mesh size)
     - TTL-based termination
     - Vector clock for causality
+    - Dampening: a memory stops being pushed once peers have gossiped it
+      back to us ``epidemic_rounds`` times
     """
     
-    def __init__(self, node_id: str, fanout: int = 3, ttl: int = 3):
+    def __init__(self, node_id: str, fanout: Optional[int] = 3, ttl: int = 3,
+                 epidemic_rounds: int = 5):
+        """
+        Args:
+            node_id: This node's identifier
+            fanout: Fixed number of peers per round; None adapts it to the
+                number of known nodes each round (see _adaptive_fanout)
+            ttl: Hop limit for propagated messages
+            epidemic_rounds: Times a memory may be heard back from peers
+                before we stop pushing it
+        """
         self.node_id = node_id
         self.fanout = fanout
         self.ttl = ttl
+        self.epidemic_rounds = epidemic_rounds
         
         # Integrations
         self.validator = SchemaValidator()
@@ -63,14 +119,41 @@ class GossipProtocol:
         self.memory_filter = MemoryDecayFilter()
         self.provenance = ProvenanceTracker(node_id)
         
+        # Node-owned envelope fields (node_id, version, vector_clock) are
+        # schema-checked once here; create_gossip then only checks payloads
+        self._envelope_error = self.validator.validate_node_output({
+            "node_id": node_id,
+            "timestamp": _now_iso_cached(),
+            "output_type": "gossip",
+            "payload": {},
+            "version": "0.2.0",
+            "vector_clock": self.vector_clock.to_dict()
+        })[1]
+        
         # Gossip state
         self._known_nodes: Set[str] = set()
-        self._seen_messages: Set[str] = set()
+        # Same members as _known_nodes, kept as a list for O(k) sampling
+        self._known_nodes_list: List[str] = []
+        # Bounded FIFO of message digests (oldest evicted first)
+        self._seen_messages: "OrderedDict[int, None]" = OrderedDict()
+        self._seen_cap = 65536
         self._message_queue: asyncio.Queue = asyncio.Queue()
+        
+        # Remaining epidemic counter per content digest (bounded FIFO)
+        self._epidemic: "OrderedDict[str, int]" = OrderedDict()
+        
+        # Send path: cap in-flight pushes, and time each peer out relative to
+        # its own smoothed round-trip time so one stuck peer cannot hold a
+        # round (or a socket) for the whole interval
+        self._send_sem = asyncio.Semaphore(16)
+        self._peer_rtt: Dict[str, float] = {}
+        self._peer_timeouts: Dict[str, int] = {}
     
     def register_node(self, node_id: str):
         """Add node to gossip mesh."""
-        self._known_nodes.add(node_id)
+        if node_id not in self._known_nodes:
+            self._known_nodes.add(node_id)
+            self._known_nodes_list.append(node_id)
     
     def create_gossip(self, message_type: str, payload: Dict) -> Optional[GossipMessage]:
         """
@@ -78,18 +161,10 @@ class GossipProtocol:
         
         Returns None if validation fails.
         """
-        # Validate schema
-        temp_msg = {
-            "node_id": self.node_id,
-            "timestamp": datetime.utcnow().isoformat(),
-            "output_type": "gossip",
-            "payload": payload,
-            "version": "0.2.0",
-            "vector_clock": self.vector_clock.to_dict()
-        }
-        
-        is_valid, error = self.validator.validate_node_output(temp_msg)
-        if not is_valid:
+        # Locally built: the envelope was checked at construction, so only
+        # the caller-supplied payload needs checking; full schema validation
+        # is kept for inbound messages
+        if self._envelope_error is not None or not self.validator.validate_outbound(payload):
             return None
         
         # Increment vector clock
@@ -116,30 +191,59 @@ class GossipProtocol:
     
     async def _gossip_round(self, gossip_func):
         """Single gossip round: select targets and push."""
-        if len(self._known_nodes) < self.fanout:
+        # A fixed fanout waits until that many peers are known; the adaptive
+        # fanout only needs one peer
+        if len(self._known_nodes) < (self.fanout or 1):
             return
         
-        # Select random fanout targets
-        targets = random.sample(list(self._known_nodes), self.fanout)
+        # Select random fanout targets: partial Fisher-Yates over the
+        # persistent node list draws k distinct peers without copying it
+        nodes = self._known_nodes_list
+        n = len(nodes)
+        k = self.fanout if self.fanout is not None else _adaptive_fanout(n)
+        targets = []
+        for i in range(min(k, n)):
+            j = random.randrange(i, n)
+            nodes[i], nodes[j] = nodes[j], nodes[i]
+            targets.append(nodes[i])
         
-        # Collect high-relevance messages
-        keep, _ = self.memory_filter.filter_by_relevance()
-        messages = [self.memory_filter.get_checkpoint_data(mid) 
-                   for mid in keep[:5]]  # Top 5
+        # Collect high-relevance messages (top 5, scored in one pass)
+        messages = []
+        for score, mid, content in self.memory_filter.scored(limit=5):
+            if self._track(_payload_digest(content)) <= 0:
+                continue  # dampened: peers already have it
+            messages.append(self.memory_filter.get_checkpoint_data(mid, score))
         
         # Create gossip
         gossip = self.create_gossip("state", {
             "messages": messages,
-            "known_nodes": list(self._known_nodes)
+            "known_nodes": list(self._known_nodes_list)
         })
         
         if not gossip:
             return
         
-        # Push to targets
-        tasks = [gossip_func(target, gossip.to_dict()) for target in targets]
+        # Push to targets; peers that keep timing out queue behind the rest
+        targets.sort(key=lambda t: self._peer_timeouts.get(t, 0))
+        message = gossip.to_dict()
+        tasks = [self._send(gossip_func, target, message) for target in targets]
         await asyncio.gather(*tasks, return_exceptions=True)
     
+    async def _send(self, gossip_func, target: str, message: Dict):
+        """Push one message under the send semaphore with an RTT-based timeout."""
+        async with self._send_sem:
+            rtt = self._peer_rtt.get(target, 1.0)
+            t0 = time.monotonic()
+            try:
+                await asyncio.wait_for(gossip_func(target, message), timeout=max(2 * rtt, 0.5))
+                self._peer_timeouts.pop(target, None)
+            except asyncio.TimeoutError:
+                self._peer_timeouts[target] = self._peer_timeouts.get(target, 0) + 1
+                raise
+            finally:
+                # EWMA of observed send time (a timeout counts at full length)
+                self._peer_rtt[target] = 0.8 * rtt + 0.2 * (time.monotonic() - t0)
+    
     def receive_gossip(self, message: Dict) -> tuple[bool, str]:
         """
         Process received gossip.
@@ -152,39 +256,60 @@ class GossipProtocol:
             return False, f"Invalid: {error}"
         
         # Vector clock check
-        other_vc = message.get("vector_clock", {})
-        result = self.vector_clock.compare(VectorClock(message["node_id"], other_vc))
+        other_vc = VectorClock(message["node_id"], message.get("vector_clock", {}))
+        result = self.vector_clock.compare(other_vc)
         
         if result == "concurrent":
             # Merge clocks
-            self.vector_clock = self.vector_clock.merge(
-                VectorClock(message["node_id"], other_vc)
-            )
+            self.vector_clock = self.vector_clock.merge(other_vc)
         elif result == "before":
             # Stale message
             return False, "Stale (before our state)"
         
         # Deduplicate
-        msg_hash = hash(json.dumps(message, sort_keys=True))
+        msg_hash = _message_digest(message)
         if msg_hash in self._seen_messages:
             return False, "Duplicate"
         
-        self._seen_messages.add(msg_hash)
+        self._seen_messages[msg_hash] = None
+        if len(self._seen_messages) > self._seen_cap:
+            self._seen_messages.popitem(last=False)
         
         # Extract and filter content
         payload = message.get("payload", {})
         for msg_data in payload.get("messages", []):
-            if msg_data and msg_data.get("relevance_score", 0) > 0.5:
-                # High value - add to memory
-                mid = f"gossip_{hash(msg_data['content']) % 10000}"
-                self.memory_filter.add(mid, msg_data["content"])
+            self._ingest(msg_data)
         
         # Update known nodes
         for node in payload.get("known_nodes", []):
-            self._known_nodes.add(node)
+            self.register_node(node)
         
         return True, "Accepted"
     
+    def _ingest(self, msg_data: Optional[Dict]):
+        """Store a gossiped memory if it is high value; dampen known ones."""
+        if not msg_data or "content" not in msg_data:
+            return
+        digest = _payload_digest(msg_data["content"])
+        if digest in self._epidemic:
+            # Heard back: one step closer to no longer pushing it
+            self._epidemic[digest] -= 1
+            return
+        if msg_data.get("relevance_score", 0) > 0.5:
+            # High value - add to memory
+            mid = f"gossip_{hash(msg_data['content']) % 10000}"
+            self.memory_filter.add(mid, msg_data["content"])
+            self._track(digest)
+    
+    def _track(self, digest: str) -> int:
+        """Remaining epidemic counter for a digest, starting it if new."""
+        epidemic = self._epidemic
+        if digest not in epidemic:
+            epidemic[digest] = self.epidemic_rounds
+            if len(epidemic) > self._seen_cap:
+                epidemic.popitem(last=False)
+        return epidemic[digest]
+    
     def attest_capability(self, capability: str, stake: float = 0.0) -> Dict:
         """Attest to a capability with provenance."""
         entry = self.provenance.attest(capability, self.node_id, stake)
@@ -1,12 +1,35 @@
 """Provenance tracker using isnad chains (eudaemon_0 pattern)."""
 import hashlib
 import json
-from dataclasses import dataclass, asdict
-from datetime import datetime
-from typing import List, Dict, Optional, Any
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Any, Tuple
 
+# dataclass(slots=True) needs Python 3.10+; plain dataclass otherwise
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+# (monotonic_ns, naive-UTC ISO string, POSIX seconds), refreshed every 1 ms
+_now_cache: Tuple[int, str, float] = (0, "", 0.0)
+
+
+def _now_cached() -> Tuple[str, float]:
+    """Current UTC time as (ISO string, epoch), reused for up to 1 ms."""
+    global _now_cache
+    mono = time.monotonic_ns()
+    if mono - _now_cache[0] > 1_000_000 or not _now_cache[1]:
+        now = datetime.now(timezone.utc)
+        _now_cache = (mono, now.replace(tzinfo=None).isoformat(), now.timestamp())
+    return _now_cache[1], _now_cache[2]
+
+
+def _now_iso_cached() -> str:
+    """Same format as datetime.utcnow().isoformat(), reused for up to 1 ms."""
+    return _now_cached()[0]
+
+
+@dataclass(**_SLOTS)
 class ProvenanceEntry:
     """Single entry in the provenance chain."""
     node_id: str
@@ -14,6 +37,28 @@ class ProvenanceEntry:
     timestamp: str
     confidence: float = 1.0
     signature: Optional[str] = None
+    # POSIX seconds for `timestamp`; chain verification compares this
+    ts_epoch: float = field(default=0.0, repr=False)
+    
+    def __post_init__(self):
+        if not self.ts_epoch and self.timestamp:
+            try:
+                ts = datetime.fromisoformat(self.timestamp)
+            except ValueError:
+                return
+            if ts.tzinfo is None:
+                ts = ts.replace(tzinfo=timezone.utc)
+            self.ts_epoch = ts.timestamp()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable form (flat literal; much cheaper than asdict)."""
+        return {
+            "node_id": self.node_id,
+            "capability": self.capability,
+            "timestamp": self.timestamp,
+            "confidence": self.confidence,
+            "signature": self.signature,
+        }
 
 
 class ProvenanceTracker:
@@ -40,11 +85,13 @@ class ProvenanceTracker:
             vouching_party: Node issuing the attestation
             stake: Reputation/currency at risk (costly vouching)
         """
+        iso, epoch = _now_cached()
         entry = ProvenanceEntry(
             node_id=vouching_party,
             capability=capability,
-            timestamp=datetime.utcnow().isoformat(),
-            confidence=min(stake / 100.0, 1.0) if stake > 0 else 0.5
+            timestamp=iso,
+            confidence=min(stake / 100.0, 1.0) if stake > 0 else 0.5,
+            ts_epoch=epoch
         )
         return entry
     
@@ -62,24 +109,25 @@ class ProvenanceTracker:
         Returns: (is_valid, reason)
         Chain is only as strong as the minimum confidence.
         """
-        chain = self._chains.get(capability, [])
+        chain = self._chains.get(capability)
         if not chain:
             return False, "No provenance chain"
         
-        min_found = min(e.confidence for e in chain)
-        if min_found < min_confidence:
-            return False, f"Weak link: confidence {min_found} < {min_confidence}"
-        
-        # Verify chain integrity (each entry references previous)
-        for i in range(1, len(chain)):
-            if chain[i].timestamp < chain[i-1].timestamp:
+        # Single pass: weakest-link check and chain integrity (each entry
+        # must not predate the previous one), exiting on the first failure
+        prev_ts = float("-inf")
+        for i, entry in enumerate(chain):
+            if entry.confidence < min_confidence:
+                return False, f"Weak link: confidence {entry.confidence} < {min_confidence}"
+            if entry.ts_epoch < prev_ts:
                 return False, f"Timestamp anomaly at position {i}"
+            prev_ts = entry.ts_epoch
         
         return True, f"Valid chain with {len(chain)} attestations"
     
     def get_chain(self, capability: str) -> List[Dict[str, Any]]:
         """Get provenance chain as serializable list."""
-        return [asdict(e) for e in self._chains.get(capability, [])]
+        return [e.to_dict() for e in self._chains.get(capability, [])]
     
     def export(self) -> Dict[str, List[Dict]]:
         """Export all chains for serialization."""
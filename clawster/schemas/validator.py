@@ -1,10 +1,27 @@
-"""Schema validation using jsonschema (mature library)."""
-from typing import Any, Dict, List, Optional
+"""Schema validation using jsonschema (mature library).
+
+When fastjsonschema is installed, schemas are compiled to specialized Python
+functions instead, which is much faster on the per-message gossip path.
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional
 import jsonschema
-from jsonschema import validate, ValidationError as JsonSchemaValidationError
+from jsonschema import Draft7Validator, ValidationError as JsonSchemaValidationError
+
+try:
+    import fastjsonschema
+except ImportError:  # optional accelerator
+    fastjsonschema = None
 
 from .definitions import NODE_OUTPUT_SCHEMA, HEARTBEAT_SCHEMA
 
+# Fast-path checks for the common node_output shape (mirror NODE_OUTPUT_SCHEMA)
+_NODE_ID_RE = re.compile(r"^[a-zA-Z0-9_-]{3,64}$")
+_VERSION_RE = re.compile(r"^\d+\.\d+\.\d+$")
+_REQUIRED = ("node_id", "timestamp", "output_type", "payload", "version")
+_OUTPUT_TYPES = frozenset({"inference", "action", "heartbeat", "memory_update", "gossip"})
+_FAST_PATH_KEYS = frozenset(_REQUIRED) | {"vector_clock", "signature"}
+
 
 # Custom exception for validation errors
 class ValidationError(Exception):
@@ -21,7 +38,17 @@ class SchemaValidator:
     }
     
     def __init__(self):
-        self._cache = {}
+        # Build each validator once; Draft7Validator construction is the
+        # expensive part of jsonschema.validate().
+        self._validators: Dict[str, Draft7Validator] = {}
+        self._compiled: Dict[str, Callable[[Any], Any]] = {}
+        for name, schema in self.SCHEMAS.items():
+            Draft7Validator.check_schema(schema)
+            self._validators[name] = Draft7Validator(schema)
+            if fastjsonschema is not None:
+                # use_formats=False keeps parity with Draft7Validator, which
+                # does not enforce "format" without a FormatChecker.
+                self._compiled[name] = fastjsonschema.compile(schema, use_formats=False)
     
     def validate(self, data: Dict[str, Any], schema_name: str) -> tuple[bool, Optional[str]]:
         """
@@ -29,20 +56,78 @@ class SchemaValidator:
         
         Returns: (is_valid, error_message)
         """
-        schema = self.SCHEMAS.get(schema_name)
-        if not schema:
+        compiled = self._compiled.get(schema_name)
+        if compiled is not None:
+            try:
+                compiled(data)
+                return True, None
+            except fastjsonschema.JsonSchemaException as e:
+                return False, f"Validation error: {e.message}"
+        
+        validator = self._validators.get(schema_name)
+        if validator is None:
             return False, f"Unknown schema: {schema_name}"
         
         try:
-            validate(instance=data, schema=schema)
+            validator.validate(data)
             return True, None
         except JsonSchemaValidationError as e:
             return False, f"Validation error: {e.message} at {list(e.path)}"
     
     def validate_node_output(self, data: Dict[str, Any]) -> tuple[bool, Optional[str]]:
         """Quick validate for node output messages."""
+        if self._is_trivial_node_output(data):
+            return True, None
         return self.validate(data, 'node_output')
     
+    @staticmethod
+    def _is_trivial_node_output(data: Any) -> bool:
+        """
+        Cheap structural check covering the usual gossip message shape.
+        
+        Only ever answers "definitely valid"; anything unusual (provenance,
+        unknown keys, bad values) is left to the full schema validator so
+        error messages stay the same.
+        """
+        if not isinstance(data, dict) or not _FAST_PATH_KEYS.issuperset(data):
+            return False
+        for key in _REQUIRED:
+            if key not in data:
+                return False
+        node_id = data["node_id"]
+        version = data["version"]
+        if not (isinstance(node_id, str) and _NODE_ID_RE.match(node_id)):
+            return False
+        if not (isinstance(version, str) and _VERSION_RE.match(version)):
+            return False
+        if not isinstance(data["timestamp"], str):
+            return False
+        output_type = data["output_type"]
+        if not (isinstance(output_type, str) and output_type in _OUTPUT_TYPES):
+            return False
+        if not isinstance(data["payload"], dict):
+            return False
+        if "signature" in data and not isinstance(data["signature"], str):
+            return False
+        if "vector_clock" in data:
+            clock = data["vector_clock"]
+            if not isinstance(clock, dict):
+                return False
+            for count in clock.values():
+                if type(count) is not int or count < 0:
+                    return False
+        return True
+    
+    @staticmethod
+    def validate_outbound(payload: Any) -> bool:
+        """
+        Structural check for payloads of locally built messages.
+        
+        The node fills every other field itself, so a JSON object with
+        string keys is all the node_output schema needs from the payload.
+        """
+        return isinstance(payload, dict) and all(isinstance(k, str) for k in payload)
+    
     def validate_heartbeat(self, data: Dict[str, Any]) -> tuple[bool, Optional[str]]:
         """Quick validate for heartbeat messages."""
         return self.validate(data, 'heartbeat')
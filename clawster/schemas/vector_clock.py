@@ -1,6 +1,5 @@
 """Vector Clock implementation for distributed causal ordering."""
 from typing import Dict, Optional, Tuple
-from copy import deepcopy
 
 
 class VectorClock:
@@ -20,53 +19,48 @@ class VectorClock:
     
     def merge(self, other: 'VectorClock') -> 'VectorClock':
         """Merge two vector clocks (taking element-wise max)."""
-        result = deepcopy(self)
+        # Clocks are flat str -> int maps, so a shallow copy is a full copy
+        new_clock = self.clock.copy()
         for node, count in other.clock.items():
-            result.clock[node] = max(result.clock.get(node, 0), count)
-        return result
+            if count > new_clock.get(node, 0):
+                new_clock[node] = count
+        return VectorClock(self.node_id, new_clock)
     
     def compare(self, other: 'VectorClock') -> Optional[str]:
         """
         Compare two vector clocks.
         Returns: 'before', 'after', 'concurrent', or 'equal'
         """
-        if self.clock == other.clock:
-            return 'equal'
-        
-        # Check if self < other (all entries <= and at least one <)
-        all_less_or_equal = all(
-            self.clock.get(k, 0) <= other.clock.get(k, 0)
-            for k in set(self.clock) | set(other.clock)
-        )
-        all_greater_or_equal = all(
-            self.clock.get(k, 0) >= other.clock.get(k, 0)
-            for k in set(self.clock) | set(other.clock)
-        )
+        a, b = self.clock, other.clock
+        has_less = has_greater = False
         
-        strictly_less = any(
-            self.clock.get(k, 0) < other.clock.get(k, 0)
-            for k in other.clock
-        )
-        strictly_greater = any(
-            self.clock.get(k, 0) > other.clock.get(k, 0)
-            for k in self.clock
-        )
+        # Single pass; missing entries count as 0
+        for k in a.keys() | b.keys():
+            av = a.get(k, 0)
+            bv = b.get(k, 0)
+            if av < bv:
+                has_less = True
+                if has_greater:
+                    return 'concurrent'  # no causal relationship
+            elif av > bv:
+                has_greater = True
+                if has_less:
+                    return 'concurrent'  # no causal relationship
         
-        if all_less_or_equal and strictly_less:
+        if has_less:
             return 'before'  # self happened before other
-        if all_greater_or_equal and strictly_greater:
+        if has_greater:
             return 'after'  # self happened after other
-        
-        return 'concurrent'  # no causal relationship
+        return 'equal'
     
     def to_dict(self) -> Dict[str, int]:
         """Serialize to dict."""
-        return deepcopy(self.clock)
+        return dict(self.clock)
     
     @classmethod
     def from_dict(cls, node_id: str, data: Dict[str, int]) -> 'VectorClock':
         """Deserialize from dict."""
-        return cls(node_id, deepcopy(data))
+        return cls(node_id, dict(data))
     
     def __repr__(self) -> str:
         return f"VectorClock({self.node_id}: {self.clock})"
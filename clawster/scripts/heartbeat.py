@@ -9,6 +9,11 @@ import os
 from datetime import datetime
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # optional accelerator
+    orjson = None
+
 # Load from .secrets/config.env (gitignored)
 ENV_FILE = Path('/home/shangxin/clawd/.secrets/config.env')
 if ENV_FILE.exists():
@@ -39,13 +44,15 @@ def send_heartbeat(node_id='RouterLadderbot', ttl=30):
             socket_timeout=5
         )
         
-        hb_data = json.dumps({
+        hb = {
             "node": node_id,
             "status": "online",
             "role": "leader",
             "ts": datetime.utcnow().isoformat(),
             "version": "0.2.0"
-        })
+        }
+        # SETEX takes bytes as-is, so orjson output needs no decode
+        hb_data = orjson.dumps(hb) if orjson is not None else json.dumps(hb)
         
         r.setex(f"hb:{node_id}", ttl, hb_data)
         r.zadd("openclaw:cluster:nodes", {node_id: time.time()})
@@ -4,15 +4,97 @@ Agent-to-Agent Chat Protocol via Redis
 1号 ↔ 2号 技能交流协议 - Redis通信核心
 """
 
-import json
+import base64
+import socket
 import time
 import sys
 import os
-from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from dataclasses import dataclass
+
+try:
+    import msgpack
+except ImportError:  # optional: compact binary encoding, JSON otherwise
+    msgpack = None
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from redis_client import RedisClient
+from redis_client import RedisClient, ResponseError
+from serialization import dumps as _json_dumps, loads as _json_loads
+
+
+def encode_message(data: Dict) -> bytes:
+    """消息编码：MessagePack（已安装时）或 UTF-8 JSON，直接作为二进制写入 Redis"""
+    if msgpack is not None:
+        return msgpack.packb(data, use_bin_type=True)
+    return _json_dumps(data)
+
+
+def decode_message(raw: Union[bytes, str]) -> Dict:
+    """
+    消息解码，按首字节识别格式：
+    - '{' 开头: JSON
+    - 其他: MessagePack（map 类型首字节 0x80-0x8f / 0xde / 0xdf）
+    - 旧格式: base64(JSON)，过渡期保留兼容
+    """
+    if isinstance(raw, str):
+        raw = raw.encode()
+    if raw[:1] == b"{":
+        return _json_loads(raw)
+    first = raw[0] if raw else 0
+    if msgpack is not None and (0x80 <= first <= 0x8f or first in (0xde, 0xdf)):
+        return msgpack.unpackb(raw, raw=False)
+    return _json_loads(base64.b64decode(raw))
+
+
+# 收件箱 / 发送历史 Stream 的近似长度上限（XADD MAXLEN ~）
+INBOX_MAXLEN = 100
+HISTORY_MAXLEN = 1000
+
+
+def inbox_stream_key(agent_id: str) -> str:
+    """代理收件箱（Redis Stream）"""
+    return f"openclaw:chat:stream:{agent_id}"
+
+
+def history_stream_key(agent_id: str) -> str:
+    """代理发送历史（Redis Stream，MAXLEN ~ 1000）"""
+    return f"openclaw:chat:history-stream:{agent_id}"
+
+
+def _as_str(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _stream_payload(fields: Dict):
+    """取出 XADD 写入的 'p' 字段（兼容 bytes/str 键）"""
+    return fields.get(b"p", fields.get("p"))
+
+
+def verify_redis(client: RedisClient) -> bool:
+    """健康检查：PING 一次，连接失败返回 False"""
+    try:
+        return bool(client.ping())
+    except Exception as e:
+        print(f"[AgentChat] Redis health check failed: {e}")
+        return False
+
+
+# LPOP key count 的等价 Lua（Redis < 6.2），同样原子地取出并删除
+_POP_N_SCRIPT = """
+local r = redis.call('LRANGE', KEYS[1], 0, ARGV[1] - 1)
+redis.call('LTRIM', KEYS[1], ARGV[1], -1)
+return r
+"""
+
+
+# 线上格式的短字段名（仅在 Redis 序列化边界使用），None 字段不写入
+_FIELD_SHORT = {
+    'msg_id': 'i', 'from_agent': 'f', 'to_agent': 't', 'timestamp': 'ts',
+    'topic': 'tp', 'content': 'c', 'priority': 'p',
+    'my_instance': 'mi', 'partner_instance': 'pi', 'role': 'r', 'ready': 'rd',
+    'proposed_executor': 'pe', 'task_proposal': 'tk',
+}
+_FIELD_LONG = {v: k for k, v in _FIELD_SHORT.items()}
 
 
 @dataclass
@@ -25,8 +107,6 @@ class AgentMessage:
     topic: Optional[str] = None
     content: Optional[str] = None
     priority: Optional[str] = None
-    # 兼容2号协议：type 等价于 topic
-    type: Optional[str] = None
     # 2号协议的额外字段
     my_instance: Optional[str] = None
     partner_instance: Optional[str] = None
@@ -35,36 +115,111 @@ class AgentMessage:
     proposed_executor: Optional[str] = None
     task_proposal: Optional[Dict] = None
     
-    def __post_init__(self):
-        # 自动转换 type 到 topic（兼容双协议）
-        if not self.topic and self.type:
-            self.topic = self.type
-        if not self.type and self.topic:
-            self.type = self.topic
+    # 兼容2号协议：type 等价于 topic
+    @property
+    def type(self) -> Optional[str]:
+        return self.topic
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "AgentMessage":
+        """从字典构建：接受短字段线上格式或完整字段名（2号协议的 type 映射到 topic）"""
+        if "i" in data:
+            data = {_FIELD_LONG.get(k, k): v for k, v in data.items()}
+        else:
+            data = dict(data)
+        msg_type = data.pop("type", None)
+        if not data.get("topic"):
+            data["topic"] = msg_type
+        return cls(**data)
     
     def to_dict(self) -> Dict:
-        return asdict(self)
+        # 字段都是标量/普通 dict，浅拷贝即可（asdict 会递归深拷贝，慢很多）
+        data = self.__dict__.copy()
+        data["type"] = self.topic  # 2号协议读取 type
+        return data
+    
+    def to_wire(self) -> Dict:
+        """Redis 存储格式：短字段名，省略 None 字段"""
+        return {_FIELD_SHORT[k]: v for k, v in self.__dict__.items() if v is not None}
     
     def to_json(self) -> str:
-        return json.dumps(self.to_dict(), ensure_ascii=False)
+        return _json_dumps(self.to_dict()).decode()
 
 
 class AgentChat:
-    """Redis-based Agent Communication Protocol"""
+    """
+    Redis-based Agent Communication Protocol
+    
+    收件箱为 Redis Stream（XADD MAXLEN ~ 100），每个代理一个同名消费者组：
+    XREADGROUP 支持阻塞等待（无需轮询）。读到的消息处理完后由调用方 ack()，
+    处理中途退出时消息留在 PEL 中，下次启动首次读取时重新投递（至少一次）。
+    旧版 List 收件箱在过渡期内仍会被读取。
+    """
     
-    def __init__(self, agent_id: str, redis_config: Dict):
+    def __init__(self, agent_id: str, redis_config: Optional[Dict] = None,
+                 redis_client: Optional[RedisClient] = None):
+        """
+        Args:
+            redis_config: 新建连接所用的配置
+            redis_client: 已连接的客户端（与其他组件共享），提供时忽略 redis_config
+        """
         self.agent_id = agent_id
-        self.chat_key = f"openclaw:chat:{agent_id}"
-        self.history_key = f"openclaw:chat:history:{agent_id}"
-        self.redis = RedisClient(**redis_config)
-        self.redis.connect()
-        print(f"[AgentChat] Connected for agent: {agent_id}")
+        self.chat_key = f"openclaw:chat:{agent_id}"  # 旧版 List 收件箱
+        self.stream_key = inbox_stream_key(agent_id)
+        self.history_key = history_stream_key(agent_id)
+        self.consumer = socket.gethostname()
+        # 连接在首条命令时建立，不在构造时预先握手
+        self.redis = redis_client if redis_client is not None else RedisClient(**redis_config)
+        self._lpop_script = None  # 服务器不支持 LPOP count 时注册
+        self._unacked: List = []  # 已读取、待 ack() 确认的 Stream 条目 ID
+        self._pel_recovered = False  # 是否已取回上次未确认的消息
+        # 消费者组在首次 XREADGROUP 遇到 NOGROUP 时才创建，构造时不发命令
+        print(f"[AgentChat] Ready for agent: {agent_id}")
     
     def send_message(self, to_agent: str, content: str, topic: str = "general",
                      priority: str = "medium", proposed_executor: Optional[str] = None,
                      task_proposal: Optional[Dict] = None) -> AgentMessage:
         """发送消息到指定代理"""
+        pipe = self.redis.pipeline(transaction=False)
+        msg = self.queue_message(pipe, to_agent, content, topic, priority,
+                                 proposed_executor, task_proposal)
+        pipe.execute()
         
+        print(f"[AgentChat] 📤 {self.agent_id} → {to_agent}: {topic}")
+        return msg
+    
+    def send_many(self, recipients: List[str], content: Union[str, Callable[[str], str]],
+                  topic: str = "general", priority: str = "medium") -> List[AgentMessage]:
+        """
+        同一条消息发给多个代理：全部 XADD 排进一个 pipeline，一次往返发出。
+        content 可为按收件人生成内容的函数（各收件人内容只差个别字段时）。
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        messages = [
+            self.queue_message(pipe, to_agent, content(to_agent) if callable(content) else content,
+                               topic, priority)
+            for to_agent in recipients
+        ]
+        pipe.execute()
+
+        print(f"[AgentChat] 📤 {self.agent_id} → {', '.join(recipients)}: {topic}")
+        return messages
+    
+    def queue_message(self, pipe, to_agent: str, content: str, topic: str = "general",
+                      priority: str = "medium", proposed_executor: Optional[str] = None,
+                      task_proposal: Optional[Dict] = None) -> AgentMessage:
+        """消息的写入命令排进调用方的 pipeline（不执行），便于与其他命令合并为一次往返"""
+        msg, encoded = self.compose_message(to_agent, content, topic, priority,
+                                            proposed_executor, task_proposal)
+        # 添加到对方收件箱 + 记录到自己的历史（MAXLEN ~ 代替 LTRIM）
+        pipe.xadd(inbox_stream_key(to_agent), {"p": encoded}, maxlen=INBOX_MAXLEN, approximate=True)
+        pipe.xadd(self.history_key, {"p": encoded}, maxlen=HISTORY_MAXLEN, approximate=True)
+        return msg
+    
+    def compose_message(self, to_agent: str, content: str, topic: str = "general",
+                        priority: str = "medium", proposed_executor: Optional[str] = None,
+                        task_proposal: Optional[Dict] = None) -> Tuple[AgentMessage, bytes]:
+        """构建消息及其线上编码（二进制，Redis 值本身二进制安全，无需 base64）"""
         msg = AgentMessage(
             msg_id=f"{self.agent_id}:{int(time.time() * 1000)}",
             from_agent=self.agent_id,
@@ -76,44 +231,108 @@ class AgentChat:
             proposed_executor=proposed_executor,
             task_proposal=task_proposal
         )
-        
-        target_key = f"openclaw:chat:{to_agent}"
-        
-        # 编码为 base64 避免特殊字符问题
-        import base64
-        encoded = base64.b64encode(msg.to_json().encode()).decode()
-        
-        # 添加到对方收件箱
-        self.redis.lpush(target_key, encoded)
-        self.redis.ltrim(target_key, 0, 99)
-        
-        # 记录到自己的历史
-        self.redis.lpush(self.history_key, encoded)
-        self.redis.ltrim(self.history_key, 0, 999)
-        
-        print(f"[AgentChat] 📤 {self.agent_id} → {to_agent}: {topic}")
-        return msg
+        return msg, encode_message(msg.to_wire())
     
-    def get_messages(self, count: int = 10, clear: bool = False) -> List[AgentMessage]:
-        """获取自己的消息"""
-        import base64
-        messages_raw = self.redis.lrange(self.chat_key, 0, count - 1)
+    def get_messages(self, count: int = 10, clear: bool = False,
+                     block_ms: Optional[int] = None) -> List[AgentMessage]:
+        """
+        获取自己的消息
+        
+        clear=False: 只查看最新的 count 条（不改变投递状态）
+        clear=True:  通过消费者组读取新消息，处理完后调用 ack() 确认；
+                     block_ms 指定时在没有消息的情况下阻塞等待
+        """
+        if clear:
+            messages_raw = self._pop(count)  # 旧版 List 收件箱
+            if len(messages_raw) < count:
+                messages_raw += self._read_group(count - len(messages_raw), block_ms)
+        else:
+            entries = self.redis.xrevrange(self.stream_key, count=count)
+            messages_raw = [_stream_payload(fields) for _, fields in entries]
+            if len(messages_raw) < count:
+                messages_raw += self.redis.lrange(self.chat_key, 0, count - len(messages_raw) - 1)
         
         messages = []
         for raw in messages_raw:
             try:
-                # base64 解码
-                decoded = base64.b64decode(raw).decode()
-                data = json.loads(decoded)
-                msg = AgentMessage(**data)
+                data = decode_message(raw)
+                msg = AgentMessage.from_dict(data)
                 messages.append(msg)
             except Exception as e:
                 print(f"[AgentChat] Parse error: {e}")
                 continue
         
-        if clear and messages:
-            self.redis.ltrim(self.chat_key, len(messages), -1)
-        
+        return messages
+    
+    def _pop(self, count: int) -> List:
+        """原子读取并清除最多 count 条消息（一次往返，无 LRANGE/LTRIM 竞争）"""
+        if self._lpop_script is None:
+            try:
+                return self.redis.lpop(self.chat_key, count) or []
+            except Exception:
+                # Redis < 6.2: LPOP 不接受 count 参数，改用 Lua 脚本
+                self._lpop_script = self.redis.register_script(_POP_N_SCRIPT)
+        return self._lpop_script(keys=[self.chat_key], args=[count]) or []
+    
+    def _read_group(self, count: int, block_ms: Optional[int] = None) -> List:
+        """
+        XREADGROUP 读取未投递的消息（不确认，见 ack()）。
+        首次读取先以 ID 0 取回本消费者 PEL 中上次未确认的消息，再读新消息。
+        """
+        raw = []
+        if not self._pel_recovered:
+            raw = self._xreadgroup("0", count)
+            self._pel_recovered = True
+        if len(raw) < count:
+            raw += self._xreadgroup(">", count - len(raw), block_ms)
+        return raw
+    
+    def _xreadgroup(self, stream_id: str, count: int, block_ms: Optional[int] = None) -> List:
+        try:
+            response = self.redis.xreadgroup(
+                self.agent_id, self.consumer, {self.stream_key: stream_id},
+                count=count, block=block_ms
+            )
+        except ResponseError as e:
+            if "NOGROUP" not in str(e):
+                raise
+            self._create_group()
+            response = self.redis.xreadgroup(
+                self.agent_id, self.consumer, {self.stream_key: stream_id},
+                count=count, block=block_ms
+            )
+        raw = []
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                self._unacked.append(entry_id)
+                payload = _stream_payload(fields)
+                if payload is not None:  # 已被 MAXLEN 裁掉的 PEL 条目只剩 ID
+                    raw.append(payload)
+        return raw
+    
+    def _create_group(self):
+        """建立同名消费者组（从头读取，收件箱不存在时一并创建）；其他实例已建好时忽略 BUSYGROUP"""
+        try:
+            self.redis.xgroup_create(self.stream_key, self.agent_id, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+    
+    def ack(self) -> int:
+        """确认 get_messages(clear=True) 已读取的消息（处理成功后调用），返回确认条数"""
+        if not self._unacked:
+            return 0
+        ids, self._unacked = self._unacked, []
+        return self.redis.xack(self.stream_key, self.agent_id, *ids)
+    
+    def get_history(self, count: int = 10) -> List[AgentMessage]:
+        """获取自己最近发送的消息（最新在前）"""
+        messages = []
+        for _, fields in self.redis.xrevrange(self.history_key, count=count):
+            try:
+                messages.append(AgentMessage.from_dict(decode_message(_stream_payload(fields))))
+            except Exception as e:
+                print(f"[AgentChat] Parse error: {e}")
         return messages
     
     def get_latest_message(self) -> Optional[AgentMessage]:
@@ -122,8 +341,25 @@ class AgentChat:
         return messages[0] if messages else None
     
     def get_unread_count(self) -> int:
-        """获取未读消息数量"""
-        return self.redis.llen(self.chat_key)
+        """获取未读消息数量（消费者组积压 + 已投递未确认 + 旧版 List 收件箱）"""
+        try:
+            groups = self.redis.xinfo_groups(self.stream_key)
+        except ResponseError:  # 收件箱尚不存在
+            groups = []
+        for group in groups:
+            name = group.get("name")
+            if name in (self.agent_id, self.agent_id.encode()):
+                pending = group.get("pending") or 0
+                backlog = group.get("lag")
+                if backlog is None:  # Redis < 7.0 没有 lag 字段
+                    last_id = group.get("last-delivered-id")
+                    backlog = len(self.redis.xrange(self.stream_key, min=f"({_as_str(last_id)}"))
+                backlog += pending
+                break
+        else:
+            # 组尚未创建（首次读取时才建，从头读）：收件箱里的全部消息都算未读
+            backlog = self.redis.xlen(self.stream_key)
+        return backlog + self.redis.llen(self.chat_key)
 
 
 class TaskNegotiator:
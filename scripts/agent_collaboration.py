@@ -3,21 +3,21 @@
 Agent Collaboration - 1号↔2号 每小时技能交流
 
 运行方式:
-- 每小时由 cron 自动触发
-- 手动运行: python3 agent_collaboration.py --node-id main-node
+- 单次: python3 agent_collaboration.py --node-id main-node（由 cron 调度，处理一轮后退出）
+- 常驻: 追加 --daemon，阻塞等待消息即时处理，每小时提出一次新任务
 """
 
-import json
 import sys
 import os
 import random
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from agent_chat import AgentChat, TaskNegotiator
+from agent_chat import AgentChat, TaskNegotiator, inbox_stream_key, history_stream_key
 from redis_client import RedisClient
 from config_loader import get_redis_config, get_node_config
 
@@ -54,6 +54,46 @@ TOPICS = {
 }
 
 
+# 子任务模板（{idea} 占位），导入时构建一次
+TASK_TEMPLATES = {
+    "distributed_architecture": [
+        "调研现有{idea}的最佳实践方案",
+        "设计{idea}的架构图和流程图",
+        "编写{idea}的核心代码实现",
+        "实现{idea}的单元测试和集成测试",
+        "创建{idea}的性能基准测试",
+        "编写{idea}的技术文档",
+        "实现{idea}的监控和告警",
+        "进行{idea}的故障注入测试",
+        "优化{idea}的资源使用效率",
+        "撰写{idea}的部署和运维指南"
+    ],
+    "self_evolution": [
+        "研究{idea}的相关学术论文",
+        "调研开源社区关于{idea}的实现",
+        "设计{idea}的实验验证方案",
+        "实现{idea}的原型代码",
+        "收集{idea}的效果数据",
+        "分析{idea}的成功率和失败模式",
+        "优化{idea}的执行效率",
+        "创建{idea}的自动化流程",
+        "编写{idea}的使用指南",
+        "分享{idea}的实践经验"
+    ],
+    "memory_optimization": [
+        "分析当前{idea}的瓶颈",
+        "调研{idea}的现有算法实现",
+        "设计{idea}的新算法架构",
+        "实现{idea}的核心代码",
+        "测试{idea}的准确性和召回率",
+        "优化{idea}的存储效率",
+        "实现{idea}的批量处理",
+        "创建{idea}的A/B测试方案",
+        "分析{idea}的效果指标",
+        "总结{idea}的改进建议"
+    ]
+}
+
 def load_redis_config() -> Dict:
     """使用统一配置加载器获取 Redis 配置"""
     return get_redis_config()
@@ -80,88 +120,43 @@ def generate_topic_idea(hour: int) -> tuple:
 
 def generate_serialized_tasks(topic: str, idea: str) -> List[str]:
     """为想法生成满载的子代理任务（5-10个）"""
-    tasks = {
-        "distributed_architecture": [
-            f"调研现有{idea}的最佳实践方案",
-            f"设计{idea}的架构图和流程图",
-            f"编写{idea}的核心代码实现",
-            f"实现{idea}的单元测试和集成测试",
-            f"创建{idea}的性能基准测试",
-            f"编写{idea}的技术文档",
-            f"实现{idea}的监控和告警",
-            f"进行{idea}的故障注入测试",
-            f"优化{idea}的资源使用效率",
-            f"撰写{idea}的部署和运维指南"
-        ],
-        "self_evolution": [
-            f"研究{idea}的相关学术论文",
-            f"调研开源社区关于{idea}的实现",
-            f"设计{idea}的实验验证方案",
-            f"实现{idea}的原型代码",
-            f"收集{idea}的效果数据",
-            f"分析{idea}的成功率和失败模式",
-            f"优化{idea}的执行效率",
-            f"创建{idea}的自动化流程",
-            f"编写{idea}的使用指南",
-            f"分享{idea}的实践经验"
-        ],
-        "memory_optimization": [
-            f"分析当前{idea}的瓶颈",
-            f"调研{idea}的现有算法实现",
-            f"设计{idea}的新算法架构",
-            f"实现{idea}的核心代码",
-            f"测试{idea}的准确性和召回率",
-            f"优化{idea}的存储效率",
-            f"实现{idea}的批量处理",
-            f"创建{idea}的A/B测试方案",
-            f"分析{idea}的效果指标",
-            f"总结{idea}的改进建议"
-        ]
-    }
-    
-    base_tasks = tasks.get(topic, tasks["self_evolution"])
-    # 随机选择5-10个任务
-    num_tasks = random.randint(5, 10)
-    return random.sample(base_tasks, min(num_tasks, len(base_tasks)))
+    templates = TASK_TEMPLATES.get(topic, TASK_TEMPLATES["self_evolution"])
+    # 随机选择5-10个任务（对下标抽样，不复制模板列表），只格式化选中的模板
+    num_tasks = min(random.randint(5, 10), len(templates))
+    return [templates[i].format(idea=idea) for i in random.sample(range(len(templates)), num_tasks)]
 
-def check_workload(redis_config: Dict, partner: str) -> tuple:
+def check_workload(client: RedisClient, partner: str) -> tuple:
     """检查当前工作量，返回(是否有工作, 工作饱和度 0-1, 建议主题)"""
-    client = RedisClient(**redis_config)
-    client.connect()
     
     workload_score = 0.0
     reasons = []
     
-    # 1. 检查集群节点活跃度
-    nodes = client.hgetall('openclaw:cluster:nodes')
-    online_nodes = 0
-    for node_id in nodes:
-        hb = client.get(f'hb:{node_id}')
-        if hb:
-            import time
-            hb_data = json.loads(hb)
-            age = time.time() - hb_data['timestamp']
-            if age < 60:
-                online_nodes += 1
+    # 所有探测合并为一次往返：在线节点 + 伙伴收件箱 + 历史 + Leader
+    pipe = client.pipeline(transaction=False)
+    pipe.zcount('openclaw:cluster:hb', time.time() - 60, '+inf')
+    pipe.xlen(inbox_stream_key(partner))
+    pipe.llen(f'openclaw:chat:{partner}')
+    pipe.xrevrange(history_stream_key(partner), count=5)
+    pipe.get('openclaw:cluster:leader_lock')
+    online_nodes, stream_msgs, legacy_msgs, history, leader = pipe.execute()
     
+    # 1. 检查集群节点活跃度（心跳索引：60 秒内有心跳的节点数）
     if online_nodes <= 1:
         workload_score += 0.3
         reasons.append(f"在线节点少({online_nodes}个)")
     
     # 2. 检查待处理消息
-    partner_msgs = client.llen(f'openclaw:chat:{partner}')
+    partner_msgs = stream_msgs + legacy_msgs
     if partner_msgs < 2:
         workload_score += 0.3
         reasons.append(f"伙伴消息少({partner_msgs}条)")
     
     # 3. 检查最近任务历史
-    history = client.lrange(f'openclaw:chat:history:{partner}', 0, 4)
     if len(history) < 3:
         workload_score += 0.2
         reasons.append("近期任务交流少")
     
     # 4. 检查Leader状态
-    leader = client.get('openclaw:cluster:leader_lock')
     if not leader:
         workload_score += 0.2
         reasons.append("Leader选举异常")
@@ -186,56 +181,27 @@ def check_workload(redis_config: Dict, partner: str) -> tuple:
     return has_work, min(workload_score, 1.0), suggestion, reasons
 
 
-def main():
-    import argparse
-    parser = argparse.ArgumentParser(description='Agent Collaboration')
-    parser.add_argument('--node-id', required=True, help='Node ID (main-node or sx-squid-bot-follower-01)')
-    parser.add_argument('--partner', default='sx-squid-bot-follower-01', help='Partner node ID')
-    args = parser.parse_args()
-    
-    # 加载配置先
-    config = load_config()
-    redis_config = config['redis']
-    
-    # 动态发现 partner（不硬编码）
-    from node_discovery import NodeRegistry
-    registry = NodeRegistry(RedisClient(**redis_config), args.node_id)
-    partner_info = registry.find_partner(exclude_self=True)
-    partner = partner_info['node_id'] if partner_info else args.partner
-    print(f"   🔍 动态发现伙伴: {partner}")
-    
-    print(f"\n{'='*60}")
-    print(f"🤖 Agent Collaboration: {args.node_id} ↔ {partner}")
-    print(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"{'='*60}\n")
-    
-    # 初始化聊天
-    chat = AgentChat(agent_id=args.node_id, redis_config=redis_config)
-    negotiator = TaskNegotiator(chat)
-    
-    # 检查是否有对方的新消息
-    unread = chat.get_unread_count()
-    if unread > 0:
-        print(f"📨 收到 {unread} 条来自 {partner} 的消息")
-        messages = chat.get_messages(count=unread, clear=True)
+def handle_messages(negotiator: TaskNegotiator, messages: List) -> bool:
+    """处理收到的消息；接受了任务提议时返回 True"""
+    for msg in messages:
+        print(f"\n💬 From {msg.from_agent}:")
+        print(f"   Topic: {msg.topic}")
+        print(f"   Content: {msg.content[:200]}...")
         
-        for msg in messages:
-            print(f"\n💬 From {msg.from_agent}:")
-            print(f"   Topic: {msg.topic}")
-            print(f"   Content: {msg.content[:200]}...")
-            
-            # 如果对方提出了任务，接受并执行
-            if msg.task_proposal and msg.task_proposal.get('status') == 'pending':
-                print(f"\n🎯 接受任务提议！")
-                negotiator.accept_and_execute(msg)
-                print(f"🚀 已派出满载子代理执行任务（{msg.task_proposal.get('task_count')}个子任务）")
-                return
-    else:
-        print(f"📭 暂无来自 {partner} 的新消息")
-    
+        # 如果对方提出了任务，接受并执行
+        if msg.task_proposal and msg.task_proposal.get('status') == 'pending':
+            print(f"\n🎯 接受任务提议！")
+            negotiator.accept_and_execute(msg)
+            print(f"🚀 已派出满载子代理执行任务（{msg.task_proposal.get('task_count')}个子任务）")
+            return True
+    return False
+
+
+def propose_new_task(negotiator: TaskNegotiator, partner: str):
+    """检查工作负载并向伙伴提出新的协作任务"""
     # 检查当前工作饱和度
     print(f"\n📊 检查工作负载...")
-    has_work, saturation, suggestion, reasons = check_workload(redis_config, partner)
+    has_work, saturation, suggestion, reasons = check_workload(negotiator.chat.redis, partner)
     
     if saturation < 0.5:
         print(f"   ✅ 工作正常 (饱和度: {saturation:.0%})")
@@ -264,7 +230,7 @@ def main():
     print(f"   Tasks: {len(tasks)} 个子任务")
     
     # 发送任务提议
-    msg = negotiator.propose_task(
+    negotiator.propose_task(
         to_agent=partner,
         idea=idea,
         tasks=tasks,
@@ -277,5 +243,79 @@ def main():
     print(f"\n{'='*60}\n")
 
 
+def run_once(chat: AgentChat, negotiator: TaskNegotiator, partner: str):
+    """单次运行（旧版 cron 触发方式）"""
+    # 检查是否有对方的新消息
+    unread = chat.get_unread_count()
+    if unread > 0:
+        print(f"📨 收到 {unread} 条来自 {partner} 的消息")
+        messages = chat.get_messages(count=unread, clear=True)
+        handled = handle_messages(negotiator, messages)
+        chat.ack()  # 处理完才确认，中途退出的消息下次运行重新投递
+        if handled:
+            return
+    else:
+        print(f"📭 暂无来自 {partner} 的新消息")
+    
+    propose_new_task(negotiator, partner)
+
+
+def run_forever(chat: AgentChat, negotiator: TaskNegotiator,
+                partner: str, interval: float = 3600.0):
+    """
+    常驻运行：复用同一连接，阻塞等待消息（XREADGROUP BLOCK）即时处理，
+    每 interval 秒提出一次新任务。
+    """
+    last_proposal = None
+    while True:
+        now = time.monotonic()
+        if last_proposal is None or now - last_proposal >= interval:
+            propose_new_task(negotiator, partner)
+            last_proposal = now
+        
+        # 最多阻塞到下一次提议时间
+        wait = max(interval - (time.monotonic() - last_proposal), 0.001)
+        messages = chat.get_messages(count=32, clear=True, block_ms=int(wait * 1000))
+        if messages:
+            print(f"📨 收到 {len(messages)} 条来自 {partner} 的消息")
+            handle_messages(negotiator, messages)
+        chat.ack()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Agent Collaboration')
+    parser.add_argument('--node-id', required=True, help='Node ID (main-node or sx-squid-bot-follower-01)')
+    parser.add_argument('--partner', default='sx-squid-bot-follower-01', help='Partner node ID')
+    parser.add_argument('--daemon', action='store_true', help='常驻运行，阻塞等待消息并按 --interval 提出新任务')
+    parser.add_argument('--once', action='store_true', help=argparse.SUPPRESS)  # 单次即默认行为，保留以兼容已有 cron 命令
+    parser.add_argument('--interval', type=float, default=3600.0, help='常驻模式下提出新任务的间隔（秒）')
+    args = parser.parse_args()
+    
+    # 加载配置先；整个进程共用一个连接（首条命令时建立，一次 TCP + AUTH 握手）
+    redis_config = load_redis_config()
+    client = RedisClient(**redis_config)
+    
+    # 动态发现 partner（不硬编码）
+    from node_discovery import NodeRegistry
+    registry = NodeRegistry(client)
+    partner = registry.find_partner(args.node_id) or args.partner
+    print(f"   🔍 动态发现伙伴: {partner}")
+    
+    print(f"\n{'='*60}")
+    print(f"🤖 Agent Collaboration: {args.node_id} ↔ {partner}")
+    print(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*60}\n")
+    
+    # 初始化聊天
+    chat = AgentChat(agent_id=args.node_id, redis_client=client)
+    negotiator = TaskNegotiator(chat)
+    
+    if args.daemon:
+        run_forever(chat, negotiator, partner, args.interval)
+    else:
+        run_once(chat, negotiator, partner)
+
+
 if __name__ == "__main__":
     main()
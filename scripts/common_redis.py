@@ -2,49 +2,92 @@
 Redis Client Module for Clawster
 
 Uses redis-py (mature, production-grade) with:
-- Connection pooling (built into redis-py)  
+- Connection pooling (one shared pool per connection config)
 - Health checking (redis-py health_check_interval)
+- TCP keepalive on pooled sockets (redis-py already sets TCP_NODELAY)
+- C reply parsing when hiredis is installed (redis-py selects it automatically)
 - Configuration from environment (standard practice)
 - Retry handling (tenacity - robust retry library)
 """
 import os
+import threading
+from typing import Dict, Optional, Tuple
+
 import redis
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
+try:
+    from .redis_client import KEEPALIVE_OPTIONS
+except ImportError:
+    from redis_client import KEEPALIVE_OPTIONS
+
+# One ConnectionPool per distinct connection config, shared process-wide
+_POOLS: Dict[Tuple, redis.ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
 
-def get_redis_client() -> redis.Redis:
+def _get_pool(key: Tuple, factory) -> redis.ConnectionPool:
+    """Return the cached pool for ``key``, creating it once (double-checked)."""
+    pool = _POOLS.get(key)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _POOLS.get(key)
+            if pool is None:
+                pool = _POOLS[key] = factory()
+    return pool
+
+
+def get_redis_client(host: Optional[str] = None,
+                     port: Optional[int] = None,
+                     db: Optional[int] = None,
+                     password: Optional[str] = None,
+                     max_connections: Optional[int] = None,
+                     decode_responses: bool = True,
+                     **connection_kwargs) -> redis.Redis:
     """
-    Get Redis client using redis-py from_url pattern.
-    Configuration via environment variables (12-factor app standard).
-    Uses redis-py's built-in connection pool (mature, battle-tested).
+    Get Redis client backed by a shared connection pool.
+    Configuration via arguments, else environment variables (12-factor app
+    standard). Clients built with the same config share one pool; a different
+    host/port/db/password gets its own.
+    
+    Any other keyword (socket_timeout, ssl, ...) is a redis-py connection
+    option: it overrides the defaults below and is part of the pool key.
+    Unknown options raise TypeError from redis-py on first connection.
     
     Environment:
         REDIS_URL: Full URL redis://:password@host:port/db
         Or: REDIS_HOST, REDIS_PORT, REDIS_PASSWORD, REDIS_DB
+        REDIS_POOL_SIZE: max connections per pool
     """
-    redis_url = os.getenv('REDIS_URL')
-    
-    if redis_url:
-        # from_url handles pool automatically
-        return redis.from_url(
-            redis_url,
-            decode_responses=True,
-            health_check_interval=30,
-            socket_connect_timeout=5,
-            socket_timeout=5
-        )
-    
-    # Individual env vars (fallback)
-    return redis.Redis(
-        host=os.getenv('REDIS_HOST', 'localhost'),
-        port=int(os.getenv('REDIS_PORT', 6379)),
-        db=int(os.getenv('REDIS_DB', 0)),
-        password=os.getenv('REDIS_PASSWORD'),
-        decode_responses=True,
+    if max_connections is None and os.getenv('REDIS_POOL_SIZE'):
+        max_connections = int(os.getenv('REDIS_POOL_SIZE'))
+    common = dict(
+        decode_responses=decode_responses,
         health_check_interval=30,
+        socket_keepalive=True,
+        socket_keepalive_options=KEEPALIVE_OPTIONS,
         socket_connect_timeout=5,
-        socket_timeout=5
+        socket_timeout=5,
+        max_connections=max_connections
     )
+    common.update(connection_kwargs)
+    options = tuple(sorted((name, repr(value)) for name, value in connection_kwargs.items()))
+    
+    redis_url = os.getenv('REDIS_URL')
+    if redis_url and host is None:
+        key = ('url', redis_url, max_connections, decode_responses, options)
+        pool = _get_pool(key, lambda: redis.ConnectionPool.from_url(redis_url, **common))
+        return redis.Redis(connection_pool=pool)
+    
+    # Individual args / env vars (fallback)
+    host = host or os.getenv('REDIS_HOST', 'localhost')
+    port = int(port if port is not None else os.getenv('REDIS_PORT', 6379))
+    db = int(db if db is not None else os.getenv('REDIS_DB', 0))
+    password = password if password is not None else os.getenv('REDIS_PASSWORD')
+    key = (host, port, db, password, max_connections, decode_responses, options)
+    pool = _get_pool(key, lambda: redis.ConnectionPool(
+        host=host, port=port, db=db, password=password, **common))
+    return redis.Redis(connection_pool=pool)
 
 
 @retry(
@@ -7,35 +7,65 @@ OpenClaw Distributed - Secure Config Loader
 3. 鲁棒性：支持无配置文件纯环境启动
 """
 import os
-import json
+import copy
+import functools
 from pathlib import Path
 from typing import Dict, Any, Optional
 
-# 全局缓存
-_config_cache = None
-_config_loaded = False
+try:
+    from .serialization import loads
+except ImportError:
+    from serialization import loads
+
+__all__ = ['get_config_dir', 'get_redis_config', 'get_node_config', 'load_json_cached',
+           'reload_config', 'warm_config']
+
+# 首次解析后的配置目录；reload_config() 重置
+_CONFIG_DIR: Optional[Path] = None
 
 
 def get_config_dir() -> Path:
-    """获取配置目录（安全版）"""
+    """获取配置目录（安全版，首次解析后缓存）"""
+    global _CONFIG_DIR
+    if _CONFIG_DIR is not None:
+        return _CONFIG_DIR
+
     # 1. 优先使用显式环境变量
-    if os.getenv('CLAWSTER_CONFIG_DIR'):
-        return Path(os.getenv('CLAWSTER_CONFIG_DIR'))
+    env_dir = os.getenv('CLAWSTER_CONFIG_DIR')
+    if env_dir:
+        _CONFIG_DIR = Path(env_dir)
+        return _CONFIG_DIR
 
     # 2. 默认项目内路径
-    script_dir = Path(__file__).parent
-    return script_dir.parent / 'config'
+    _CONFIG_DIR = Path(__file__).parent.parent / 'config'
+    return _CONFIG_DIR
 
 
-def get_redis_config() -> Dict[str, Any]:
+@functools.lru_cache(maxsize=8)
+def _load_json(path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """解析配置文件；按 (路径, mtime, 大小) 缓存，文件修改后自动重新加载"""
+    raw = Path(path).read_bytes()
+    return loads(raw)
+
+
+def load_json_cached(path: Path, st: Optional[os.stat_result] = None) -> Optional[Dict[str, Any]]:
     """
-    获取 Redis 配置（优先级：ENV > secrets.json > Defaults）
+    读取（缓存的）配置文件内容；文件不存在时返回 None
+    
+    调用方已 stat 过该文件时可传入 st，存在性检查与缓存指纹共用一次系统调用。
     """
-    global _config_cache, _config_loaded
+    if st is None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+    return _load_json(str(path), st.st_mtime_ns, st.st_size)
 
-    if _config_loaded and _config_cache is not None:
-        return _config_cache
 
+def get_redis_config() -> Dict[str, Any]:
+    """
+    获取 Redis 配置（优先级：ENV > secrets.json > Defaults）
+    """
     config = {
         'host': None,
         'port': 11877,
@@ -45,17 +75,16 @@ def get_redis_config() -> Dict[str, Any]:
 
     # --- 1. 尝试从 secrets.json 加载 ---
     secrets_path = get_config_dir() / 'secrets.json'
-    if secrets_path.exists():
-        try:
-            with open(secrets_path, 'r') as f:
-                data = json.load(f)
-                redis_data = data.get('redis', {})
-                config['host'] = redis_data.get('host')
-                config['port'] = redis_data.get('port', config['port'])
-                config['password'] = redis_data.get('password')
-                config['db'] = redis_data.get('db', config['db'])
-        except Exception as e:
-            print(f"⚠️ 读取 secrets.json 失败: {e}")
+    try:
+        data = load_json_cached(secrets_path)
+        if data is not None:
+            redis_data = data.get('redis', {})
+            config['host'] = redis_data.get('host')
+            config['port'] = redis_data.get('port', config['port'])
+            config['password'] = redis_data.get('password')
+            config['db'] = redis_data.get('db', config['db'])
+    except Exception as e:
+        print(f"⚠️ 读取 secrets.json 失败: {e}")
 
     # --- 2. 环境变量覆盖 (最高优先级) ---
     env_host = os.getenv('REDIS_HOST')
@@ -81,19 +110,18 @@ def get_redis_config() -> Dict[str, Any]:
     # 强制端口为整数
     config['port'] = int(config['port'])
 
-    _config_cache = config
-    _config_loaded = True
     return config
 
 
 def get_node_config() -> Dict[str, Any]:
-    """获取节点配置"""
+    """获取节点配置（返回缓存内容的深拷贝，调用方修改不会影响缓存）"""
     config_path = get_config_dir() / 'config.json'
-    if config_path.exists():
-        try:
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        except: pass
+    try:
+        data = load_json_cached(config_path)
+        if data is not None:
+            return copy.deepcopy(data)
+    except Exception:
+        pass
 
     return {
         'node': {
@@ -108,11 +136,25 @@ def get_node_config() -> Dict[str, Any]:
     }
 
 def reload_config():
-    global _config_cache, _config_loaded
-    _config_cache = None
-    _config_loaded = False
+    global _CONFIG_DIR
+    _CONFIG_DIR = None
+    _load_json.cache_clear()
     return get_redis_config()
 
+
+def warm_config() -> None:
+    """预加载配置文件缓存（失败时静默，由首次真正调用时报告）"""
+    try:
+        get_node_config()
+        get_redis_config()
+    except Exception:
+        pass
+
+
+# 设置 CLAWSTER_WARM_CONFIG=1 时在导入阶段预读，首次调用无磁盘 I/O
+if os.getenv('CLAWSTER_WARM_CONFIG') == '1':
+    warm_config()
+
 if __name__ == '__main__':
     try:
         cfg = get_redis_config()
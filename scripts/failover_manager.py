@@ -6,10 +6,25 @@ Handles automatic failover and node recovery
 
 import json
 import time
-from typing import List, Dict, Any
+from collections import Counter
+from typing import List, Dict, Any, Optional
 import redis
 from redis import exceptions as redis_exceptions
 
+try:
+    from .node_discovery import FAILED_NODES_KEY
+    from .serialization import dumps as _dumps, loads as _loads
+except ImportError:
+    from node_discovery import FAILED_NODES_KEY
+    from serialization import dumps as _dumps, loads as _loads
+
+SESSIONS_PATTERN = 'openclaw:cluster:sessions:*'
+
+
+def node_sessions_key(node_id: str) -> str:
+    """Set of session keys owned by a node (secondary index)"""
+    return f'openclaw:cluster:node_sessions:{node_id}'
+
 
 class FailoverManager:
     """Manages node failover and recovery"""
@@ -17,57 +32,78 @@ class FailoverManager:
     def __init__(self, redis_client: redis.Redis, config: dict):
         self.redis = redis_client
         self.config = config
+        self._failed_backfilled = False
         
+    def save_session(self, session_key: str, session: Dict[str, Any], ttl: int = 86400,
+                     previous_node: Optional[str] = None) -> None:
+        """Store a session and index it under its owning node"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.setex(session_key, ttl, _dumps(session))
+        pipe.sadd(node_sessions_key(session['node_id']), session_key)
+        if previous_node and previous_node != session['node_id']:
+            pipe.srem(node_sessions_key(previous_node), session_key)
+        pipe.execute()
+    
     def mark_node_failed(self, node_id: str, reason: str = "heartbeat_timeout") -> bool:
         """Mark a node as failed and trigger failover"""
-        log_entry = {
-            'timestamp': time.time(),
-            'node_id': node_id,
-            'event': 'node_failed',
-            'reason': reason
-        }
-        
+        return self.mark_nodes_failed([node_id], reason)
+
+    def mark_nodes_failed(self, node_ids: List[str], reason: str = "heartbeat_timeout") -> bool:
+        """Mark several nodes as failed in two round-trips and trigger failover for each"""
+        node_ids = list(dict.fromkeys(node_ids))
+        if not node_ids:
+            return True
+
         try:
-            # Add to events stream
-            self.redis.xadd('openclaw:cluster:events', log_entry)
+            # One HMGET for every node's current info
+            records = self.redis.hmget('openclaw:cluster:nodes', node_ids)
         except redis_exceptions.RedisError as e:
-            print(f"[FailoverManager] ERROR: Failed to add node failed event to Redis stream for {node_id}: {e}")
-            return False # Critical failure, cannot mark node failed properly
+            print(f"[FailoverManager] ERROR: Failed to read node info for {node_ids} from Redis: {e}")
+            return False # Critical failure
 
-        try:
-            # Update node info
-            node_data = self.redis.hget('openclaw:cluster:nodes', node_id)
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        updates = {}
+        for node_id, node_data in zip(node_ids, records):
             if node_data:
                 try:
-                    node_info = json.loads(node_data)
+                    node_info = _loads(node_data)
                 except json.JSONDecodeError as e:
                     print(f"[FailoverManager] WARNING: Failed to decode node data for {node_id}: {e}. Skipping update.")
                     node_info = {} # Provide a default empty dict to avoid further errors
-
-                node_info['state'] = 'failed'
-                node_info['failed_at'] = time.time()
-                node_info['fail_reason'] = reason
-                self.redis.hset('openclaw:cluster:nodes', node_id, json.dumps(node_info))
             else:
                 print(f"[FailoverManager] Node {node_id} not found in Redis when marking as failed. Creating new entry.")
-                node_info = {
-                    'node_id': node_id,
-                    'state': 'failed',
-                    'failed_at': time.time(),
-                    'fail_reason': reason
-                }
-                self.redis.hset('openclaw:cluster:nodes', node_id, json.dumps(node_info))
+                node_info = {'node_id': node_id}
+
+            node_info['state'] = 'failed'
+            node_info['failed_at'] = now
+            node_info['fail_reason'] = reason
+            pipe.xadd('openclaw:cluster:events', {
+                'timestamp': now,
+                'node_id': node_id,
+                'event': 'node_failed',
+                'reason': reason
+            })
+            updates[node_id] = _dumps(node_info)
+        # One multi-field HSET and one variadic SADD for the whole batch
+        pipe.hset('openclaw:cluster:nodes', mapping=updates)
+        pipe.sadd(FAILED_NODES_KEY, *node_ids)
+
+        try:
+            # Events and node updates go out in a single burst
+            pipe.execute()
         except redis_exceptions.RedisError as e:
-            print(f"[FailoverManager] ERROR: Failed to update node info for {node_id} in Redis: {e}")
+            print(f"[FailoverManager] ERROR: Failed to mark nodes {node_ids} as failed in Redis: {e}")
             return False # Critical failure
 
-        print(f"[FailoverManager] Node {node_id} marked as failed: {reason}")
-        
-        # Trigger failover actions on sessions, etc.
-        self._trigger_failover_actions(node_id)
-        
+        for node_id in node_ids:
+            print(f"[FailoverManager] Node {node_id} marked as failed: {reason}")
+
+            # Trigger failover actions on sessions, etc.
+            self._trigger_failover_actions(node_id)
+
         return True
-    
+
     def _trigger_failover_actions(self, failed_node: str) -> None:
         """Execute failover actions for the failed node"""
         # 1. Reassign active sessions
@@ -81,47 +117,75 @@ class FailoverManager:
             'action': 'sessions_migrated'
         }
         try:
-            self.redis.publish('openclaw:cluster:failover', json.dumps(failover_event))
+            self.redis.publish('openclaw:cluster:failover', _dumps(failover_event))
         except redis_exceptions.RedisError as e:
             print(f"[FailoverManager] WARNING: Failed to publish failover event for {failed_node}: {e}")
     
     def _migrate_sessions(self, from_node: str) -> int:
-        """Migrate active sessions from failed node"""
-        # Find sessions owned by failed node
-        pattern = f'openclaw:cluster:sessions:*'
+        """
+        Migrate active sessions from failed node.
+        
+        Uses the node's session index when present (touches only its own
+        sessions); otherwise falls back to a client-side batched SCAN for
+        sessions stored before the index existed. The scan stays out of Lua
+        so the server keeps serving other clients between batches.
+        """
         migrated = 0
         
         try:
-            for key in self.redis.scan_iter(match=pattern):
-                try:
-                    session_data = self.redis.get(key)
-                except redis_exceptions.RedisError as e:
-                    print(f"[FailoverManager] WARNING: Failed to get session data for key {key}: {e}")
-                    continue # Skip this session
-
-                if session_data:
-                    try:
-                        session = json.loads(session_data)
-                    except json.JSONDecodeError as e:
-                        print(f"[FailoverManager] WARNING: Failed to decode session data for key {key}: {e}. Skipping migration for this session.")
-                        continue # Skip this session
-
-                    if session.get('node_id') == from_node:
-                        session['node_id'] = 'migrating'
-                        session['migrated_from'] = from_node
-                        session['migrated_at'] = time.time()
-                        try:
-                            self.redis.setex(key, 3600, json.dumps(session))
-                            migrated += 1
-                        except redis_exceptions.RedisError as e:
-                            print(f"[FailoverManager] WARNING: Failed to setex session {key} during migration: {e}")
-
+            index_key = node_sessions_key(from_node)
+            keys = sorted(self.redis.smembers(index_key))
+            if keys:
+                migrated = self._migrate_indexed(from_node, index_key, keys)
+            else:
+                migrated = self._migrate_scanned(from_node)
         except redis_exceptions.RedisError as e:
-            print(f"[FailoverManager] ERROR: Failed to scan Redis for sessions during migration from {from_node}: {e}")
+            print(f"[FailoverManager] ERROR: Failed to migrate sessions from {from_node}: {e}")
         
         print(f"[FailoverManager] Migrated {migrated} sessions from {from_node}")
         return migrated
     
+    def _migrate_scanned(self, from_node: str, batch_size: int = 500) -> int:
+        """Migrate unindexed sessions without Lua: SCAN in batches, one MGET + one pipeline per batch"""
+        migrated = 0
+        batch = []
+        for key in self.redis.scan_iter(match=SESSIONS_PATTERN, count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                migrated += self._migrate_indexed(from_node, None, batch)
+                batch = []
+        if batch:
+            migrated += self._migrate_indexed(from_node, None, batch)
+        return migrated
+    
+    def _migrate_indexed(self, from_node: str, index_key: Optional[str], keys: List[str]) -> int:
+        """Migrate indexed sessions: one MGET, one pipelined write burst"""
+        migrated = 0
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        for key, session_data in zip(keys, self.redis.mget(keys)):
+            if not session_data:
+                if index_key:
+                    pipe.srem(index_key, key)  # expired
+                continue
+            try:
+                session = _loads(session_data)
+            except json.JSONDecodeError as e:
+                print(f"[FailoverManager] WARNING: Failed to decode session data for key {key}: {e}. Skipping migration for this session.")
+                continue
+            
+            if index_key:
+                pipe.srem(index_key, key)
+            if session.get('node_id') != from_node:
+                continue  # reassigned since it was indexed
+            session['node_id'] = 'migrating'
+            session['migrated_from'] = from_node
+            session['migrated_at'] = now
+            pipe.setex(key, 3600, _dumps(session))
+            migrated += 1
+        pipe.execute()
+        return migrated
+    
     def recover_node(self, node_id: str) -> bool:
         """Reintegrate a recovered node into cluster"""
         node_data = self.redis.hget('openclaw:cluster:nodes', node_id)
@@ -130,10 +194,11 @@ class FailoverManager:
             print(f"[FailoverManager] Node {node_id} not found in registry")
             return False
         
-        node_info = json.loads(node_data)
+        node_info = _loads(node_data)
         
         if node_info.get('state') != 'failed':
             print(f"[FailoverManager] Node {node_id} is not in failed state")
+            self.redis.srem(FAILED_NODES_KEY, node_id)
             return False
         
         # Mark as recovering
@@ -143,7 +208,6 @@ class FailoverManager:
             'failed_at': node_info.pop('failed_at', None),
             'reason': node_info.pop('fail_reason', None)
         }
-        self.redis.hset('openclaw:cluster:nodes', node_id, json.dumps(node_info))
         
         # Add recovery event
         log_entry = {
@@ -151,27 +215,55 @@ class FailoverManager:
             'node_id': node_id,
             'event': 'node_recovered'
         }
-        self.redis.xadd('openclaw:cluster:events', log_entry)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset('openclaw:cluster:nodes', node_id, _dumps(node_info))
+        pipe.srem(FAILED_NODES_KEY, node_id)
+        pipe.xadd('openclaw:cluster:events', log_entry)
+        pipe.execute()
         
         print(f"[FailoverManager] Node {node_id} marked for recovery")
         return True
     
     def get_failed_nodes(self) -> List[str]:
-        """Get list of failed nodes"""
-        nodes = self.redis.hgetall('openclaw:cluster:nodes')
-        failed = []
-        
-        for node_id, node_data in nodes.items():
-            info = json.loads(node_data)
-            if info.get('state') == 'failed':
-                failed.append(node_id)
-        
-        return failed
+        """Get list of failed nodes (one SMEMBERS on the failed-node set)"""
+        if not self._failed_backfilled:
+            self._backfill_failed_nodes()
+        return sorted(self.redis.smembers(FAILED_NODES_KEY))
+    
+    def _backfill_failed_nodes(self) -> None:
+        """
+        Reconcile the failed-node set with node status once per instance.
+        Every writer of node info removes its node from the set, so this only
+        picks up nodes marked failed before the set existed, and drops entries
+        left by nodes that recovered before their writers did that.
+        """
+        failed, healthy = [], []
+        for node_id, node_data in self.redis.hgetall('openclaw:cluster:nodes').items():
+            try:
+                state = _loads(node_data).get('state')
+            except (json.JSONDecodeError, ValueError, AttributeError):
+                continue
+            (failed if state == 'failed' else healthy).append(node_id)
+        pipe = self.redis.pipeline(transaction=False)
+        if failed:
+            pipe.sadd(FAILED_NODES_KEY, *failed)
+        if healthy:
+            pipe.srem(FAILED_NODES_KEY, *healthy)
+        pipe.execute()
+        self._failed_backfilled = True
     
     def health_check(self) -> Dict[str, Any]:
         """Run comprehensive health check"""
-        nodes = self.redis.hgetall('openclaw:cluster:nodes')
-        
+        return self._summarize(self.redis.hgetall('openclaw:cluster:nodes'))
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Failed nodes and health status derived from a single HGETALL"""
+        status = self._summarize(self.redis.hgetall('openclaw:cluster:nodes'))
+        failed = [node_id for node_id, info in status['nodes'].items() if info['state'] == 'failed']
+        return {'failed': failed, 'status': status}
+    
+    def _summarize(self, nodes: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the health_check status dict from raw node-registry entries"""
         status = {
             'total': len(nodes),
             'healthy': 0,
@@ -181,28 +273,25 @@ class FailoverManager:
             'nodes': {}
         }
         
+        states = Counter()
         for node_id, node_data in nodes.items():
-            info = json.loads(node_data)
+            info = _loads(node_data)
             state = info.get('state', 'unknown')
+            states[state] += 1
             
             status['nodes'][node_id] = {
                 'state': state,
                 'last_seen': info.get('last_seen'),
                 'capabilities': info.get('capabilities', [])
             }
-            
-            if state in ['leader', 'follower']:
-                status['healthy'] += 1
-            elif state == 'failed':
-                status['failed'] += 1
-            elif state == 'suspected':
-                status['suspected'] += 1
-            else:
-                status['unknown'] += 1
+        
+        status['healthy'] = states['leader'] + states['follower']
+        status['failed'] = states['failed']
+        status['suspected'] = states['suspected']
+        status['unknown'] = len(nodes) - status['healthy'] - status['failed'] - status['suspected']
         
         return status
 
-
 if __name__ == '__main__':
     # Test code
     print("FailoverManager module loaded")
@@ -7,20 +7,57 @@ OpenClaw Distributed Skill - Node Heartbeat Script
 配置从外部文件读取：
 - 通用配置: ../config/config.json
 - 敏感信息: ../config/secrets.json 或环境变量
+
+运行方式：
+- 单次: python3 heartbeat.py（由 cron 调度，每次发送一个心跳后退出）
+- 常驻: python3 heartbeat.py --daemon（复用一个连接，按 heartbeat_interval 循环）
 """
 
 import sys
 import os
+import re
+import atexit
+import queue
 import time
-import json
 import logging
 import logging.handlers
 from pathlib import Path
 
 # 添加脚本目录到路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from redis_client import RedisClient
+from redis_client import RedisClient, PreparedCommand, KEEPALIVE_OPTIONS
 from leader_election import LeaderElection
+from config_loader import load_json_cached
+from node_discovery import FAILED_NODES_KEY
+from serialization import dumps as _dumps
+
+# 上次序列化的 node_info：(is_leader, current_leader) -> JSON bytes
+_node_info_cache = (None, b'')
+
+# 上次写入 openclaw:cluster:nodes 的 (node_info, 时间)；未变化时每 NODE_INFO_REFRESH 秒才重写
+_node_info_sent = (b'', 0.0)
+NODE_INFO_REFRESH = 60
+
+# hb:<id> 的 JSON 模板，发送时只填入时间戳、Leader 状态和 TTL
+_HEARTBEAT_TEMPLATE = b'{"timestamp":%.6f,"is_leader":%s,"leader_ttl":%d}'
+
+
+def _node_info_json(node_id, is_leader, current_leader) -> bytes:
+    """node_info 只在 Leader 状态变化时重新序列化，其余心跳复用上次的结果"""
+    global _node_info_cache
+    key = (node_id, is_leader, current_leader)
+    if _node_info_cache[0] != key:
+        _node_info_cache = (key, _dumps({
+            'node_id': node_id,
+            'is_leader': is_leader,
+            'current_leader': current_leader,
+        }))
+    return _node_info_cache[1]
+
+
+def _heartbeat_json(timestamp, is_leader, leader_ttl) -> bytes:
+    return _HEARTBEAT_TEMPLATE % (timestamp, b'true' if is_leader else b'false', int(leader_ttl))
+
 
 # 获取项目根目录
 SCRIPT_DIR = Path(__file__).parent
@@ -28,12 +65,18 @@ PROJECT_DIR = SCRIPT_DIR.parent
 CONFIG_DIR = PROJECT_DIR / 'config'
 LOG_DIR = PROJECT_DIR / 'logs'
 
+# 心跳有序集合索引：member = node_id, score = 最近心跳时间（epoch 秒）
+HB_INDEX_KEY = 'openclaw:cluster:hb'
+HB_INDEX_RETENTION = 3600
+
+# 模板变量 ${VAR_NAME}（导入时编译一次）
+_ENV_RE = re.compile(r'^\$\{([^}]+)\}$')
+
 def load_config():
     """加载通用配置"""
-    config_path = CONFIG_DIR / 'config.json'
-    if config_path.exists():
-        with open(config_path, 'r') as f:
-            return json.load(f)
+    config = load_json_cached(CONFIG_DIR / 'config.json')
+    if config is not None:
+        return config
     # 默认配置
     return {
         "node": {
@@ -70,9 +113,10 @@ def validate_config(config):
 
 def _resolve_env_var(value: str) -> str:
     """解析模板变量，如 ${VAR_NAME} 替换为环境变量值"""
-    import re
-    # 匹配 ${VAR_NAME} 格式
-    match = re.match(r'^\$\{(.+)\}$', str(value))
+    # 非字符串或不含 ${ 的普通值直接返回，不进入正则
+    if not isinstance(value, str) or '${' not in value:
+        return value
+    match = _ENV_RE.match(value)
     if match:
         env_name = match.group(1)
         env_value = os.getenv(env_name)
@@ -87,22 +131,24 @@ def load_secrets():
 
     secrets_path = CONFIG_DIR / 'secrets.json'
 
-    # 首先检查 secrets.json 是否存在
-    if not secrets_path.exists():
+    # 首先检查 secrets.json 是否存在（stat 结果同时作为缓存指纹）
+    try:
+        st = os.stat(secrets_path)
+    except FileNotFoundError:
         raise RuntimeError(f"secrets.json 不存在: {secrets_path}")
 
     try:
-        with open(secrets_path, 'r') as f:
-            data = json.load(f)
-            redis_data = data.get('redis', {})
-
-            # 从 secrets.json 读取基础配置，并解析模板变量
-            redis_config = {
-                'host': _resolve_env_var(redis_data.get('host', '')),
-                'port': redis_data.get('port', 0),
-                'password': _resolve_env_var(redis_data.get('password', '')),
-                'db': redis_data.get('db', 0)
-            }
+        data = load_json_cached(secrets_path, st)
+        redis_data = data.get('redis', {})
+
+        # 从 secrets.json 读取基础配置，并解析模板变量
+        redis_config = {
+            'host': _resolve_env_var(redis_data.get('host', '')),
+            # secrets.json 未给出端口/DB 时才读取环境变量
+            'port': int(redis_data.get('port') or os.getenv('REDIS_PORT', 11877)),
+            'password': _resolve_env_var(redis_data.get('password', '')),
+            'db': int(redis_data.get('db') or os.getenv('REDIS_DB', 0))
+        }
 
     except Exception as e:
         raise RuntimeError(f"无法读取 secrets.json: {e}")
@@ -111,20 +157,6 @@ def load_secrets():
     if not all([redis_config['host'], redis_config['password']]):
         raise RuntimeError("Redis 配置不完整：secrets.json 中缺少 host 或 password")
 
-    # 环境变量作为可选覆盖（仅在 secrets.json 值为空时使用）
-    if not redis_config['host']:
-        redis_config['host'] = os.getenv('REDIS_HOST')
-    if not redis_config['port']:
-        redis_config['port'] = int(os.getenv('REDIS_PORT', 11877))
-    if not redis_config['password']:
-        redis_config['password'] = os.getenv('REDIS_PASSWORD')
-    if not redis_config.get('db'):
-        redis_config['db'] = int(os.getenv('REDIS_DB', 0))
-
-    # 确保端口是整数
-    if isinstance(redis_config['port'], str):
-        redis_config['port'] = int(redis_config['port'])
-
     return redis_config
 
 # 加载配置
@@ -137,10 +169,14 @@ REDIS_CONFIG = secrets
 NODE_ID = config['node']['id']
 assert NODE_ID, "node.id 不能为空！请在 config.json 中设置或设置 OPENCLAW_NODE_ID 环境变量"
 HEARTBEAT_TTL = config['node']['heartbeat_ttl']
+HEARTBEAT_INTERVAL = config['node'].get('heartbeat_interval', 10)
 LEADER_TTL = config['node'].get('leader_ttl', 30)
 RETRY_COUNT = config['node']['retry_count']
 RETRY_DELAY = config['node']['retry_delay']
 
+# SETEX hb:<id> <ttl> 的前缀导入时编码一次，每次心跳只编码 JSON 负载
+_HB_SETEX = PreparedCommand(['SETEX', f'hb:{NODE_ID}', HEARTBEAT_TTL])
+
 # 确保日志目录存在
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -151,6 +187,8 @@ logger.setLevel(getattr(logging, config['logging']['level']))
 if logger.handlers:
     logger.handlers.clear()
 
+log_handlers = []
+
 # 1. Syslog 处理器
 if Path('/dev/log').exists():
     try:
@@ -158,7 +196,7 @@ if Path('/dev/log').exists():
         syslog_handler.setLevel(logging.INFO)
         syslog_formatter = logging.Formatter('clawster: %(message)s')
         syslog_handler.setFormatter(syslog_formatter)
-        logger.addHandler(syslog_handler)
+        log_handlers.append(syslog_handler)
     except Exception:
         pass
 
@@ -174,44 +212,77 @@ file_formatter = logging.Formatter(
     datefmt='%Y-%m-%d %H:%M:%S'
 )
 file_handler.setFormatter(file_formatter)
-logger.addHandler(file_handler)
+log_handlers.append(file_handler)
 
 # 3. 控制台处理器
 console_handler = logging.StreamHandler(sys.stdout)
 console_handler.setLevel(logging.INFO)
 console_formatter = logging.Formatter('%(asctime)s %(levelname)s: %(message)s')
 console_handler.setFormatter(console_formatter)
-logger.addHandler(console_handler)
+log_handlers.append(console_handler)
+
+# 心跳路径上只做一次 queue.put_nowait；格式化、文件写入（含轮转 rename）和
+# syslog 套接字写入都在 QueueListener 后台线程完成。退出时 stop() 冲刷队列。
+log_queue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(log_queue))
+log_listener = logging.handlers.QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+
+# 按连接复用的 LeaderElection（常驻模式下整个进程只构造一次）
+_election = None
 
 
 def get_leader_info(client: RedisClient) -> dict:
     """获取当前 Leader 信息"""
+    global _election
     try:
-        from leader_election import LeaderElection
-        election = LeaderElection(node_id=NODE_ID, redis_client=client, lock_ttl=LEADER_TTL)
-        return election.get_info()
+        if _election is None or _election.redis is not client:
+            _election = LeaderElection(node_id=NODE_ID, redis_client=client, lock_ttl=LEADER_TTL)
+        return _election.get_info()
     except Exception as e:
         logger.debug(f"获取 Leader 信息失败: {e}")
         return {'current_leader': None, 'is_leader': False}
 
 
-def send_heartbeat(retry_count=RETRY_COUNT, retry_delay=RETRY_DELAY):
-    """发送心跳到 Redis，包含 Leader 状态"""
-    attempt = 0
-    client = RedisClient(
+def create_client() -> RedisClient:
+    """
+    心跳连接：开启 TCP keepalive 与 30s 空闲健康检查，
+    常驻模式下死连接在下一次心跳前即被发现并重连，无需完整的重试周期。
+    """
+    return RedisClient(
         host=REDIS_CONFIG['host'],
         port=REDIS_CONFIG['port'],
         password=REDIS_CONFIG['password'],
         db=REDIS_CONFIG['db'],
-        socket_timeout=5
+        socket_timeout=5,
+        socket_keepalive=True,
+        socket_keepalive_options=KEEPALIVE_OPTIONS,
+        health_check_interval=30
     )
 
+
+def send_heartbeat(retry_count=RETRY_COUNT, retry_delay=RETRY_DELAY, client=None):
+    """
+    发送心跳到 Redis，包含 Leader 状态
+    
+    client: 复用的连接（常驻模式）；不传时为本次心跳新建并在结束时关闭。
+    复用的连接出错时会被关闭，下一条命令自动重连。
+    """
+    global _node_info_sent
+    attempt = 0
+    owned = client is None
+    if owned:
+        client = create_client()
+
     while attempt < retry_count:
         try:
             attempt += 1
             logger.debug(f"心跳尝试 {attempt}/{retry_count}...")
 
-            client.connect()
+            if owned:
+                client.connect()
 
             # 获取 Leader 信息
             leader_info = get_leader_info(client)
@@ -220,26 +291,29 @@ def send_heartbeat(retry_count=RETRY_COUNT, retry_delay=RETRY_DELAY):
             leader_ttl = leader_info.get('ttl_remaining', -1)
 
             # 准备心跳数据
-            heartbeat_data = {
-                'timestamp': time.time(),
-                'is_leader': is_leader,
-                'leader_ttl': leader_ttl,
-            }
-
-            node_info = {
-                'node_id': NODE_ID,
-                'is_leader': is_leader,
-                'current_leader': current_leader,
-            }
-
-            # 设置节点信息和心跳
-            client.hset('openclaw:cluster:nodes', NODE_ID, json.dumps(node_info))
-            client.setex(f'hb:{NODE_ID}', HEARTBEAT_TTL, json.dumps(heartbeat_data))
+            now = time.time()
+
+            # 设置节点信息和心跳（一次往返）
+            node_info = _node_info_json(NODE_ID, is_leader, current_leader)
+            refresh = node_info != _node_info_sent[0] or now - _node_info_sent[1] >= NODE_INFO_REFRESH
+            pipe = client.pipeline(transaction=False)
+            _HB_SETEX.call(pipe, _heartbeat_json(now, is_leader, leader_ttl))
+            # 心跳索引（score = 心跳时间），存活查询只需一次 ZCOUNT
+            pipe.zadd(HB_INDEX_KEY, {NODE_ID: now})
+            if refresh:
+                # 节点信息只在 Leader 状态变化或每分钟写一次；顺带清理 1 小时前的索引条目
+                pipe.hset('openclaw:cluster:nodes', NODE_ID, node_info)
+                pipe.srem(FAILED_NODES_KEY, NODE_ID)  # 覆盖了 failed 记录，同步移出故障集合
+                pipe.zremrangebyscore(HB_INDEX_KEY, '-inf', f"({now - HB_INDEX_RETENTION}")
+            pipe.execute()
+            if refresh:
+                _node_info_sent = (node_info, now)
 
             status_emoji = '👑' if is_leader else '📡'
             logger.info(f"{status_emoji} 心跳发送成功 | is_leader={is_leader} | leader_ttl={leader_ttl}s")
 
-            client.close()
+            if owned:
+                client.close()
             return True, is_leader
 
         except Exception as e:
@@ -254,8 +328,55 @@ def send_heartbeat(retry_count=RETRY_COUNT, retry_delay=RETRY_DELAY):
     return False, False
 
 
+def run_daemon(interval=HEARTBEAT_INTERVAL, max_backoff=60, watch_leader=False):
+    """
+    常驻循环：一个连接发送所有心跳，失败时指数退避。
+    watch_leader 时同一进程、同一连接内每轮先执行一次 Leader 选举/续约，
+    取代 cron 每 10 秒分别拉起 heartbeat.py 与 leader_watcher.py --once。
+    """
+    global _election
+    logger.info(f"心跳守护进程启动，节点: {NODE_ID}，间隔 {interval}s")
+    client = create_client()
+    watcher = None
+    if watch_leader:
+        from leader_watcher import LeaderWatcher
+        watcher = LeaderWatcher(node_id=NODE_ID, redis_client=client,
+                                lock_ttl=LEADER_TTL, check_interval=interval, renew_threshold=None)
+        # 心跳上报的 Leader 状态直接取自选举实例
+        _election = watcher.election
+    delay = interval
+    try:
+        while True:
+            if watcher is not None:
+                try:
+                    watcher.run_once()
+                except Exception as e:
+                    logger.warning(f"Leader 选举出错: {e}")
+            success, _ = send_heartbeat(client=client)
+            delay = interval if success else min(delay * 2, max_backoff)
+            time.sleep(delay)
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        client.close()
+
+
 def main():
     """主函数"""
+    import argparse
+    parser = argparse.ArgumentParser(description='Clawster node heartbeat')
+    parser.add_argument('--daemon', action='store_true', help='常驻运行，按 heartbeat_interval 循环发送心跳')
+    parser.add_argument('--leader', action='store_true',
+                        help='与 --daemon 一起使用：在同一连接上同时执行 Leader 选举（替代 leader_watcher.py --once 的 cron 任务）')
+    args = parser.parse_args()
+
+    if args.daemon:
+        try:
+            run_daemon(watch_leader=args.leader)
+        except KeyboardInterrupt:
+            logger.info("心跳守护进程已停止")
+        return
+
     logger.debug(f"开始执行心跳脚本，节点: {NODE_ID}")
 
     success, is_leader = send_heartbeat()
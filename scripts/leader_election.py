@@ -2,12 +2,35 @@
 """
 OpenClaw Distributed - Leader Election (Atomic Version)
 基于 Lua 脚本确保分布式锁的续约与释放具备原子性，防止脑裂。
+Redis >= 8.4 时续约/释放改用原生 SET ... IFEQ / DELEX ... IFEQ（INFO server 探测，不支持时自动回退到脚本）。
+Redis >= 7 时脚本以函数库 openclaw 的形式 FCALL 调用（持久化、随副本复制），否则 EVALSHA。
 """
-import json
+import functools
+import hashlib
+import random
 import time
 import uuid
-from typing import Optional, Dict, Any, Callable, List
+from typing import Optional, Dict, Any, Callable, List, Tuple
+import redis
 from common_redis import get_redis_client
+from serialization import dumps as _dumps
+
+# _native_cas 的哨兵：原生命令不可用，使用 Lua 脚本
+_NO_NATIVE = object()
+
+
+def _function_library(name: str, functions: Dict[str, str]) -> str:
+    """把 {脚本源码: 函数名} 组装成 Redis Functions 库代码（#!lua name=...）"""
+    parts = [f"#!lua name={name}"]
+    for script, function_name in functions.items():
+        parts.append(f"redis.register_function('{function_name}', function(KEYS, ARGV)\n{script}\nend)")
+    return "\n".join(parts) + "\n"
+
+
+@functools.lru_cache(maxsize=None)
+def _script_sha(script: str) -> str:
+    """Lua 脚本的 SHA1（与 SCRIPT LOAD 返回值一致），进程内每个脚本只计算一次"""
+    return hashlib.sha1(script.encode()).hexdigest()
 
 
 class LeaderElection:
@@ -17,6 +40,7 @@ class LeaderElection:
 
     LEADER_LOCK_KEY = 'openclaw:cluster:leader_lock'
     HISTORY_KEY = 'openclaw:cluster:leader_history'
+    HISTORY_MAX = 100
 
     # Lua 脚本定义
     LUA_RENEW = """
@@ -35,6 +59,47 @@ class LeaderElection:
     end
     """
 
+    # 获取锁成功时原子写入选举历史
+    # KEYS[1]: 锁, KEYS[2]: 历史; ARGV[1]: 锁值, ARGV[2]: TTL(ms), ARGV[3]: 历史记录 JSON, ARGV[4]: LTRIM 末位
+    LUA_ACQUIRE = """
+    if redis.call("SET", KEYS[1], ARGV[1], "NX", "PX", ARGV[2]) then
+        redis.call("LPUSH", KEYS[2], ARGV[3])
+        redis.call("LTRIM", KEYS[2], 0, ARGV[4])
+        return 1
+    else
+        return 0
+    end
+    """
+
+    # 一次往返完成一轮选举：锁属于本节点则续约，无锁则获取（并写历史），否则保持 Follower
+    # KEYS[1]: 锁, KEYS[2]: 历史; ARGV[1]: 本地持有的锁值（无则空串）, ARGV[2]: 新锁值,
+    # ARGV[3]: TTL(ms), ARGV[4]: 历史记录 JSON, ARGV[5]: LTRIM 末位
+    # 返回 {状态, 剩余 PTTL, 锁值}，状态为 leader / acquired / follower
+    LUA_TICK = """
+    local cur = redis.call("GET", KEYS[1])
+    if cur and cur == ARGV[1] then
+        redis.call("PEXPIRE", KEYS[1], ARGV[3])
+        return {"leader", tonumber(ARGV[3]), cur}
+    end
+    if not cur then
+        redis.call("SET", KEYS[1], ARGV[2], "PX", ARGV[3])
+        redis.call("LPUSH", KEYS[2], ARGV[4])
+        redis.call("LTRIM", KEYS[2], 0, ARGV[5])
+        return {"acquired", tonumber(ARGV[3]), ARGV[2]}
+    end
+    return {"follower", redis.call("PTTL", KEYS[1]), cur}
+    """
+
+    # Redis >= 7：上面的脚本同时注册为函数库 openclaw（FUNCTION LOAD），随 RDB/AOF 持久化并复制到副本，
+    # 重启或故障切换后无需重新加载；脚本体直接作为 function(KEYS, ARGV) 的函数体
+    FUNCTIONS = {
+        LUA_ACQUIRE: 'openclaw_acquire',
+        LUA_RENEW: 'openclaw_renew',
+        LUA_RELEASE: 'openclaw_release',
+        LUA_TICK: 'openclaw_tick',
+    }
+    FUNCTION_LIBRARY = _function_library('openclaw', FUNCTIONS)
+
     def __init__(self,
                  node_id: Optional[str] = None,
                  redis_client: Optional[redis.Redis] = None,
@@ -48,6 +113,9 @@ class LeaderElection:
         self._lock_acquired_at: Optional[float] = None
         self._callbacks: List[Callable] = []
         self._auto_release = auto_release
+        self._native_cas_ok: Optional[bool] = None
+        self._version: Optional[tuple] = None
+        self._functions_ok: Optional[bool] = None
 
         if redis_client:
             self.redis = redis_client
@@ -62,24 +130,100 @@ class LeaderElection:
         if self._is_leader and self._auto_release:
             self.release_leadership()
         if hasattr(self, '_owned_client') and self._owned_client:
+            self.redis.close()
+
+    def _run_script(self, script: str, keys: List[str], args: List[Any]):
+        """
+        Redis >= 7 时 FCALL 调用函数库中的同名函数，否则（或函数不可用时）EVALSHA
+        """
+        if self._supports_functions():
+            try:
+                return self._fcall(self.FUNCTIONS[script], keys, args)
+            except redis.exceptions.ResponseError as e:
+                # 函数被禁用 / 无权限：本实例此后改用 EVALSHA
+                print(f"[LeaderElection] Redis Functions 不可用，改用 EVALSHA: {e}")
+                self._functions_ok = False
+        return self._evalsha(script, keys, args)
+
+    def _supports_functions(self) -> bool:
+        if self._functions_ok is None:
+            self._functions_ok = self._server_version() >= (7, 0, 0)
+        return self._functions_ok
+
+    def _fcall(self, name: str, keys: List[str], args: List[Any]):
+        """FCALL；函数库未安装（首次使用 / FUNCTION FLUSH）时 FUNCTION LOAD REPLACE 一次后重试"""
+        try:
+            return self.redis.execute_command('FCALL', name, len(keys), *keys, *args)
+        except redis.exceptions.ResponseError as e:
+            if 'function not found' not in str(e).lower():
+                raise
+            self.redis.execute_command('FUNCTION', 'LOAD', 'REPLACE', self.FUNCTION_LIBRARY)
+            return self.redis.execute_command('FCALL', name, len(keys), *keys, *args)
+
+    def _evalsha(self, script: str, keys: List[str], args: List[Any]):
+        """
+        EVALSHA 执行脚本，只发送 40 字节的 SHA 而非完整源码。SHA 在本地计算
+        （与 Redis 相同的 SHA1），服务端已缓存该脚本时无需 SCRIPT LOAD；
+        收到 NOSCRIPT（首次使用 / 重启 / SCRIPT FLUSH）时加载一次后重试。
+        """
+        sha = _script_sha(script)
+        try:
+            return self.redis.evalsha(sha, len(keys), *keys, *args)
+        except Exception as e:
+            if not isinstance(e, redis.exceptions.NoScriptError) and 'NOSCRIPT' not in str(e):
+                raise
+            self.redis.script_load(script)
+            return self.redis.evalsha(sha, len(keys), *keys, *args)
+
+    def _server_version(self) -> tuple:
+        """INFO server 中的 redis_version，每个实例只探测一次；失败视为 (0,)"""
+        if self._version is None:
+            try:
+                version = self.redis.info('server').get('redis_version', '0')
+                self._version = tuple(int(p) for p in version.split('.')[:3])
+            except Exception:
+                self._version = (0,)
+        return self._version
+
+    def _supports_native_cas(self) -> bool:
+        """Redis >= 8.4 提供 SET ... IFEQ 与 DELEX ... IFEQ"""
+        if self._native_cas_ok is None:
+            self._native_cas_ok = self._server_version() >= (8, 4, 0)
+        return self._native_cas_ok
+
+    def _native_cas(self, *command):
+        """
+        以原生单命令执行比较并设置/删除，不经 Lua 解释器；
+        服务端不支持（版本过低、代理拒绝该命令）时返回 _NO_NATIVE，调用方回退到 EVALSHA。
+        """
+        if not self._supports_native_cas():
+            return _NO_NATIVE
+        try:
+            return self.redis.execute_command(*command)
+        except redis.exceptions.ResponseError:
+            self._native_cas_ok = False
+            return _NO_NATIVE
 
     def try_acquire_leadership(self) -> bool:
-        """尝试获取 Leader 锁: SET key value NX EX ttl"""
+        """尝试获取 Leader 锁：SET NX PX 与选举历史写入在同一个 Lua 脚本中（一次往返）"""
         self._lock_value = f"{self.node_id}:{int(time.time() * 1000)}"
+        record = {
+            'timestamp': time.time(),
+            'node_id': self.node_id,
+            'event': 'elected',
+            'is_leader': True,
+        }
 
         try:
-            # 使用统一版 RedisClient 的 SET 命令，支持 NX 和 EX
-            result = self.redis.set(
-                self.LEADER_LOCK_KEY,
-                self._lock_value,
-                nx=True,
-                ex=self.lock_ttl
+            result = self._run_script(
+                self.LUA_ACQUIRE,
+                [self.LEADER_LOCK_KEY, self.HISTORY_KEY],
+                [self._lock_value, self.lock_ttl * 1000, _dumps(record), self.HISTORY_MAX - 1]
             )
 
-            if result == 'OK':
+            if result == 1:
                 self._is_leader = True
                 self._lock_acquired_at = time.time()
-                self._record_change('elected')
                 return True
             return False
         except Exception as e:
@@ -87,16 +231,22 @@ class LeaderElection:
             return False
 
     def renew_leadership(self) -> bool:
-        """使用 Lua 脚本原子续约"""
+        """原子续约：Redis >= 8.4 用 SET IFEQ，否则 Lua 脚本"""
         if not self._is_leader or not self._lock_value:
             return False
 
         try:
             # TTL 转换为毫秒
             ttl_ms = self.lock_ttl * 1000
-            result = self.redis.eval(self.LUA_RENEW, 1, self.LEADER_LOCK_KEY, self._lock_value, ttl_ms)
+            result = self._native_cas('SET', self.LEADER_LOCK_KEY, self._lock_value,
+                                      'IFEQ', self._lock_value, 'PX', ttl_ms)
+            if result is _NO_NATIVE:
+                result = self._run_script(self.LUA_RENEW, [self.LEADER_LOCK_KEY], [self._lock_value, ttl_ms])
+            else:
+                result = 1 if result else 0
 
             if result == 1:
+                self._lock_acquired_at = time.time()
                 return True
             else:
                 self._lose_leadership('renew_failed_or_lost')
@@ -105,13 +255,62 @@ class LeaderElection:
             print(f"[LeaderElection] 续约失败: {e}")
             return False
 
+    def tick(self) -> Tuple[str, int, Optional[str]]:
+        """
+        一轮选举只用一次往返：续约 / 竞选 / 查询锁状态合并在 LUA_TICK 中原子执行，
+        取代 is_leader() + try_acquire_leadership() / renew_leadership() 的多次调用。
+
+        Returns:
+            (状态, 锁剩余 PTTL 毫秒, 当前锁值)；状态为 leader（已续约）、acquired（刚当选）、
+            follower，出错时为 error
+        """
+        candidate = f"{self.node_id}:{int(time.time() * 1000)}"
+        record = {
+            'timestamp': time.time(),
+            'node_id': self.node_id,
+            'event': 'elected',
+            'is_leader': True,
+        }
+        try:
+            state, pttl, holder = self._run_script(
+                self.LUA_TICK,
+                [self.LEADER_LOCK_KEY, self.HISTORY_KEY],
+                [self._lock_value or '', candidate, self.lock_ttl * 1000,
+                 _dumps(record), self.HISTORY_MAX - 1]
+            )
+        except Exception as e:
+            print(f"[LeaderElection] 选举轮次失败: {e}")
+            return 'error', -1, None
+
+        if isinstance(state, bytes):
+            state = state.decode()
+        if isinstance(holder, bytes):
+            holder = holder.decode()
+        pttl = int(pttl)
+        if state == 'follower' and not self._is_leader and holder and holder.startswith(f"{self.node_id}:"):
+            # 状态恢复：锁仍是本节点（如进程重启）所持有，接管后下一轮即续约
+            state = 'leader'
+        if state == 'follower':
+            if self._is_leader:
+                self._lose_leadership('renew_failed_or_lost')
+        else:
+            self._lock_value = holder
+            self._is_leader = True
+            self._lock_acquired_at = time.time() - (self.lock_ttl - pttl / 1000) if pttl > 0 else time.time()
+        return state, pttl, holder
+
     def release_leadership(self) -> bool:
-        """使用 Lua 脚本原子释放"""
+        """
+        原子释放：Redis >= 8.4 用 DELEX IFEQ，否则 Lua 脚本比较并删除。
+        两者都不可用时不做非原子的删除，锁在 TTL 后自然过期。
+        """
         if not self._is_leader or not self._lock_value:
             return True
 
         try:
-            result = self.redis.eval(self.LUA_RELEASE, 1, self.LEADER_LOCK_KEY, self._lock_value)
+            result = self._native_cas('DELEX', self.LEADER_LOCK_KEY, 'IFEQ', self._lock_value)
+            if result is _NO_NATIVE:
+                result = self._run_script(self.LUA_RELEASE, [self.LEADER_LOCK_KEY], [self._lock_value])
             self._lose_leadership('released')
             return True
         except Exception as e:
@@ -129,6 +328,48 @@ class LeaderElection:
             print(f"[LeaderElection] get_current_leader error: {e}")
             return None
 
+    def get_ttl(self) -> int:
+        """Leader 锁剩余 TTL（秒）；无锁返回 -2，出错返回 -1"""
+        try:
+            return int(self.redis.ttl(self.LEADER_LOCK_KEY))
+        except Exception as e:
+            print(f"[LeaderElection] get_ttl error: {e}")
+            return -1
+
+    def get_lock_snapshot(self):
+        """
+        一次往返读取锁值与剩余 PTTL（毫秒；-2 无锁）。
+        与 is_leader() 一样做状态恢复：锁值属于本节点时接管 Leader 状态。
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self.LEADER_LOCK_KEY)
+        pipe.pttl(self.LEADER_LOCK_KEY)
+        value, pttl = pipe.execute()
+        if isinstance(value, bytes):
+            value = value.decode()
+        pttl = int(pttl)
+        if not self._is_leader and value and value.startswith(f"{self.node_id}:"):
+            self._lock_value = value
+            self._is_leader = True
+            # 由剩余 PTTL 反推上次获取/续约时刻，供调用方本地安排续约
+            self._lock_acquired_at = time.time() - (self.lock_ttl - pttl / 1000) if pttl > 0 else None
+        return value, pttl
+
+    def get_info(self) -> Dict[str, Any]:
+        """当前 Leader、本节点是否为 Leader 及锁剩余 TTL（一次往返）"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(self.LEADER_LOCK_KEY)
+        pipe.ttl(self.LEADER_LOCK_KEY)
+        value, ttl = pipe.execute()
+        current_leader = value.split(':')[0] if value else None
+        return {
+            'node_id': self.node_id,
+            'current_leader': current_leader,
+            'is_leader': current_leader == self.node_id,
+            'ttl_remaining': int(ttl),
+            'lock_ttl': self.lock_ttl,
+        }
+
     def is_leader(self) -> bool:
         """检查当前节点是否为 Leader (含状态恢复)"""
         if self._is_leader:
@@ -162,8 +403,12 @@ class LeaderElection:
                 'event': event,
                 'is_leader': self._is_leader,
             }
-            self.redis.lpush(self.HISTORY_KEY, json.dumps(record))
-            self.redis.ltrim(self.HISTORY_KEY, 0, 99)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.lpush(self.HISTORY_KEY, _dumps(record))
+            # 历史列表只需大致有界：约每 16 次事件裁剪一次
+            if random.randrange(16) == 0:
+                pipe.ltrim(self.HISTORY_KEY, 0, self.HISTORY_MAX - 1)
+            pipe.execute()
         except:
             pass
 
@@ -11,6 +11,7 @@ Leader 选举守护进程，定期竞争/续约 Leader 位置
 """
 
 import json
+import random
 import time
 import sys
 import os
@@ -22,7 +23,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from redis_client import RedisClient
 from leader_election import LeaderElection
-from config_loader import get_redis_config, get_node_config
+from config_loader import get_redis_config, get_node_config, load_json_cached
 
 
 class LeaderWatcher:
@@ -30,24 +31,29 @@ class LeaderWatcher:
     Leader 选举监控守护进程
     """
 
+    BACKOFF_MIN_MS = 50
+    BACKOFF_MAX_MS = 2000
+
     def __init__(self,
                  node_id: Optional[str] = None,
                  redis_config: Optional[Dict[str, Any]] = None,
                  lock_ttl: int = 60,
                  check_interval: float = 10.0,
-                 renew_threshold: float = 0.5):
+                 renew_threshold: float = 0.5,
+                 redis_client: Optional[RedisClient] = None):
         """
         初始化 Leader Watcher
 
         Args:
             node_id: 节点 ID，默认自动生成
             redis_config: Redis 连接配置
+            redis_client: 复用的连接（如心跳守护进程的连接），传入时忽略 redis_config
             lock_ttl: 锁 TTL (秒)
             check_interval: 检查间隔 (秒)，默认 10 秒
             renew_threshold: 续约阈值 (TTL 剩余比例)，默认 50% 时续约
         """
         self.node_id = node_id
-        self.redis_config = redis_config or self._load_redis_config()
+        self.redis_config = redis_config or (None if redis_client else self._load_redis_config())
         
         # 先加载配置
         config = self._load_config()
@@ -77,13 +83,18 @@ class LeaderWatcher:
         # 注意：auto_release=False 防止 --once 模式下自动释放锁
         self.election = LeaderElection(
             node_id=self.node_id,
+            redis_client=redis_client,
             redis_config=self.redis_config,
-            lock_ttl=lock_ttl,
+            lock_ttl=self.lock_ttl,
             auto_release=False
         )
 
         self.node_id = self.election.node_id
         self._running = False
+        self._lock_events = None  # 锁键的 keyspace 通知订阅（Follower 等待用）
+        self._warned_notify = False
+        # 竞选冲突退避（毫秒）：连续失败时在 [0, backoff] 内随机等待并翻倍，成功或观察到健康 Leader 时复位
+        self._backoff_ms = self.BACKOFF_MIN_MS
 
     def _load_config(self) -> Dict[str, Any]:
         """从配置文件加载 Leader 选举配置"""
@@ -93,9 +104,10 @@ class LeaderWatcher:
             Path('~/clawd/clawster/config/config.json'),
         ]
         for path in config_paths:
-            if path.exists():
-                with open(path) as f:
-                    return json.load(f)
+            # 二进制读取 + orjson（若已安装）解析，按 mtime 缓存
+            data = load_json_cached(path)
+            if data is not None:
+                return data
         return {}
 
     def _load_redis_config(self) -> Dict[str, Any]:
@@ -104,44 +116,55 @@ class LeaderWatcher:
         redis_cfg['socket_timeout'] = 5.0
         return redis_cfg
 
-    def _should_renew(self) -> bool:
-        """判断是否应该续约"""
-        ttl = self.election.get_ttl()
-        # TTL 小于阈值比例时续约 (默认 50%)
-        threshold_seconds = self.lock_ttl * self.renew_threshold
-        return ttl < threshold_seconds
+    def _next_renew_at(self) -> float:
+        """
+        本地计算的续约时刻：锁 TTL 降到 lock_ttl * renew_threshold 时，
+        即获取/上次续约后 lock_ttl * (1 - renew_threshold) 秒；时间未知时立即续约
+        """
+        acquired_at = self.election._lock_acquired_at
+        if acquired_at is None:
+            return 0.0
+        return acquired_at + self.lock_ttl * (1 - self.renew_threshold)
 
     def run_once(self) -> bool:
         """
         执行一次 Leader 选举逻辑
 
+        Leader 按本地续约时刻判断，未到续约点时不访问 Redis；
+        Follower 一次往返读取锁值与 TTL，后续判断均基于该快照。
+
         Returns:
             bool: 当前是否为 Leader
         """
-        if self.election.is_leader():
-            # 当前是 Leader，检查是否需要续约
-            if self._should_renew():
-                success = self.election.renew_leadership()
-                if success:
-                    print(f"[LeaderWatcher] ✅ 续约成功 | node={self.node_id} | ttl={self.election.get_ttl()}s")
-                else:
-                    print(f"[LeaderWatcher] ❌ 续约失败，失去 Leadership | node={self.node_id}")
-                    # 尝试重新竞选
-                    return self._try_elect()
-            return True
-        else:
-            # 不是 Leader，尝试竞选
-            return self._try_elect()
-
-    def _try_elect(self) -> bool:
-        """尝试竞选 Leader"""
-        current_leader = self.election.get_current_leader()
+        if not self.election._is_leader:
+            value, pttl = self.election.get_lock_snapshot()
+            if not self.election._is_leader:
+                # 不是 Leader，尝试竞选
+                return self._try_elect(value, pttl)
+
+        # 当前是 Leader，到续约点时续约
+        if time.time() >= self._next_renew_at():
+            success = self.election.renew_leadership()
+            if success:
+                print(f"[LeaderWatcher] ✅ 续约成功 | node={self.node_id} | ttl={self.lock_ttl}s")
+            else:
+                print(f"[LeaderWatcher] ❌ 续约失败，失去 Leadership | node={self.node_id}")
+                # 尝试重新竞选
+                return self._try_elect()
+        return True
+
+    def _try_elect(self, value: Optional[str] = None, pttl: Optional[int] = None) -> bool:
+        """尝试竞选 Leader（可传入 run_once 的锁快照，省去重复读取）"""
+        if pttl is None:
+            value, pttl = self.election.get_lock_snapshot()
+        current_leader = value.split(':')[0] if value else None
         
         if current_leader:
             # 有 Leader，检查是否存活
-            ttl = self.election.get_ttl()
-            if ttl > 0:
+            ttl = (pttl + 500) // 1000 if pttl > 0 else pttl
+            if pttl > 0:
                 print(f"[LeaderWatcher] ℹ️ 当前 Leader: {current_leader} (TTL: {ttl}s)，保持 Follower 状态")
+                self._backoff_ms = self.BACKOFF_MIN_MS
                 return False
             else:
                 print(f"[LeaderWatcher] ⚠️ Leader 锁已过期，尝试竞选...")
@@ -152,7 +175,11 @@ class LeaderWatcher:
         success = self.election.try_acquire_leadership()
         if success:
             print(f"[LeaderWatcher] 🎉 竞选成功！节点 {self.node_id} 成为 Leader")
+            self._backoff_ms = self.BACKOFF_MIN_MS
         else:
+            # 多节点同时竞选时随机退避，错开下一轮 SET NX
+            time.sleep(random.uniform(0, self._backoff_ms) / 1000)
+            self._backoff_ms = min(self._backoff_ms * 2, self.BACKOFF_MAX_MS)
             # 竞选失败，可能其他节点抢先了
             new_leader = self.election.get_current_leader()
             if new_leader:
@@ -184,7 +211,7 @@ class LeaderWatcher:
                     break
 
                 # 等待下一次检查
-                time.sleep(self.check_interval)
+                self._wait()
 
             except KeyboardInterrupt:
                 print(f"[LeaderWatcher] ⏹️ 收到中断信号，停止监控")
@@ -196,21 +223,89 @@ class LeaderWatcher:
         # 清理
         self.stop()
 
+    def _wait(self):
+        """
+        等待到下一次需要行动的时刻：
+        - Leader：睡到本地计算的续约时刻（TTL 降到 lock_ttl * renew_threshold），不查询 TTL
+        - Follower：阻塞等待锁键的 expired/del 通知，锁一消失立即竞选；
+          最多等 check_interval 秒（通知不可用时即退化为原来的轮询）
+        """
+        if self.election._is_leader:
+            delay = self._next_renew_at() - time.time()
+            time.sleep(min(max(delay, 0.1), self.check_interval))
+            return
+
+        pubsub = self._subscribe_lock_events()
+        if pubsub is None:
+            time.sleep(self.check_interval)
+            return
+
+        deadline = time.time() + self.check_interval
+        while (remaining := deadline - time.time()) > 0:
+            try:
+                message = pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            except Exception as e:
+                print(f"[LeaderWatcher] ⚠️ 锁事件订阅中断，改为轮询: {e}")
+                self._close_lock_events()
+                time.sleep(max(deadline - time.time(), 0))
+                return
+            if message and message.get('data') in ('expired', 'del', b'expired', b'del'):
+                return
+
+    def _subscribe_lock_events(self):
+        """
+        订阅 __keyspace@<db>__:<leader_lock>。notify-keyspace-events 需由运维开启 K、g、x
+        标志（如 "Kgx"），这里不修改服务端配置；读到的配置缺少这些标志，
+        或客户端不支持 pubsub 时返回 None，由调用方轮询。
+        """
+        if self._lock_events is not None:
+            return self._lock_events
+        client = self.election.redis
+        if not hasattr(client, 'pubsub'):
+            return None
+        try:
+            flags = client.config_get('notify-keyspace-events').get('notify-keyspace-events', '')
+        except Exception:
+            flags = None  # 托管 Redis 可能禁用 CONFIG：照常订阅，收不到通知时等待上限即 check_interval
+        if flags is not None and ('K' not in flags or not all(f in flags or 'A' in flags for f in 'gx')):
+            if not self._warned_notify:
+                print(f"[LeaderWatcher] ℹ️ notify-keyspace-events 未开启 Kgx（当前: {flags!r}），使用轮询")
+                self._warned_notify = True
+            return None
+        try:
+            db = self.redis_config.get('db', 0) if self.redis_config else getattr(client, 'db', 0)
+            pubsub = client.pubsub()
+            pubsub.subscribe(f'__keyspace@{db}__:{self.election.LEADER_LOCK_KEY}')
+            self._lock_events = pubsub
+        except Exception as e:
+            print(f"[LeaderWatcher] ⚠️ 无法订阅锁事件，使用轮询: {e}")
+        return self._lock_events
+
+    def _close_lock_events(self):
+        if self._lock_events is not None:
+            try:
+                self._lock_events.close()
+            except Exception:
+                pass
+            self._lock_events = None
+
     def stop(self):
         """停止监控并释放资源"""
         self._running = False
+        self._close_lock_events()
         if self.election.is_leader():
             self.election.release_leadership()
             print(f"[LeaderWatcher] 👋 已主动释放 Leadership")
 
     def get_status(self) -> Dict[str, Any]:
         """获取当前状态"""
+        value, pttl = self.election.get_lock_snapshot()
         return {
             'node_id': self.node_id,
-            'is_leader': self.election.is_leader(),
-            'current_leader': self.election.get_current_leader(),
+            'is_leader': self.election._is_leader,
+            'current_leader': value.split(':')[0] if value else None,
             'lock_ttl': self.lock_ttl,
-            'ttl_remaining': self.election.get_ttl(),
+            'ttl_remaining': (pttl + 500) // 1000 if pttl > 0 else pttl,
         }
 
 
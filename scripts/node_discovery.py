@@ -3,11 +3,21 @@
 Node Discovery - 节点发现与注册
 提供动态节点发现和自动伙伴选择功能
 """
-import json
 import time
 from typing import Optional, Dict, List
 from pathlib import Path
 
+try:
+    from .serialization import dumps as _dumps
+except ImportError:
+    from serialization import dumps as _dumps
+
+
+# 当前被标记为故障的节点 ID 集合（FailoverManager 写入）。
+# 任何写入节点信息的进程都代表该节点仍在运行，需同时 SREM，保持集合与节点状态一致
+FAILED_NODES_KEY = 'openclaw:cluster:failed_nodes'
+
+
 class NodeRegistry:
     """节点注册表，用于动态发现集群中的节点"""
     
@@ -15,11 +25,15 @@ class NodeRegistry:
         self.redis = redis_client
         self.NODES_KEY = 'openclaw:cluster:nodes'
         self.LEADER_KEY = 'openclaw:cluster:leader_lock'
+        self.HB_INDEX_KEY = 'openclaw:cluster:hb'
     
     def register(self, node_id: str, node_info: Dict) -> bool:
         """注册节点到集群"""
         try:
-            self.redis.hset(self.NODES_KEY, node_id, json.dumps(node_info))
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(self.NODES_KEY, node_id, _dumps(node_info))
+            pipe.srem(FAILED_NODES_KEY, node_id)
+            pipe.execute()
             return True
         except Exception as e:
             print(f"[NodeRegistry] 注册失败: {e}")
@@ -32,19 +46,26 @@ class NodeRegistry:
         except Exception:
             return None
     
+    def _live_node_ids(self, max_age: float = 60) -> List[str]:
+        """
+        已注册且 max_age 秒内有心跳的节点（注册表顺序）
+        
+        存活判断交给心跳索引有序集合（score = 心跳时间）的 ZRANGEBYSCORE，
+        与 HKEYS 同一次往返；不再逐个 GET hb:<id> 并解析 JSON。
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrangebyscore(self.HB_INDEX_KEY, time.time() - max_age, '+inf')
+        pipe.hkeys(self.NODES_KEY)
+        live, registered = pipe.execute()
+        live = set(live)
+        return [node_id for node_id in registered if node_id in live]
+    
     def find_partner(self, exclude_node_id: str) -> Optional[str]:
         """找到一个伙伴节点（排除自己）"""
         try:
-            nodes = self.redis.hgetall(self.NODES_KEY)
-            for node_id in nodes:
+            for node_id in self._live_node_ids():
                 if node_id != exclude_node_id:
-                    # 检查心跳
-                    hb = self.redis.get(f'hb:{node_id}')
-                    if hb:
-                        hb_data = json.loads(hb)
-                        age = time.time() - hb_data['timestamp']
-                        if age < 60:  # 在线
-                            return node_id
+                    return node_id
             return None
         except Exception as e:
             print(f"[NodeRegistry] 查找伙伴失败: {e}")
@@ -53,15 +74,6 @@ class NodeRegistry:
     def get_online_nodes(self) -> List[str]:
         """获取所有在线节点"""
         try:
-            nodes = self.redis.hgetall(self.NODES_KEY)
-            online = []
-            for node_id in nodes:
-                hb = self.redis.get(f'hb:{node_id}')
-                if hb:
-                    hb_data = json.loads(hb)
-                    age = time.time() - hb_data['timestamp']
-                    if age < 60:
-                        online.append(node_id)
-            return online
+            return self._live_node_ids()
         except Exception:
             return []
@@ -9,12 +9,20 @@ import time
 import sys
 import os
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 try:
     from redis_client import RedisClient
+    from node_discovery import FAILED_NODES_KEY
+    from serialization import dumps as _dumps
 except ImportError:
     from .redis_client import RedisClient
+    from .node_discovery import FAILED_NODES_KEY
+    from .serialization import dumps as _dumps
+
+
+# Heartbeat-index entries older than this are dropped (matches heartbeat.py)
+HB_INDEX_RETENTION = 3600
 
 
 class NodeState:
@@ -31,6 +39,9 @@ class NodeManager:
         self.term = 0
         self.leader_id = None
         self.last_heartbeat = time.time()
+        self._registered_at = None
+        self._node_info_key = None
+        self._node_info = None
         
         redis_cfg = config.get('redis', {})
         self.redis = RedisClient(
@@ -45,57 +56,93 @@ class NodeManager:
         self.heartbeat_interval = heartbeat_cfg.get('interval_ms', 5000) / 1000
         self.heartbeat_timeout = heartbeat_cfg.get('timeout_ms', 15000) / 1000
 
+    def _node_info_json(self) -> bytes:
+        """Serialized node info; rebuilt only when state or term changes"""
+        key = (self.state, self.term)
+        if self._node_info_key != key:
+            self._node_info_key = key
+            self._node_info = _dumps({
+                'node_id': self.node_id,
+                'state': self.state,
+                'term': self.term,
+                'registered_at': self._registered_at,
+                'capabilities': self.config.get('capabilities', ['default'])
+            })
+        return self._node_info
+
     def register_node(self) -> bool:
-        node_info = {
-            'node_id': self.node_id,
-            'state': self.state,
-            'term': self.term,
-            'registered_at': datetime.utcnow().isoformat(),
-            'capabilities': self.config.get('capabilities', ['default'])
-        }
-        self.redis.hset('openclaw:cluster:nodes', self.node_id, json.dumps(node_info))
+        self._registered_at = datetime.utcnow().isoformat()
+        self._node_info_key = None
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset('openclaw:cluster:nodes', self.node_id, self._node_info_json())
+        pipe.srem(FAILED_NODES_KEY, self.node_id)
+        pipe.execute()
         print(f"[NodeManager] Node {self.node_id} registered")
         return True
 
-    def send_heartbeat(self) -> None:
-        heartbeat_key = f'hb:{self.node_id}'
-        heartbeat_data = json.dumps({
-            'timestamp': time.time(),
+    def _queue_heartbeat(self, pipe) -> None:
+        now = time.time()
+        heartbeat_data = _dumps({
+            'timestamp': now,
             'state': self.state,
             'term': self.term
         })
-        self.redis.setex(heartbeat_key, int(self.heartbeat_timeout * 2), heartbeat_data)
+        pipe.setex(f'hb:{self.node_id}', int(self.heartbeat_timeout * 2), heartbeat_data)
+        pipe.zadd('openclaw:cluster:hb', {self.node_id: now})
 
-    def check_peers(self) -> list:
-        nodes = self.redis.hgetall('openclaw:cluster:nodes')
-        failed = []
-        now = time.time()
-        for nid, _ in nodes.items():
-            if nid == self.node_id:
-                continue
-            hb = self.redis.get(f'hb:{nid}')
-            if not hb:
-                failed.append(nid)
-                continue
-            ts = json.loads(hb).get('timestamp', 0)
-            if now - ts > self.heartbeat_timeout:
-                failed.append(nid)
-        return failed
+    def send_heartbeat(self) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        self._queue_heartbeat(pipe)
+        pipe.execute()
+
+    def tick(self) -> list:
+        """
+        One heartbeat round in a single flush: heartbeat, node-info refresh,
+        the leader's heartbeat-index sweep and, for leaders/candidates, the
+        peer registry plus live heartbeat index. Returns failed peers.
+        """
+        check = self.state in [NodeState.LEADER, NodeState.CANDIDATE]
+        pipe = self.redis.pipeline(transaction=False)
+        self._queue_heartbeat(pipe)
+        pipe.hset('openclaw:cluster:nodes', self.node_id, self._node_info_json())
+        # Our status overwrites any 'failed' record, so leave the failed set too
+        pipe.srem(FAILED_NODES_KEY, self.node_id)
+        if self.state == NodeState.LEADER:
+            # Leader-driven sweep of heartbeat-index entries past retention
+            pipe.zremrangebyscore('openclaw:cluster:hb', '-inf', f'({time.time() - HB_INDEX_RETENTION}')
+        if check:
+            pipe.hgetall('openclaw:cluster:nodes')
+            pipe.zrangebyscore('openclaw:cluster:hb', time.time() - self.heartbeat_timeout, '+inf')
+        results = pipe.execute()
+        return self.check_peers(results[-2], results[-1]) if check else []
+
+    def check_peers(self, nodes: Optional[Dict[str, Any]] = None, live: Optional[list] = None) -> list:
+        if nodes is None:
+            nodes = self.redis.hgetall('openclaw:cluster:nodes')
+        peers = [nid for nid in nodes if nid != self.node_id]
+        if not peers:
+            return []
+        # Liveness from the heartbeat index: one ZRANGEBYSCORE, no per-peer JSON decode
+        if live is None:
+            live = self.redis.zrangebyscore('openclaw:cluster:hb', time.time() - self.heartbeat_timeout, '+inf')
+        live = set(live)
+        return [nid for nid in peers if nid not in live]
 
     def run(self):
         print(f"[NodeManager] Starting {self.node_id}")
         self.register_node()
         try:
             while True:
-                self.send_heartbeat()
-                if self.state in [NodeState.LEADER, NodeState.CANDIDATE]:
-                    failed = self.check_peers()
-                    if failed:
-                        print(f"[NodeManager] Failed nodes: {failed}")
+                failed = self.tick()
+                if failed:
+                    print(f"[NodeManager] Failed nodes: {failed}")
                 time.sleep(self.heartbeat_interval)
         except KeyboardInterrupt:
             print(f"[NodeManager] Shutting down {self.node_id}")
-            self.redis.hdel('openclaw:cluster:nodes', self.node_id)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hdel('openclaw:cluster:nodes', self.node_id)
+            pipe.srem(FAILED_NODES_KEY, self.node_id)
+            pipe.execute()
             self.redis.close()
 
 
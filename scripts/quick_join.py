@@ -13,6 +13,20 @@ import time
 import subprocess
 from pathlib import Path
 
+# 注册节点并向各伙伴的收件箱投递欢迎消息：一次 EVALSHA，原子完成
+# KEYS[1] 节点注册表  KEYS[2] 自己的发送历史  KEYS[3] 故障节点集合  KEYS[4..] 伙伴收件箱
+# ARGV[1] node_id  ARGV[2] node_info  ARGV[3] 收件箱 MAXLEN  ARGV[4] 历史 MAXLEN
+# ARGV[5..] 与 KEYS[4..] 一一对应的消息
+REGISTER_AND_ANNOUNCE = """
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('SREM', KEYS[3], ARGV[1])
+for i = 4, #KEYS do
+    redis.call('XADD', KEYS[i], 'MAXLEN', '~', ARGV[3], '*', 'p', ARGV[i + 1])
+    redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[4], '*', 'p', ARGV[i + 1])
+end
+return redis.call('HLEN', KEYS[1])
+"""
+
 def main():
     print("=" * 50)
     print("🚀 OpenClaw 集群快速接入向导")
@@ -94,37 +108,35 @@ def main():
     
     try:
         from redis_client import RedisClient
-        from node_discovery import NodeRegistry
+        from agent_chat import AgentChat, inbox_stream_key, INBOX_MAXLEN, HISTORY_MAXLEN
+        from node_discovery import FAILED_NODES_KEY
         
         redis = RedisClient(**secrets['redis'])
-        redis.connect()
+        redis.connect()  # AUTH + SELECT 一次往返
+        chat = AgentChat(agent_id=node_id, redis_client=redis)
         
-        # 注册节点
-        registry = NodeRegistry(redis, node_id)
-        registry.register({
+        node_info = json.dumps({
             'platform': 'local',
             'role': 'follower',
             'instance_id': f'{node_id}-{int(time.time())}'
         })
+        welcome = {
+            'bot_1': f'🎉 新节点加入！\\n\\n节点: {node_id}\\n平台: 本地部署\\n时间: {time.strftime("%Y-%m-%d %H:%M:%S")}',
+            'bot_2': f'🎉 新节点加入！\\n\\n节点: {node_id}\\n平台: 本地部署\\n请多指教！',
+        }
+        payloads = [
+            chat.compose_message(to_agent, content, topic='new_node_join', priority='high')[1]
+            for to_agent, content in welcome.items()
+        ]
         
-        # 发送欢迎消息
-        from agent_chat import AgentChat
-        chat = AgentChat(agent_id=node_id, redis_config=secrets['redis'])
-        
-        # 通知1号2号
-        msg = chat.send_message(
-            to_agent='bot_1',
-            content=f'🎉 新节点加入！\\n\\n节点: {node_id}\\n平台: 本地部署\\n时间: {time.strftime("%Y-%m-%d %H:%M:%S")}',
-            topic='new_node_join',
-            priority='high'
-        )
-        
-        msg2 = chat.send_message(
-            to_agent='bot_2',
-            content=f'🎉 新节点加入！\\n\\n节点: {node_id}\\n平台: 本地部署\\n请多指教！',
-            topic='new_node_join',
-            priority='high'
+        # 注册节点 + 通知1号2号：SCRIPT LOAD 一次，之后 EVALSHA 一次往返
+        register_and_announce = redis.register_script(REGISTER_AND_ANNOUNCE)
+        node_count = register_and_announce(
+            keys=['openclaw:cluster:nodes', chat.history_key, FAILED_NODES_KEY,
+                  *map(inbox_stream_key, welcome)],
+            args=[node_id, node_info, INBOX_MAXLEN, HISTORY_MAXLEN, *payloads]
         )
+        print(f"   ✅ 节点已注册（集群共 {node_count} 个节点）")
         print(f"   ✅ 已通知 bot_1")
         print(f"   ✅ 已通知 bot_2")
         
@@ -0,0 +1,1011 @@
+#!/usr/bin/env python3
+"""
+Redis Client - 轻量 RESP 客户端（纯 Python，无第三方依赖）
+接口与 redis-py 的常用子集保持一致，集群脚本可在两者之间互换。
+pipeline() 把多条命令编码进同一个缓冲区，一次 sendall 发出后按序读取全部回复，
+N 条命令只付一次网络往返。
+"""
+import hashlib
+import queue
+import select
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    from redis import exceptions as _redis_exceptions
+except ImportError:  # optional: share redis-py's exception hierarchy
+    _redis_exceptions = None
+
+if _redis_exceptions is not None:
+    # 与 redis-py 共用异常类型：调用方的 except redis.exceptions.* 对两种客户端都生效
+    RedisError = _redis_exceptions.RedisError
+    RedisConnectionError = _redis_exceptions.ConnectionError
+    ResponseError = _redis_exceptions.ResponseError
+    NoScriptError = _redis_exceptions.NoScriptError
+else:
+    class RedisError(Exception):
+        pass
+
+    class RedisConnectionError(RedisError):
+        pass
+
+    class ResponseError(RedisError):
+        pass
+
+    class NoScriptError(ResponseError):
+        pass
+
+
+CRLF = b'\r\n'
+_PING = b'*1\r\n$4\r\nPING\r\n'
+_MULTI = b'*1\r\n$5\r\nMULTI\r\n'
+_EXEC = b'*1\r\n$4\r\nEXEC\r\n'
+
+# 常见的数组头 *<n>CRLF 与长度头 $<n>CRLF 预先编码，编码时查表代替逐次格式化
+_ARR_HEADERS = [b'*%d\r\n' % i for i in range(32)]
+_LEN_HEADERS = [b'$%d\r\n' % i for i in range(512)]
+
+# sendmsg 单次调用的 iovec 数量上限（Linux IOV_MAX）
+_IOV_MAX = 1024
+
+# 集群内所有 Redis 连接共用的 TCP keepalive 参数（common_redis、heartbeat 均从这里导入）：
+# 空闲 30s 开始探测，之后每 10s 一次，连续 3 次无响应断开（约 60s 发现死连接）；当前平台不支持的选项跳过。
+# 未显式传入 socket_keepalive_options 时即使用这组参数
+KEEPALIVE_OPTIONS = {
+    getattr(socket, name): value
+    for name, value in (('TCP_KEEPIDLE', 30), ('TCP_KEEPINTVL', 10), ('TCP_KEEPCNT', 3))
+    if hasattr(socket, name)
+}
+
+
+class _NotConnected:
+    """
+    未连接时占位的 socket：sendall 总是失败，首条命令走“重连后重发”分支，
+    命令热路径上不再判断连接是否存在
+    """
+
+    def sendall(self, data):
+        raise BrokenPipeError('未连接')
+
+    sendmsg = sendall
+
+    def close(self):
+        pass
+
+
+_NOT_CONNECTED = _NotConnected()
+
+
+def _send_chunks(sock, chunks: List):
+    """
+    按顺序完整发出多个缓冲区：支持 sendmsg 时以 iovec 交给内核收集（不在用户态拼接），
+    否则拼接后 sendall；处理部分发送
+    """
+    if not hasattr(sock, 'sendmsg'):
+        sock.sendall(b''.join(chunks))
+        return
+    views = [memoryview(chunk) for chunk in chunks if len(chunk)]
+    i = 0
+    while i < len(views):
+        sent = sock.sendmsg(views[i:i + _IOV_MAX])
+        while sent:
+            size = views[i].nbytes
+            if sent < size:
+                views[i] = views[i][sent:]
+                break
+            sent -= size
+            i += 1
+
+
+def _to_bytes(value) -> bytes:
+    """命令参数编码：bytes 原样发送，float 用 repr 保留精度，其余按 str 的 UTF-8"""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, float):
+        return repr(value).encode()
+    return str(value).encode()
+
+
+def _append_bulk(buf: bytearray, part):
+    """追加一个 RESP 批量字符串帧 $<字节数>CRLF<数据>CRLF"""
+    data = _to_bytes(part)
+    n = len(data)
+    buf += _LEN_HEADERS[n] if n < 512 else b'$%d\r\n' % n
+    buf += data
+    buf += CRLF
+
+
+def _decode_text(data: bytes):
+    """解码为 str；非 UTF-8 的二进制值（如 msgpack 消息）原样返回 bytes"""
+    try:
+        return data.decode()
+    except UnicodeDecodeError:
+        return data
+
+
+def _keep_bytes(data: bytes):
+    return data
+
+
+def _error(message: str) -> ResponseError:
+    """把 '-' 错误回复转换为异常实例（由调用方决定何时抛出）"""
+    if message.startswith('NOSCRIPT'):
+        return NoScriptError(message)
+    return ResponseError(message)
+
+
+def _ok(reply):
+    """'+OK' / '+PONG' → True；空回复（如 SET NX 未写入）→ None"""
+    return True if reply is not None else None
+
+
+def _pairs_to_dict(reply) -> Dict:
+    """[k1, v1, k2, v2, ...] → {k1: v1, k2: v2}"""
+    if not reply:
+        return {}
+    it = iter(reply)
+    return dict(zip(it, it))
+
+
+def _stream_entries(reply) -> List:
+    """Stream 条目 [[id, [f, v, ...]], ...] → [(id, {f: v}), ...]"""
+    if not reply:
+        return []
+    return [(entry[0], _pairs_to_dict(entry[1])) for entry in reply]
+
+
+def _xread_reply(reply) -> List:
+    """XREAD/XREADGROUP 回复 → [[stream, [(id, fields), ...]], ...]（超时为空列表）"""
+    if not reply:
+        return []
+    return [[stream, _stream_entries(entries)] for stream, entries in reply]
+
+
+def _scan_reply(reply):
+    """SCAN 回复 [cursor, [key, ...]] → (int cursor, [key, ...])"""
+    return int(reply[0]), reply[1]
+
+
+def _xinfo_groups(reply) -> List[Dict]:
+    return [_pairs_to_dict(group) for group in reply or []]
+
+
+def _as_str(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _parse_info(reply) -> Dict[str, str]:
+    """INFO 文本回复 → {字段: 值}（跳过 '# Section' 标题行）"""
+    info = {}
+    for line in _as_str(reply or '').splitlines():
+        if line and not line.startswith('#') and ':' in line:
+            key, _, value = line.partition(':')
+            info[key] = value
+    return info
+
+
+class Commands:
+    """
+    命令方法集合：RedisClient 立即执行，Pipeline 排队到下一次 execute()
+    子类实现 _send_frame(frame, callback)：发送一条已编码的命令。
+    """
+
+    def _send_frame(self, frame, callback: Optional[Callable] = None):
+        raise NotImplementedError
+
+    def _cmd(self, parts: List, callback: Optional[Callable] = None):
+        return self._send_frame(self._encode(parts), callback)
+
+    def execute_command(self, *args):
+        return self._cmd(list(args))
+
+    # --- 连接 / 服务器 ---
+
+    def ping(self):
+        return self._cmd(['PING'], _ok)
+
+    def info(self, section: Optional[str] = None):
+        return self._cmd(['INFO', section] if section else ['INFO'], _parse_info)
+
+    def config_get(self, pattern: str = '*'):
+        return self._cmd(['CONFIG', 'GET', pattern], _pairs_to_dict)
+
+    def config_set(self, name: str, value):
+        return self._cmd(['CONFIG', 'SET', name, value], _ok)
+
+    def publish(self, channel: str, message):
+        return self._cmd(['PUBLISH', channel, message])
+
+    # --- 键 / 字符串 ---
+
+    def get(self, name: str):
+        return self._cmd(['GET', name])
+
+    def set(self, name: str, value, ex: Optional[int] = None, px: Optional[int] = None,
+            nx: bool = False, xx: bool = False):
+        parts = ['SET', name, value]
+        if ex is not None:
+            parts += ['EX', ex]
+        if px is not None:
+            parts += ['PX', px]
+        if nx:
+            parts.append('NX')
+        if xx:
+            parts.append('XX')
+        return self._cmd(parts, _ok)
+
+    def setex(self, name: str, time: int, value):
+        return self._cmd(['SETEX', name, time, value], _ok)
+
+    def getdel(self, name: str):
+        return self._cmd(['GETDEL', name])
+
+    def mget(self, keys, *args):
+        names = [keys] if isinstance(keys, (str, bytes)) else list(keys)
+        return self._cmd(['MGET', *names, *args])
+
+    def mset_many(self, mapping: Dict):
+        """一条 MSET 写入整个 {key: value} 映射"""
+        parts = ['MSET']
+        for item in mapping.items():
+            parts += item
+        return self._cmd(parts, _ok)
+
+    def delete(self, *names):
+        return self._cmd(['DEL', *names])
+
+    def exists(self, *names):
+        return self._cmd(['EXISTS', *names])
+
+    def expire(self, name: str, time: int):
+        return self._cmd(['EXPIRE', name, time], bool)
+
+    def ttl(self, name: str):
+        return self._cmd(['TTL', name])
+
+    def pttl(self, name: str):
+        return self._cmd(['PTTL', name])
+
+    def scan(self, cursor: int = 0, match: Optional[str] = None, count: Optional[int] = None):
+        parts = ['SCAN', cursor]
+        if match is not None:
+            parts += ['MATCH', match]
+        if count is not None:
+            parts += ['COUNT', count]
+        return self._cmd(parts, _scan_reply)
+
+    # --- 哈希 ---
+
+    def hset(self, name: str, key=None, value=None, mapping: Optional[Dict] = None):
+        parts = ['HSET', name]
+        if key is not None:
+            parts += [key, value]
+        for item in (mapping or {}).items():
+            parts += item
+        return self._cmd(parts)
+
+    def hset_many(self, key: str, mapping: Dict):
+        """一条 HSET 写入整个 {field: value} 映射"""
+        return self.hset(key, mapping=mapping)
+
+    def hget(self, name: str, key):
+        return self._cmd(['HGET', name, key])
+
+    def hmget(self, name: str, keys, *args):
+        fields = [keys] if isinstance(keys, (str, bytes)) else list(keys)
+        return self._cmd(['HMGET', name, *fields, *args])
+
+    def hgetall(self, name: str):
+        return self._cmd(['HGETALL', name], _pairs_to_dict)
+
+    def hkeys(self, name: str):
+        return self._cmd(['HKEYS', name])
+
+    def hdel(self, name: str, *keys):
+        return self._cmd(['HDEL', name, *keys])
+
+    # --- 列表 ---
+
+    def lpush(self, name: str, *values):
+        return self._cmd(['LPUSH', name, *values])
+
+    def ltrim(self, name: str, start: int, end: int):
+        return self._cmd(['LTRIM', name, start, end], _ok)
+
+    def lrange(self, name: str, start: int, end: int):
+        return self._cmd(['LRANGE', name, start, end])
+
+    def llen(self, name: str):
+        return self._cmd(['LLEN', name])
+
+    def lpop(self, name: str, count: Optional[int] = None):
+        return self._cmd(['LPOP', name] if count is None else ['LPOP', name, count])
+
+    # --- 集合 / 有序集合 ---
+
+    def sadd(self, name: str, *values):
+        return self._cmd(['SADD', name, *values])
+
+    def srem(self, name: str, *values):
+        return self._cmd(['SREM', name, *values])
+
+    def smembers(self, name: str):
+        return self._cmd(['SMEMBERS', name], set)
+
+    def scard(self, name: str):
+        return self._cmd(['SCARD', name])
+
+    def zadd(self, name: str, mapping: Dict):
+        parts = ['ZADD', name]
+        for member, score in mapping.items():
+            parts += [score, member]
+        return self._cmd(parts)
+
+    def zcount(self, name: str, min, max):
+        return self._cmd(['ZCOUNT', name, min, max])
+
+    def zrangebyscore(self, name: str, min, max):
+        return self._cmd(['ZRANGEBYSCORE', name, min, max])
+
+    def zremrangebyscore(self, name: str, min, max):
+        return self._cmd(['ZREMRANGEBYSCORE', name, min, max])
+
+    # --- Stream ---
+
+    def xadd(self, name: str, fields: Dict, id: str = '*', maxlen: Optional[int] = None,
+             approximate: bool = True):
+        parts = ['XADD', name]
+        if maxlen is not None:
+            parts += ['MAXLEN', '~', maxlen] if approximate else ['MAXLEN', maxlen]
+        parts.append(id)
+        for item in fields.items():
+            parts += item
+        return self._cmd(parts)
+
+    def xlen(self, name: str):
+        return self._cmd(['XLEN', name])
+
+    def xrange(self, name: str, min: str = '-', max: str = '+', count: Optional[int] = None):
+        parts = ['XRANGE', name, min, max]
+        if count is not None:
+            parts += ['COUNT', count]
+        return self._cmd(parts, _stream_entries)
+
+    def xrevrange(self, name: str, max: str = '+', min: str = '-', count: Optional[int] = None):
+        parts = ['XREVRANGE', name, max, min]
+        if count is not None:
+            parts += ['COUNT', count]
+        return self._cmd(parts, _stream_entries)
+
+    def xreadgroup(self, groupname: str, consumername: str, streams: Dict,
+                   count: Optional[int] = None, block: Optional[int] = None, noack: bool = False):
+        parts = ['XREADGROUP', 'GROUP', groupname, consumername]
+        if count is not None:
+            parts += ['COUNT', count]
+        if block is not None:
+            parts += ['BLOCK', block]
+        if noack:
+            parts.append('NOACK')
+        parts += ['STREAMS', *streams.keys(), *streams.values()]
+        return self._cmd(parts, _xread_reply)
+
+    def xack(self, name: str, groupname: str, *ids):
+        return self._cmd(['XACK', name, groupname, *ids])
+
+    def xgroup_create(self, name: str, groupname: str, id: str = '$', mkstream: bool = False):
+        parts = ['XGROUP', 'CREATE', name, groupname, id]
+        if mkstream:
+            parts.append('MKSTREAM')
+        return self._cmd(parts, _ok)
+
+    def xinfo_groups(self, name: str):
+        return self._cmd(['XINFO', 'GROUPS', name], _xinfo_groups)
+
+    # --- 脚本 ---
+
+    def eval(self, script: str, numkeys: int, *keys_and_args):
+        return self._cmd(['EVAL', script, numkeys, *keys_and_args])
+
+    def evalsha(self, sha: str, numkeys: int, *keys_and_args):
+        return self._cmd(['EVALSHA', sha, numkeys, *keys_and_args])
+
+    def script_load(self, script: str):
+        return self._cmd(['SCRIPT', 'LOAD', script])
+
+
+class ClientCommands(Commands):
+    """立即执行的客户端（RedisClient / PooledRedisClient）才有的方法"""
+
+    def scan_iter(self, match: Optional[str] = None, count: int = 500):
+        """
+        SCAN 游标遍历：每批 count 个，服务端不会像 KEYS 那样一次性阻塞遍历整个键空间
+        """
+        cursor = 0
+        while True:
+            cursor, batch = self.scan(cursor, match=match, count=count)
+            yield from batch
+            if cursor == 0:
+                return
+
+    def keys(self, pattern: str = '*') -> List:
+        """KEYS 的语义，经 SCAN 分批实现"""
+        return list(self.scan_iter(pattern))
+
+    def pipeline(self, transaction: bool = False) -> "Pipeline":
+        return Pipeline(self, transaction)
+
+    def register_script(self, script: str) -> "Script":
+        return Script(self, script)
+
+
+class Script:
+    """register_script() 返回的可调用对象：EVALSHA，脚本未缓存（NOSCRIPT）时加载后重试"""
+
+    def __init__(self, client: "RedisClient", script: str):
+        self.client = client
+        self.script = script
+        self.sha = hashlib.sha1(script.encode()).hexdigest()
+
+    def __call__(self, keys: Iterable = (), args: Iterable = (), client: Optional["RedisClient"] = None):
+        client = client or self.client
+        keys, args = list(keys), list(args)
+        try:
+            return client.evalsha(self.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            client.script_load(self.script)
+            return client.evalsha(self.sha, len(keys), *keys, *args)
+
+
+class RedisClient(ClientCommands):
+    """
+    单连接 Redis 客户端
+    首条命令时建立连接（AUTH + SELECT 一次往返）。发送失败（连接已断开或尚未建立）时
+    命令还没送达服务端，重连后重发一次；读取回复时出错则关闭连接并抛出，不重发。
+    """
+
+    def __init__(self, host: str = 'localhost', port: int = 6379, password: Optional[str] = None,
+                 db: int = 0, socket_timeout: Optional[float] = None,
+                 socket_connect_timeout: Optional[float] = None, socket_keepalive: bool = True,
+                 socket_keepalive_options: Optional[Dict[int, int]] = None,
+                 health_check_interval: float = 0, decode_responses: bool = True):
+        self.host = host
+        self.port = int(port)
+        self.password = password
+        self.db = int(db or 0)
+        self.socket_timeout = socket_timeout
+        self.socket_connect_timeout = socket_connect_timeout
+        self.socket_keepalive = socket_keepalive
+        self.socket_keepalive_options = (KEEPALIVE_OPTIONS if socket_keepalive_options is None
+                                         else socket_keepalive_options)
+        self.health_check_interval = health_check_interval
+        self.decode_responses = decode_responses
+        # 构造时即选定解码函数，读回复时不再判断 decode_responses
+        self._decode = _decode_text if decode_responses else _keep_bytes
+        self._sock = _NOT_CONNECTED
+        self._buffer = bytearray()  # 已接收未解析的数据从 _pos 开始
+        self._pos = 0
+        self._scratch = memoryview(bytearray(65536))  # recv_into 的固定接收区，每次接收不再分配 bytes
+        self._last_used = 0.0
+
+    # --- 连接管理 ---
+
+    def connect(self):
+        """建立连接；AUTH 与 SELECT 流水线发送，只付一次往返"""
+        self.close()
+        sock = socket.create_connection(
+            (self.host, self.port),
+            timeout=self.socket_connect_timeout or self.socket_timeout
+        )
+        try:
+            sock.settimeout(self.socket_timeout)
+            # 命令都是小包：关闭 Nagle，避免与对端延迟 ACK 叠加出最多 40ms 的等待
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.socket_keepalive:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                for option, value in self.socket_keepalive_options.items():
+                    sock.setsockopt(socket.IPPROTO_TCP, option, value)
+            if hasattr(socket, 'TCP_USER_TIMEOUT'):
+                # Linux：已发送数据超过该时长未被确认即断开，不等内核默认的十几分钟重传
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT,
+                                int((self.socket_timeout or 30) * 1000))
+            self._sock = sock
+            self._buffer = bytearray()
+            self._pos = 0
+            handshake = []
+            if self.password:
+                handshake.append(['AUTH', self.password])
+            if self.db:
+                handshake.append(['SELECT', self.db])
+            if handshake:
+                payload = bytearray()
+                for parts in handshake:
+                    self._encode(parts, payload)
+                self._send(payload)
+                for reply in self._read_replies(len(handshake)):
+                    if isinstance(reply, ResponseError):
+                        raise reply
+        except Exception:
+            self.close()
+            raise
+        self._last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        self._sock = _NOT_CONNECTED
+        self._buffer = bytearray()
+        self._pos = 0
+
+    def ensure_connected(self):
+        if self._sock is _NOT_CONNECTED:
+            self.connect()
+
+    def _is_idle(self) -> bool:
+        """
+        回复流是否已读完：缓冲区无未解析数据且 socket 上没有待读字节
+        （上一个调用方中途异常时可能残留迟到的回复；服务端关闭同样表现为可读）
+        """
+        if self._sock is _NOT_CONNECTED:
+            return True
+        if self._pos != len(self._buffer):
+            return False
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _check_health(self):
+        """空闲超过 health_check_interval 后先 PING，死连接当场重建"""
+        try:
+            self._sock.sendall(_PING)
+            self._read_replies(1)
+        except (OSError, RedisError):
+            self.connect()
+
+    # --- RESP 编解码 ---
+
+    @staticmethod
+    def _encode(parts: List, buf: Optional[bytearray] = None) -> bytearray:
+        """
+        命令 → RESP 数组帧，追加到 buf（不传时新建）并返回
+        每个参数只编码一次，长度按编码后的字节数计算（非 ASCII 值不会少算）。
+        """
+        if buf is None:
+            buf = bytearray()
+        n = len(parts)
+        buf += _ARR_HEADERS[n] if n < 32 else b'*%d\r\n' % n
+        for part in parts:
+            _append_bulk(buf, part)
+        return buf
+
+    def _fill(self):
+        """接收更多数据；先原地丢弃已解析的前缀，缓冲区只保留未读尾部"""
+        if self._pos:
+            del self._buffer[:self._pos]
+            self._pos = 0
+        n = self._sock.recv_into(self._scratch)
+        if not n:
+            raise RedisConnectionError('连接已被服务器关闭')
+        self._buffer += self._scratch[:n]
+
+    def _readline(self) -> bytes:
+        """从游标处读一行（不含 CRLF），游标移到下一行开头"""
+        buf = self._buffer
+        while True:
+            idx = buf.find(CRLF, self._pos)
+            if idx >= 0:
+                line = bytes(buf[self._pos:idx])
+                self._pos = idx + 2
+                return line
+            self._fill()
+
+    def _read(self):
+        """读取一个完整回复；错误回复以异常实例返回，不在此处抛出"""
+        line = self._readline()
+        reader = self._READERS.get(line[0]) if line else None
+        if reader is None:
+            raise RedisError(f'无法解析的 RESP 回复: {line[:32]!r}')
+        return reader(self, line[1:])
+
+    def _read_simple(self, rest):
+        return self._decode(rest)
+
+    def _read_error(self, rest):
+        return _error(rest.decode(errors='replace'))
+
+    def _read_int(self, rest):
+        return int(rest)
+
+    def _read_bulk(self, rest):
+        length = int(rest)
+        if length < 0:
+            return None
+        while len(self._buffer) - self._pos < length + 2:
+            self._fill()
+        start = self._pos
+        self._pos = start + length + 2
+        # 经 memoryview 切片只复制一次（直接切 bytearray 再转 bytes 会复制两次）
+        with memoryview(self._buffer) as view:
+            data = view[start:start + length].tobytes()
+        return self._decode(data)
+
+    def _read_bulk_into(self, out: bytearray) -> Optional[int]:
+        """
+        读取一个批量字符串回复，数据直接追加到调用方的 out，不生成中间 bytes 对象
+        返回写入的字节数，nil 回复返回 None；错误回复抛出 ResponseError
+        """
+        line = self._readline()
+        prefix = line[:1]
+        if prefix == b'-':
+            raise _error(line[1:].decode(errors='replace'))
+        if prefix == b'+':
+            out += line[1:]
+            return len(line) - 1
+        if prefix != b'$':
+            raise RedisError(f'期望批量字符串回复: {line[:32]!r}')
+        length = int(line[1:])
+        if length < 0:
+            return None
+        while len(self._buffer) - self._pos < length + 2:
+            self._fill()
+        start = self._pos
+        self._pos = start + length + 2
+        with memoryview(self._buffer) as view:
+            out += view[start:start + length]
+        return length
+
+    def _read_array(self, rest):
+        count = int(rest)
+        if count < 0:
+            return None
+        return [self._read() for _ in range(count)]
+
+    # 按类型前缀字节分派，新增 RESP3 类型只需登记一项
+    _READERS = {
+        ord('+'): _read_simple,
+        ord('-'): _read_error,
+        ord(':'): _read_int,
+        ord('$'): _read_bulk,
+        ord('*'): _read_array,
+    }
+
+    def _fail(self, error: Exception):
+        """连接已不可信：关闭并抛出（OSError 包装为 RedisConnectionError）"""
+        self.close()
+        if isinstance(error, RedisError):
+            raise error
+        raise RedisConnectionError(f'Redis 连接错误 {self.host}:{self.port}: {error}') from error
+
+    def _write(self, payload):
+        """payload 为单个缓冲区时 sendall，为缓冲区列表时走 iovec 发送"""
+        if isinstance(payload, list):
+            _send_chunks(self._sock, payload)
+        else:
+            self._sock.sendall(payload)
+
+    def _send(self, payload):
+        try:
+            self._write(payload)
+        except OSError as e:
+            self._fail(e)
+
+    def _read_replies(self, count: int) -> List:
+        """按序读取 count 个回复"""
+        try:
+            replies = [self._read() for _ in range(count)]
+        except (OSError, RedisError) as e:
+            # 回复流已不可信，丢弃连接
+            self._fail(e)
+        if self._pos == len(self._buffer):
+            self._buffer.clear()
+            self._pos = 0
+        self._last_used = time.monotonic()
+        return replies
+
+    def _clone(self) -> "RedisClient":
+        """同配置的新客户端（未连接）"""
+        return RedisClient(
+            host=self.host, port=self.port, password=self.password, db=self.db,
+            socket_timeout=self.socket_timeout,
+            socket_connect_timeout=self.socket_connect_timeout,
+            socket_keepalive=self.socket_keepalive,
+            socket_keepalive_options=self.socket_keepalive_options,
+            health_check_interval=self.health_check_interval,
+            decode_responses=self.decode_responses
+        )
+
+    def _execute(self, payload, count: int) -> List:
+        """发送已编码的 payload（可含多条命令），按序读取 count 个回复"""
+        if self.health_check_interval and time.monotonic() - self._last_used > self.health_check_interval:
+            self._check_health()
+        try:
+            self._write(payload)
+        except OSError:
+            # 连接已断开或尚未建立：命令还没送达，重连后重发一次
+            self.connect()
+            self._send(payload)
+        return self._read_replies(count)
+
+    def _send_frame(self, frame, callback: Optional[Callable] = None):
+        reply = self._execute(frame, 1)[0]
+        if isinstance(reply, ResponseError):
+            raise reply
+        return callback(reply) if callback else reply
+
+    def get_into(self, key, out: bytearray) -> Optional[int]:
+        """GET 的大值版本：值追加到 out，返回字节数，键不存在返回 None"""
+        self._execute(self._encode(['GET', key]), 0)
+        try:
+            length = self._read_bulk_into(out)
+        except ResponseError:
+            raise
+        except (OSError, RedisError) as e:
+            self._fail(e)
+        if self._pos == len(self._buffer):
+            self._buffer.clear()
+            self._pos = 0
+        self._last_used = time.monotonic()
+        return length
+
+    def pubsub(self) -> "PubSub":
+        return PubSub(self._clone())
+
+
+class PreparedCommand:
+    """
+    预编码命令：*N 头和前面固定不变的参数只编码一次，每次发送只编码末尾 nargs 个变化的参数
+    适合每个周期重复发送、只有值在变的命令（如心跳的 SETEX hb:<id> <ttl> <payload>）。
+    """
+
+    def __init__(self, parts: List, nargs: int = 1, callback: Optional[Callable] = None):
+        self.nargs = nargs
+        self.callback = callback
+        prefix = bytearray(b'*%d\r\n' % (len(parts) + nargs))
+        for part in parts:
+            _append_bulk(prefix, part)
+        self.prefix = bytes(prefix)
+
+    def encode(self, args) -> bytearray:
+        if len(args) != self.nargs:
+            raise ValueError(f'需要 {self.nargs} 个参数，收到 {len(args)} 个')
+        frame = bytearray(self.prefix)
+        for part in args:
+            _append_bulk(frame, part)
+        return frame
+
+    def call(self, client, *args):
+        """在 client 上执行；client 为 Pipeline 时排队到下一次 execute()"""
+        return client._send_frame(self.encode(args), self.callback)
+
+
+class ConnectionPool:
+    """
+    线程安全连接池
+    空闲连接放在 LifoQueue（最近归还的最先取出，socket 与服务端缓存最热）；
+    BoundedSemaphore 限制连接总数。新连接在调用方线程里建立（TCP 握手 + AUTH/SELECT），
+    不持有任何锁，其他线程的取还不受影响。
+    """
+
+    def __init__(self, max_connections: int = 8, timeout: Optional[float] = None, **connection_kwargs):
+        self.max_connections = max_connections
+        self.timeout = timeout  # 连接数已达上限时等待空闲连接的秒数，None 为一直等待
+        self.connection_kwargs = connection_kwargs
+        self._idle: "queue.LifoQueue[RedisClient]" = queue.LifoQueue()
+        self._sem = threading.BoundedSemaphore(max_connections)
+
+    def get_connection(self) -> RedisClient:
+        if not self._sem.acquire(timeout=self.timeout):
+            raise RedisConnectionError(f'连接池已耗尽（max_connections={self.max_connections}）')
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return RedisClient(**self.connection_kwargs)  # 首条命令时连接，出错的连接同样自动重连
+        except Exception:
+            self._sem.release()
+            raise
+
+    def release(self, conn: RedisClient):
+        # 残留未读回复的连接不能交给下一个调用方（会把旧回复当成新回复），关闭后归还，下次使用时重连
+        if not conn._is_idle():
+            conn.close()
+        self._idle.put(conn)
+        self._sem.release()
+
+    def prewarm(self, count: Optional[int] = None):
+        """
+        预先建立至多 count 条（默认 max_connections）连接放入空闲队列
+        逐条进行：占一个信号量名额、建连、立即归还，前台命令至多等待一次握手；
+        名额已被占满（前台正在使用）或建连失败即停止，其余连接留待首次使用时建立。
+        """
+        for _ in range(count or self.max_connections):
+            if not self._sem.acquire(blocking=False):
+                return
+            conn = RedisClient(**self.connection_kwargs)
+            try:
+                conn.connect()
+            except (OSError, RedisError):
+                self.release(conn)
+                return
+            self.release(conn)
+
+    def disconnect(self):
+        """关闭所有空闲连接（借出中的连接归还后仍可继续使用）"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class PooledRedisClient(ClientCommands):
+    """
+    多线程共享的客户端：每条命令 / 每次 pipeline.execute() 从连接池借出一条连接，用完归还
+    """
+
+    _encode = staticmethod(RedisClient._encode)
+
+    def __init__(self, connection_pool: Optional[ConnectionPool] = None, **connection_kwargs):
+        self.connection_pool = connection_pool or ConnectionPool(**connection_kwargs)
+
+    def _execute(self, payload, count: int) -> List:
+        pool = self.connection_pool
+        conn = pool.get_connection()
+        try:
+            return conn._execute(payload, count)
+        finally:
+            pool.release(conn)
+
+    def _send_frame(self, frame, callback: Optional[Callable] = None):
+        pool = self.connection_pool
+        conn = pool.get_connection()
+        try:
+            return conn._send_frame(frame, callback)
+        finally:
+            pool.release(conn)
+
+    def connect(self):
+        """兼容 RedisClient 接口：连接在借出后按需建立"""
+
+    def close(self):
+        self.connection_pool.disconnect()
+
+    def pubsub(self) -> "PubSub":
+        return PubSub(RedisClient(**self.connection_pool.connection_kwargs))
+
+
+class Pipeline(Commands):
+    """
+    命令流水线：命令编码后追加到 _buf，execute() 一次 sendall 发出并按序读取全部回复
+    transaction=True 时以 MULTI/EXEC 包裹，整批原子执行。
+    """
+
+    def __init__(self, client, transaction: bool = False):
+        self._client = client
+        self._transaction = transaction
+        self._buf = bytearray()
+        self._callbacks: List[Optional[Callable]] = []
+
+    def __len__(self):
+        return len(self._callbacks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.reset()
+
+    def reset(self):
+        self._buf = bytearray()
+        self._callbacks = []
+
+    def _cmd(self, parts: List, callback: Optional[Callable] = None):
+        self._client._encode(parts, self._buf)
+        self._callbacks.append(callback)
+        return self
+
+    def _send_frame(self, frame, callback: Optional[Callable] = None):
+        self._buf += frame
+        self._callbacks.append(callback)
+        return self
+
+    def execute(self, raise_on_error: bool = True) -> List:
+        if not self._callbacks:
+            return []
+        callbacks = self._callbacks
+        payload = self._buf
+        count = len(callbacks)
+        if self._transaction:
+            # MULTI / 命令批 / EXEC 作为三段 iovec 发出，不复制整批命令
+            payload = [_MULTI, payload, _EXEC]
+            count += 2
+        try:
+            replies = self._client._execute(payload, count)
+        finally:
+            self.reset()
+
+        if self._transaction:
+            # MULTI → OK，每条命令 → QUEUED（或排队错误），EXEC → 结果数组（被放弃时为错误或 nil）
+            queued, exec_reply = replies[1:-1], replies[-1]
+            errors = [r for r in queued if isinstance(r, ResponseError)]
+            if isinstance(exec_reply, ResponseError) or exec_reply is None:
+                raise errors[0] if errors else (exec_reply or ResponseError('EXEC 被放弃'))
+            replies = exec_reply
+
+        results = []
+        for reply, callback in zip(replies, callbacks):
+            if isinstance(reply, ResponseError):
+                if raise_on_error:
+                    raise reply
+                results.append(reply)
+            else:
+                results.append(callback(reply) if callback else reply)
+        return results
+
+
+class PubSub:
+    """订阅连接（独立于命令连接）：subscribe 后以 get_message(timeout) 轮询消息"""
+
+    def __init__(self, connection: RedisClient):
+        self._conn = connection
+
+    def subscribe(self, *channels):
+        conn = self._conn
+        conn.ensure_connected()
+        conn._send(conn._encode(['SUBSCRIBE', *channels]))
+
+    def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> Optional[Dict]:
+        """等待至多 timeout 秒；无消息时返回 None"""
+        conn = self._conn
+        if conn._sock is _NOT_CONNECTED:
+            raise RedisConnectionError('尚未订阅任何频道')
+        if conn._pos == len(conn._buffer):
+            readable, _, _ = select.select([conn._sock], [], [], max(timeout, 0))
+            if not readable:
+                return None
+        try:
+            reply = conn._read()
+        except (OSError, RedisError) as e:
+            conn._fail(e)
+        kind = _as_str(reply[0])
+        if kind in ('subscribe', 'unsubscribe') and ignore_subscribe_messages:
+            return None
+        return {'type': kind, 'pattern': None, 'channel': reply[1], 'data': reply[2]}
+
+    def close(self):
+        self._conn.close()
+
+
+# get_redis_pool 的多例表：(host, port, db, 连接参数) -> PooledRedisClient
+_POOLS: Dict[tuple, PooledRedisClient] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_redis_pool(host: str = 'localhost', port: int = 6379, db: int = 0,
+                   prewarm: bool = True, **connection_kwargs) -> PooledRedisClient:
+    """
+    按 (host, port, db) 及全部连接参数共享的连接池客户端：参数完全相同才复用同一个池，
+    password / socket_timeout / max_connections 等不同的调用各自建池，互不覆盖。
+    新建时在后台线程预热连接，第一条同步命令拿到的就是已完成握手的 socket。
+    """
+    options = tuple(sorted((name, repr(value)) for name, value in connection_kwargs.items()))
+    key = (host, int(port), int(db or 0), options)
+    with _POOLS_LOCK:
+        client = _POOLS.get(key)
+        if client is None:
+            client = _POOLS[key] = PooledRedisClient(host=host, port=port, db=db, **connection_kwargs)
+            if prewarm:
+                threading.Thread(target=client.connection_pool.prewarm, daemon=True).start()
+    return client
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+JSON 编解码 - 集群内写入 Redis 的 JSON 统一从这里导入
+已安装 orjson 时使用（输出 bytes，Redis 直接接受），否则回退到标准库且输出保持一致。
+不依赖 redis-py / tenacity，任何脚本都可以导入。
+"""
+import datetime
+import json
+
+try:
+    import orjson
+except ImportError:  # optional accelerator
+    orjson = None
+
+__all__ = ['dumps', 'loads']
+
+if orjson is not None:
+    # numpy 数值/数组与 naive datetime（按 UTC）原生编码
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+
+    def dumps(obj) -> bytes:
+        """JSON 编码为 UTF-8 bytes（紧凑格式）"""
+        return orjson.dumps(obj, option=_OPTIONS)
+
+    # 接受 str 或 bytes，decode_responses 开不开都能直接解析
+    loads = orjson.loads
+else:
+    def _default(obj):
+        """标准库无法编码的值按 orjson 的规则转换：numpy 标量/数组、datetime（naive 视为 UTC）"""
+        if isinstance(obj, datetime.datetime):
+            if obj.tzinfo is None:
+                return obj.isoformat() + '+00:00'
+            return obj.isoformat()
+        if isinstance(obj, (datetime.date, datetime.time)):
+            return obj.isoformat()
+        # numpy 标量与数组都提供 tolist()（标量返回对应的 Python 数值），无需导入 numpy
+        if type(obj).__module__ == 'numpy' and hasattr(obj, 'tolist'):
+            return obj.tolist()
+        raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+    def dumps(obj) -> bytes:
+        """JSON 编码为 UTF-8 bytes（紧凑格式，非 ASCII 字符不转义，与 orjson 输出一致）"""
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode()
+
+    loads = json.loads
@@ -5,32 +5,57 @@ Handles state synchronization across cluster nodes.
 Lightweight event publishing/subscribing via Redis streams.
 """
 
-import json
+import re
 import time
 import threading
-from typing import Dict, Any, Optional, Callable
+import uuid
+from typing import Dict, Any, List, Optional, Callable
 
 try:
-    from .redis_client import RedisClient
+    from .redis_client import get_redis_pool, ResponseError
+    from .serialization import dumps as _dumps, loads as _loads
 except ImportError:
-    from redis_client import RedisClient
+    from redis_client import get_redis_pool, ResponseError
+    from serialization import dumps as _dumps, loads as _loads
+
+# Leading node_id/type of an event as written by publish_event (orjson or
+# json separators); escaped or reordered payloads fall back to a full parse
+_EVENT_HEAD = re.compile(r'\{"node_id": ?"([^"\\]*)", ?"type": ?"([^"\\]*)"')
 
 
 class StateSync:
     """Manages state synchronization across the cluster."""
+
+    # Events drained per blocking pop
+    POP_BATCH = 64
+    # Blocking pop timeout in seconds; stop() wakes the poller early
+    POP_TIMEOUT = 5
+    EVENTS_KEY = 'openclaw:cluster:events'
     
     def __init__(self, node_id: str, redis_host: str, redis_port: int = 6379, 
                  redis_password: str = None, redis_db: int = 0):
         self.node_id = node_id
-        self.redis = RedisClient(
+        # The poll thread blocks in BRPOP on its own pooled connection,
+        # so publish_event from other threads never shares that socket.
+        # Instances for the same endpoint share one pre-warmed pool.
+        self.redis = get_redis_pool(
             host=redis_host,
             port=redis_port,
+            db=redis_db,
             password=redis_password,
-            db=redis_db
+            max_connections=4
         )
         self._running = False
         self._thread: Optional[threading.Thread] = None
         self._handlers: Dict[str, Callable] = {}
+        # BLMPOP needs Redis >= 7.0; probed on the first poll
+        self._blmpop_ok: Optional[bool] = None
+        # Our events are serialized with node_id first, so they start with
+        # this prefix and can be dropped without parsing
+        self._own_prefix = _dumps({'node_id': node_id})[:-1].decode() + ','
+        # Private list the poller blocks on next to the shared queue; stop()
+        # pushes here, so no other node can consume the wakeup
+        self._wake_key = f'openclaw:cluster:events:wake:{node_id}:{uuid.uuid4().hex}'
     
     def start(self):
         """Start the state sync service."""
@@ -41,8 +66,18 @@ class StateSync:
     def stop(self):
         """Stop the state sync service."""
         self._running = False
-        if self._thread:
-            self._thread.join(timeout=2.0)
+        if self._thread and self._thread.is_alive():
+            # Wake the blocked pop instead of waiting out POP_TIMEOUT; the key
+            # expires on its own if the poller was not blocked to pop it
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.lpush(self._wake_key, 1)
+                pipe.expire(self._wake_key, self.POP_TIMEOUT * 2)
+                pipe.execute()
+            except Exception as e:
+                print(f"[StateSync] Stop wakeup failed: {e}")
+            # Outlast one full pop in case the wakeup was lost
+            self._thread.join(timeout=self.POP_TIMEOUT + 1.0)
     
     def publish_event(self, event_type: str, key: str, value: dict):
         """Publish an event to the cluster stream."""
@@ -53,34 +88,72 @@ class StateSync:
             'value': value,
             'timestamp': time.time()
         }
-        event_json = json.dumps(event)
-        # Use Redis list as simple queue if streams not available
-        self.redis._cmd(['LPUSH', 'openclaw:cluster:events', event_json])
-        self.redis._cmd(['LTRIM', 'openclaw:cluster:events', '0', '9999'])
+        event_json = _dumps(event)
+        # Use Redis list as simple queue if streams not available;
+        # push and trim go out in one round trip
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.lpush(self.EVENTS_KEY, event_json)
+        pipe.ltrim(self.EVENTS_KEY, 0, 9999)
+        pipe.execute()
     
     def register_handler(self, event_type: str, handler: Callable):
         """Register a handler for event types."""
         self._handlers[event_type] = handler
     
+    def _pop_events(self) -> List:
+        """
+        Block for events and return up to POP_BATCH of them, oldest first.
+        A pop from the wake key (see stop()) returns no events.
+        """
+        if self._blmpop_ok is not False:
+            try:
+                result = self.redis._cmd(['BLMPOP', self.POP_TIMEOUT, '2', self.EVENTS_KEY, self._wake_key,
+                                          'RIGHT', 'COUNT', self.POP_BATCH])
+                self._blmpop_ok = True
+            except ResponseError:
+                if self._blmpop_ok:
+                    raise
+                self._blmpop_ok = False
+            else:
+                return result[1] if result and result[0] == self.EVENTS_KEY else []
+        # Use BRPOP for blocking pop with timeout
+        result = self.redis._cmd(['BRPOP', self.EVENTS_KEY, self._wake_key, self.POP_TIMEOUT])
+        return [result[1]] if result and result[0] == self.EVENTS_KEY else []
+
     def _poll_events(self):
         """Poll for events from other nodes."""
+        own_prefix = self._own_prefix
+        # Hoisted out of the loop; handlers registered later still land in this dict
+        handlers = self._handlers
         while self._running:
             try:
-                # Use BRPOP for blocking pop with timeout
-                result = self.redis._cmd(['BRPOP', 'openclaw:cluster:events', '1'])
-                if result and len(result) >= 2:
-                    event_json = result[1]
-                    event = json.loads(event_json)
-                    
-                    # Ignore our own events
-                    if event.get('node_id') == self.node_id:
+                for event_json in self._pop_events():
+                    if isinstance(event_json, bytes):
+                        event_json = event_json.decode()
+                    # Ignore our own events without parsing them
+                    if event_json.startswith(own_prefix):
                         continue
+                    # Read the type off the head of the JSON; the full parse only
+                    # happens for events a handler wants
+                    head = _EVENT_HEAD.match(event_json)
+                    if head is None:
+                        event = _loads(event_json)
+                        if event.get('node_id') == self.node_id:
+                            continue
+                        event_type = event.get('type')
+                    else:
+                        if head.group(1) == self.node_id:
+                            continue
+                        event = None
+                        event_type = head.group(2)
                     
                     # Dispatch to handler
-                    event_type = event.get('type')
-                    if event_type in self._handlers:
+                    handler = handlers.get(event_type)
+                    if handler is not None:
+                        if event is None:
+                            event = _loads(event_json)
                         try:
-                            self._handlers[event_type](event)
+                            handler(event)
                         except Exception as e:
                             print(f"[StateSync] Handler error: {e}")
             except Exception as e:
@@ -4,6 +4,7 @@ OpenClaw Distributed - Leader Election 测试脚本 (兼容版)
 移除 Emoji 以防止 Windows GBK 环境下的编码崩溃。
 """
 
+import asyncio
 import json
 import time
 import sys
@@ -15,7 +16,7 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from redis_client import RedisClient
+from redis_client import PooledRedisClient
 from leader_election import LeaderElection
 from config_loader import get_redis_config
 
@@ -71,35 +72,42 @@ def test_single_node():
     print("\n[PASS] Single node test completed!")
 
 
-def test_multi_node(num_nodes: int = 3, duration: float = 10.0):
-    """多节点并发测试"""
-    print("\n" + "=" * 60)
-    print(f"TEST: Multi-node Concurrency ({num_nodes} nodes, {duration}s)")
-    print("=" * 60)
+def _record_tick(node_id: str, state: str, results: Dict[str, Dict[str, Any]]):
+    """按 tick() 的结果累加该节点的计数"""
+    if state == 'acquired':
+        stats = results[node_id]
+        stats['become'] += 1
+        stats['last_event_time'] = time.time()
+        print(f"[*] [{node_id}] BECAME LEADER")
+    elif state == 'leader':
+        stats = results[node_id]
+        stats['renew'] += 1
+        stats['last_event_time'] = time.time()
 
-    redis_config = load_redis_config()
-    results: Dict[str, List[str]] = {f"node-{i}": [] for i in range(num_nodes)}
+
+def _run_threads(redis_config: Dict[str, Any], results: Dict[str, Dict[str, Any]], duration: float):
+    """每个节点一个线程，共用一个 PooledRedisClient（对照用）"""
     stop_event = threading.Event()
+    # 所有节点共用一个连接池：每条命令借出一条已握手的连接，用完归还，
+    # 连接数与 AUTH 次数不随节点数增长到每节点一条
+    client = PooledRedisClient(max_connections=max(len(results), 8), **redis_config)
 
     def node_worker(node_id: str, results: Dict):
-        election = LeaderElection(node_id=node_id, redis_config=redis_config, lock_ttl=5)
-        while not stop_event.is_set():
-            if not election.is_leader():
-                success = election.try_acquire_leadership()
-                if success:
-                    results[node_id].append(f"become_leader@{time.time():.2f}")
-                    print(f"[*] [{node_id}] BECAME LEADER")
-            else:
-                election.renew_leadership()
-                results[node_id].append(f"renew@{time.time():.2f}")
-            time.sleep(1)
+        election = LeaderElection(node_id=node_id, redis_client=client, lock_ttl=5)
+        while True:
+            # 续约 / 竞选在一次 EVALSHA（或 FCALL）中完成
+            state, _, _ = election.tick()
+            _record_tick(node_id, state, results)
+            # 可被 stop_event 立即打断的等待
+            if stop_event.wait(1):
+                break
 
         if election.is_leader():
             election.release_leadership()
 
     threads = []
-    for i in range(num_nodes):
-        t = threading.Thread(target=node_worker, args=(f"node-{i}", results))
+    for node_id in results:
+        t = threading.Thread(target=node_worker, args=(node_id, results))
         t.start()
         threads.append(t)
         time.sleep(0.2)
@@ -108,11 +116,61 @@ def test_multi_node(num_nodes: int = 3, duration: float = 10.0):
     stop_event.set()
     for t in threads:
         t.join()
+    client.close()
+
+
+async def _run_async(redis_config: Dict[str, Any], results: Dict[str, Dict[str, Any]], duration: float):
+    """
+    所有节点作为协程跑在同一个事件循环里：tick() 是阻塞调用，经 asyncio.to_thread
+    放到线程池执行，各节点的往返可以并发；线程池里的调用共用一个连接池
+    """
+    client = PooledRedisClient(max_connections=max(len(results), 8), **redis_config)
+    stop = asyncio.Event()
+
+    async def node_worker(node_id: str):
+        election = LeaderElection(node_id=node_id, redis_client=client, lock_ttl=5)
+        while True:
+            state, _, _ = await asyncio.to_thread(election.tick)
+            _record_tick(node_id, state, results)
+            try:
+                await asyncio.wait_for(stop.wait(), 1)
+                break
+            except asyncio.TimeoutError:
+                pass
+
+        if election.is_leader():
+            await asyncio.to_thread(election.release_leadership)
+
+    tasks = []
+    for node_id in results:
+        tasks.append(asyncio.create_task(node_worker(node_id)))
+        await asyncio.sleep(0.2)
+
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    client.close()
+
+
+def test_multi_node(num_nodes: int = 3, duration: float = 10.0, use_threads: bool = False):
+    """多节点并发测试（默认 asyncio，tick 经 to_thread 并发执行；use_threads 时每节点一个线程）"""
+    print("\n" + "=" * 60)
+    print(f"TEST: Multi-node Concurrency ({num_nodes} nodes, {duration}s)")
+    print("=" * 60)
+
+    redis_config = load_redis_config()
+    results: Dict[str, Dict[str, Any]] = {
+        f"node-{i}": {'become': 0, 'renew': 0, 'last_event_time': None} for i in range(num_nodes)
+    }
+
+    if use_threads:
+        _run_threads(redis_config, results, duration)
+    else:
+        asyncio.run(_run_async(redis_config, results, duration))
 
     print("\nSTATS:")
-    for node_id, events in results.items():
-        become_count = sum(1 for e in events if 'become' in e)
-        print(f"   {node_id}: Elected {become_count} times")
+    for node_id, stats in results.items():
+        print(f"   {node_id}: Elected {stats['become']} times")
 
     print("\n[PASS] Multi-node test completed!")
 
@@ -120,12 +178,13 @@ def test_multi_node(num_nodes: int = 3, duration: float = 10.0):
 def main():
     parser = argparse.ArgumentParser(description='Leader Election Test Tool')
     parser.add_argument('--mode', choices=['single', 'multi'], default='single', help='Mode')
+    parser.add_argument('--threads', action='store_true', help='multi 模式下每节点一个线程，共用一个连接池（对照用）')
     args = parser.parse_args()
 
     if args.mode == 'single':
         test_single_node()
     else:
-        test_multi_node()
+        test_multi_node(use_threads=args.threads)
 
     print("\n[FINISH] All tests completed!")
 
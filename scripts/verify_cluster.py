@@ -4,95 +4,138 @@
 """
 
 import sys
-import json
 import time
 from pathlib import Path
+from typing import List
 
 sys.path.insert(0, Path(__file__).parent)
 from redis_client import RedisClient
 from node_discovery import NodeRegistry
+from agent_chat import inbox_stream_key
 from config_loader import get_redis_config
+from serialization import loads as _loads
+
+
+def _parse_node_info(raw) -> dict:
+    """注册表里的节点信息 JSON；损坏的条目按空信息处理，不中断验证"""
+    try:
+        info = _loads(raw)
+    except ValueError:
+        return {}
+    return info if isinstance(info, dict) else {}
 
 
 def verify_cluster():
     redis_cfg = get_redis_config()
     redis = RedisClient(**redis_cfg)
     redis.connect()
+
+    # 输出先攒在 out 里，结尾一次写出；终端上逐节刷新，保持边查边显示
+    out: List[str] = []
+    emit = out.append
+    interactive = sys.stdout.isatty()
+
+    def flush():
+        if out:
+            sys.stdout.write('\n'.join(out) + '\n')
+            sys.stdout.flush()
+            out.clear()
     
-    print('=' * 50)
-    print('集群状态验证')
-    print('=' * 50)
+    try:
+        emit('=' * 50)
+        emit('集群状态验证')
+        emit('=' * 50)
     
-    # 1. 使用动态发现（不打死名字）
-    print('\n1️⃣  动态Leader发现')
-    leader = redis.get('openclaw:cluster:leader_lock')
-    if leader:
-        leader_name = leader.split(':')[0] if ':' in leader else leader
-        print(f'   ✅ Leader: {leader_name}')
-    else:
-        print('   ⚠️  无Leader')
+        # 1. 使用动态发现（不打死名字）
+        emit('\n1️⃣  动态Leader发现')
+        leader = redis.get('openclaw:cluster:leader_lock')
+        if leader:
+            leader_name = leader.split(':')[0] if ':' in leader else leader
+            emit(f'   ✅ Leader: {leader_name}')
+        else:
+            emit('   ⚠️  无Leader')
     
-    # 2. 注册表状态
-    print('\n2️⃣  节点注册表')
-    registry = NodeRegistry(redis, 'verify-script')
-    nodes = registry.get_all_nodes()
-    online = [n for n in nodes if n.get('is_online')]
-    print(f'   总计: {len(nodes)} 个')
-    print(f'   在线: {len(online)} 个')
+        if interactive:
+            flush()
+
+        # 2. 注册表状态
+        emit('\n2️⃣  节点注册表')
+        registry = NodeRegistry(redis)
+        online_ids = set(registry.get_online_nodes())
+        # 一次 HGETALL 取回全部节点信息，再整批解析
+        nodes = {node_id: _parse_node_info(info)
+                 for node_id, info in redis.hgetall(registry.NODES_KEY).items()}
+        emit(f'   总计: {len(nodes)} 个')
+        emit(f'   在线: {sum(node_id in online_ids for node_id in nodes)} 个')
     
-    for node in nodes:
-        status = '🟢' if node.get('is_online') else '🔴'
-        leader_flag = '👑' if node.get('is_leader') else '  '
-        print(f'   {status} {leader_flag} {node["node_id"]} ({node.get("age_seconds", 0):.0f}s)')
+        for node_id, info in nodes.items():
+            status = '🟢' if node_id in online_ids else '🔴'
+            leader_flag = '👑' if info.get('is_leader') or info.get('state') == 'leader' else '  '
+            emit(f'   {status} {leader_flag} {node_id}')
     
-    # 3. 心跳检测（动态获取所有）
-    print('\n3️⃣  心跳状态')
-    all_nodes = redis.hgetall('openclaw:cluster:nodes')
-    hb_status = []
-    for node_id in all_nodes:
-        hb = redis.get(f'hb:{node_id}')
-        if hb:
-            data = json.loads(hb)
-            age = time.time() - data['timestamp']
-            is_leader = data.get('is_leader', False)
-            hb_status.append({
-                'node_id': node_id,
-                'age': age,
-                'is_leader': is_leader,
-                'online': age < 60
-            })
+        if interactive:
+            flush()
+
+        # 3. 心跳检测（动态获取所有）
+        emit('\n3️⃣  心跳状态')
+        all_nodes = list(nodes)  # 第 2 步已取回注册表，不再单独 HKEYS
+        hb_status = []
+        # 一次 MGET 取回所有心跳，不再逐个 GET
+        heartbeats = redis.mget([f'hb:{node_id}' for node_id in all_nodes]) if all_nodes else []
+        for node_id, hb in zip(all_nodes, heartbeats):
+            if hb:
+                data = _loads(hb)
+                age = time.time() - data['timestamp']
+                is_leader = data.get('is_leader', False)
+                hb_status.append({
+                    'node_id': node_id,
+                    'age': age,
+                    'is_leader': is_leader,
+                    'online': age < 60
+                })
             
-    for h in hb_status:
-        status = '🟢' if h['online'] else '🔴'
-        leader = '👑' if h['is_leader'] else '  '
-        print(f'   {status} {leader} {h["node_id"]}: {h["age"]:.0f}s')
-    
-    # 4. 投诉检测
-    print('\n4️⃣  通信频道')
-    chat_keys = [
-        'openclaw:chat:RouterLadderbot',
-        'openclaw:chat:sx_squid_bot',
-        'openclaw:chat:main-node'
-    ]
-    for key in chat_keys:
-        count = redis.llen(key)
-        print(f'   📨 {key}: {count} 条')
+        for h in hb_status:
+            status = '🟢' if h['online'] else '🔴'
+            leader = '👑' if h['is_leader'] else '  '
+            emit(f'   {status} {leader} {h["node_id"]}: {h["age"]:.0f}s')
     
-    print('\n' + '=' * 50)
-    print('验证结论')
-    print('=' * 50)
+        if interactive:
+            flush()
+
+        # 4. 投诉检测
+        emit('\n4️⃣  通信频道')
+        chat_keys = [
+            inbox_stream_key('RouterLadderbot'),
+            inbox_stream_key('sx_squid_bot'),
+            inbox_stream_key('main-node')
+        ]
+        pipe = redis.pipeline(transaction=False)
+        for key in chat_keys:
+            pipe.xlen(key)
+        for key, count in zip(chat_keys, pipe.execute()):
+            emit(f'   📨 {key}: {count} 条')
     
-    if leader and len([h for h in hb_status if h['online']]) >= 1:
-        print('✅ 集群状态正常')
-        print(f'✅ Leader: {leader_name}')
-        print(f'✅ 在线节点: {len([h for h in hb_status if h["online"]])}')
-    else:
-        print('⚠️  集群需要关注')
-        if not leader:
-            print('❌ 无Leader')
-        if len([h for h in hb_status if h['online']]) == 0:
-            print('❌ 无在线节点')
+        if interactive:
+            flush()
+
+        emit('\n' + '=' * 50)
+        emit('验证结论')
+        emit('=' * 50)
     
+        if leader and len([h for h in hb_status if h['online']]) >= 1:
+            emit('✅ 集群状态正常')
+            emit(f'✅ Leader: {leader_name}')
+            emit(f'✅ 在线节点: {len([h for h in hb_status if h["online"]])}')
+        else:
+            emit('⚠️  集群需要关注')
+            if not leader:
+                emit('❌ 无Leader')
+            if len([h for h in hb_status if h['online']]) == 0:
+                emit('❌ 无在线节点')
+    finally:
+        # 中途出错时已收集的输出也要写出
+        flush()
+
     return leader is not None
 
 
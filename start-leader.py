@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 """Start as Leader node"""
 import json
+import os
+import select
+import signal
 import time
 import sys
 sys.path.insert(0, '~/clawd/skills/clawster/scripts')
 
 from redis_client import RedisClient
+from node_discovery import FAILED_NODES_KEY
+from serialization import dumps as _dumps
 
 # Load config
 with open('~/clawd/skills/clawster/config.json') as f:
@@ -33,7 +38,10 @@ node_info = {
     'registered_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
     'capabilities': ['leader', 'task-assigner']
 }
-r.hset('openclaw:cluster:nodes', node_id, json.dumps(node_info))
+pipe = r.pipeline(transaction=False)
+pipe.hset('openclaw:cluster:nodes', node_id, json.dumps(node_info))
+pipe.srem(FAILED_NODES_KEY, node_id)  # 重新注册即已恢复，移出故障集合
+pipe.execute()
 print(f"[Leader] Registered as LEADER")
 
 # Set leader lock
@@ -43,20 +51,36 @@ r.delete(lock_key)
 r.setex(lock_key, 60, lock_value)
 
 leader_data = {'node_id': node_id, 'term': term, 'elected_at': time.time()}
-r.setex('openclaw:cluster:leader', 60, json.dumps(leader_data))
+# Never changes after election: encoded once, reused on every tick
+leader_data_json = _dumps(leader_data)
+r.setex('openclaw:cluster:leader', 60, leader_data_json)
 print(f"[Leader] Acquired leadership (term {term})")
 
+# SIGINT/SIGTERM only write a byte to the wakeup pipe; the loop waits on it
+# instead of sleeping, so it steps down the moment a signal arrives
+wakeup_r, wakeup_w = os.pipe()
+os.set_blocking(wakeup_w, False)
+signal.set_wakeup_fd(wakeup_w)
+for signum in (signal.SIGINT, signal.SIGTERM):
+    signal.signal(signum, lambda *_: None)
+
 # Heartbeat loop
 print(f"[Leader] Heartbeat started...")
-try:
-    while True:
-        r.setex(lock_key, 60, lock_value)
-        r.setex('openclaw:cluster:leader', 60, json.dumps(leader_data))
-        hb_data = json.dumps({'timestamp': time.time(), 'state': 'leader', 'term': term})
-        r.setex(f'hb:{node_id}', 30, hb_data)
-        time.sleep(5)
-except KeyboardInterrupt:
-    print(f"\n[Leader] Stopping...")
-    r.delete('openclaw:cluster:leader')
-    r.delete(lock_key)
-    print(f"[Leader] Stepped down")
+while True:
+    now = time.time()
+    hb_data = _dumps({'timestamp': now, 'state': 'leader', 'term': term})
+    # Lock, leader record and heartbeat refreshed in one round trip
+    pipe = r.pipeline(transaction=False)
+    pipe.setex(lock_key, 60, lock_value)
+    pipe.setex('openclaw:cluster:leader', 60, leader_data_json)
+    pipe.setex(f'hb:{node_id}', 30, hb_data)
+    pipe.zadd('openclaw:cluster:hb', {node_id: now})
+    pipe.execute()
+    ready, _, _ = select.select([wakeup_r], [], [], 5)
+    if ready:
+        break
+
+print(f"\n[Leader] Stopping...")
+r.delete('openclaw:cluster:leader')
+r.delete(lock_key)
+print(f"[Leader] Stepped down")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+代理聊天（scripts/agent_chat.py）测试
+Stream 收件箱 + 消费者组：处理后 ack、重启后重投 PEL、旧版 List 收件箱兼容、消息编解码。
+
+运行: python -m pytest -q test_agent_chat.py（需安装 fakeredis）
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from agent_chat import AgentChat, AgentMessage, decode_message, encode_message, inbox_stream_key
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeRedis()
+
+
+def _contents(messages):
+    return [m.content for m in messages]
+
+
+def test_send_and_read(redis):
+    a, b = AgentChat('agent-a', redis_client=redis), AgentChat('agent-b', redis_client=redis)
+    a.send_message('agent-b', 'one')
+    a.send_many(['agent-b', 'agent-c'], lambda to: f'two for {to}')
+    assert redis.xlen(inbox_stream_key('agent-b')) == 2
+    assert b.get_unread_count() == 2
+
+    messages = b.get_messages(count=10, clear=True)
+    assert _contents(messages) == ['one', 'two for agent-b']
+    assert messages[0].from_agent == 'agent-a' and messages[0].type == 'general'
+    assert b.ack() == 2
+    assert b.get_unread_count() == 0
+    assert b.get_messages(count=10, clear=True) == []
+    assert _contents(a.get_history(count=5)) == ['two for agent-c', 'two for agent-b', 'one']
+
+
+def test_unacked_messages_redelivered_after_restart(redis):
+    a = AgentChat('agent-a', redis_client=redis)
+    b = AgentChat('agent-b', redis_client=redis)
+    a.send_message('agent-b', 'one')
+    a.send_message('agent-b', 'two')
+    assert _contents(b.get_messages(count=10, clear=True)) == ['one', 'two']
+    # 处理中途退出：没有 ack，消息留在 PEL 中，仍计入未读
+    assert b.get_unread_count() == 2
+
+    restarted = AgentChat('agent-b', redis_client=redis)
+    a.send_message('agent-b', 'three')
+    assert _contents(restarted.get_messages(count=10, clear=True)) == ['one', 'two', 'three']
+    assert restarted.ack() == 3
+    assert restarted.get_unread_count() == 0
+
+
+def test_peek_does_not_consume(redis):
+    a, b = AgentChat('agent-a', redis_client=redis), AgentChat('agent-b', redis_client=redis)
+    a.send_message('agent-b', 'one')
+    a.send_message('agent-b', 'two')
+    assert _contents(b.get_messages(count=10)) == ['two', 'one']  # 最新在前
+    assert b.get_latest_message().content == 'two'
+    assert b.get_unread_count() == 2
+
+
+def test_group_created_on_first_read(redis):
+    b = AgentChat('agent-b', redis_client=redis)
+    assert not redis.exists(inbox_stream_key('agent-b'))  # 构造时不发命令
+    assert b.get_unread_count() == 0
+    AgentChat('agent-a', redis_client=redis).send_message('agent-b', 'hello')
+    assert b.get_unread_count() == 1  # 组尚未创建：收件箱全部算未读
+    assert _contents(b.get_messages(clear=True)) == ['hello']
+    assert redis.xinfo_groups(inbox_stream_key('agent-b'))[0]['name'] == b'agent-b'
+
+
+def test_legacy_list_inbox_drained_first(redis):
+    a, b = AgentChat('agent-a', redis_client=redis), AgentChat('agent-b', redis_client=redis)
+    legacy, _ = a.compose_message('agent-b', 'legacy')
+    redis.rpush(b.chat_key, encode_message(legacy.to_wire()))
+    a.send_message('agent-b', 'stream')
+    assert b.get_unread_count() == 2
+    assert _contents(b.get_messages(count=10, clear=True)) == ['legacy', 'stream']
+    assert not redis.exists(b.chat_key)
+
+
+def test_wire_format_round_trip():
+    msg = AgentMessage(msg_id='agent-a:1', from_agent='agent-a', to_agent='agent-b',
+                       timestamp=1.5, topic='self_evolution', content='内容',
+                       task_proposal={'tasks': ['x'], 'status': 'pending'})
+    wire = msg.to_wire()
+    assert 'i' in wire and 'priority' not in wire and 'p' not in wire  # 短字段名，省略 None
+    assert AgentMessage.from_dict(decode_message(encode_message(wire))) == msg
+    assert AgentMessage.from_dict(msg.to_dict()) == msg  # 2号协议的完整字段名
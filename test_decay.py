@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+MemoryDecayFilter tests (clawster/memory/decay.py): the NumPy column sweep
+must agree with the scalar ACT-R score, with and without NumPy installed.
+
+Run: python -m pytest -q test_decay.py
+"""
+import math
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from clawster.memory import decay
+from clawster.memory.decay import MemoryDecayFilter, MemoryEntry
+
+NOW = datetime(2026, 1, 1)
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def make_filter(request, monkeypatch):
+    """MemoryDecayFilter factory for both column backends."""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(decay, 'np', None)
+    return MemoryDecayFilter
+
+
+def _populate(mdf, n=200):
+    """n memories aged 0..n-1 days; every third one accessed (n > 64 grows the columns)."""
+    for i in range(n):
+        mdf.add(f'm{i}', f'content {i}', NOW - timedelta(days=i))
+        for _ in range(i % 3):
+            mdf.access(f'm{i}')
+
+
+def test_filter_matches_scalar_score(make_filter):
+    mdf = make_filter(half_life_days=30, relevance_threshold=0.3)
+    _populate(mdf)
+    keep, shed = mdf.filter_by_relevance(NOW)
+    assert len(keep) + len(shed) == len(mdf) == 200
+    for memory_id in keep:
+        assert mdf.entry(memory_id).relevance_score(NOW, 30) >= 0.3
+    for memory_id in shed:
+        assert mdf.entry(memory_id).relevance_score(NOW, 30) < 0.3
+    assert keep and shed
+
+
+def test_backends_agree(monkeypatch):
+    pytest.importorskip('numpy')
+    vectorized = MemoryDecayFilter()
+    _populate(vectorized)
+    monkeypatch.setattr(decay, 'np', None)
+    scalar = MemoryDecayFilter()
+    _populate(scalar)
+    assert vectorized.filter_by_relevance(NOW) == scalar.filter_by_relevance(NOW)
+    for (s1, id1, _), (s2, id2, _) in zip(vectorized.scored(NOW), scalar.scored(NOW)):
+        assert id1 == id2
+        assert s1 == pytest.approx(s2)
+
+
+def test_scored_limit_is_top_k(make_filter):
+    mdf = make_filter()
+    _populate(mdf)
+    everything = mdf.scored(NOW)
+    top = mdf.scored(NOW, limit=5)
+    assert [s for s, _, _ in top] == [s for s, _, _ in everything[:5]]
+    assert all(a[0] >= b[0] for a, b in zip(everything, everything[1:]))
+
+
+def test_remove_keeps_rows_consistent(make_filter):
+    mdf = make_filter()
+    _populate(mdf, n=10)
+    before = {f'm{i}': mdf.entry(f'm{i}') for i in range(10)}
+    assert mdf.remove('m0')  # swap-remove moves m9 into row 0
+    assert not mdf.remove('m0')
+    assert 'm0' not in mdf and len(mdf) == 9
+    for memory_id in [f'm{i}' for i in range(1, 10)]:
+        entry = mdf.entry(memory_id)
+        assert entry.content == before[memory_id].content
+        assert entry.access_count == before[memory_id].access_count
+
+
+def test_relevance_score_defaults():
+    entry = MemoryEntry(content='x', timestamp=NOW - timedelta(days=30))
+    assert entry.relevance_score(NOW) == pytest.approx(0.5)  # one 30-day half-life
+    entry.access_count = 4
+    assert entry.relevance_score(NOW) == pytest.approx(0.5 * (1 + math.log(5) / 5))
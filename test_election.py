@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Leader 选举脚本（scripts/leader_election.py）测试
+在进程内 fakeredis 上执行真实 Lua：tick 续约/竞选、比较并删除的释放、NOSCRIPT 重载，
+以及 Redis >= 7 时经 FCALL 调用函数库（fakeredis 不支持 Functions，用 EVAL 模拟）。
+
+运行: python -m pytest -q test_election.py（需安装 fakeredis 与 lupa）
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+fakeredis = pytest.importorskip('fakeredis')
+pytest.importorskip('lupa')
+
+from leader_election import LeaderElection, _function_library
+from redis.exceptions import ResponseError
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+class _Redis7(fakeredis.FakeRedis):
+    """报告 7.x 版本；FUNCTION LOAD / FCALL 用 EVAL 执行同名脚本来模拟，并记录调用顺序"""
+
+    def __init__(self, *args, fcall_error=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.library = None
+        self.calls = []
+        self.fcall_error = fcall_error
+        self.scripts = {name: script for script, name in LeaderElection.FUNCTIONS.items()}
+
+    def info(self, section=None, *args, **kwargs):
+        return {'redis_version': '7.2.4'}
+
+    def evalsha(self, *args):
+        self.calls.append('EVALSHA')
+        return super().evalsha(*args)
+
+    def execute_command(self, *args, **options):
+        command = str(args[0]).upper()
+        if command == 'FUNCTION':
+            self.calls.append('FUNCTION LOAD')
+            self.library = args[-1]
+            return 'openclaw'
+        if command == 'FCALL':
+            self.calls.append(f'FCALL {args[1]}')
+            if self.fcall_error:
+                raise ResponseError(self.fcall_error)
+            if self.library is None:
+                raise ResponseError('ERR Function not found')
+            return self.eval(self.scripts[args[1]], *args[2:])
+        return super().execute_command(*args, **options)
+
+
+def _election(redis, node_id):
+    return LeaderElection(node_id, redis_client=redis, auto_release=False)
+
+
+def test_tick_acquire_renew_follow(redis):
+    a, b = _election(redis, 'node-a'), _election(redis, 'node-b')
+    state, pttl, holder = a.tick()
+    assert state == 'acquired' and holder.startswith('node-a:') and pttl == 30000
+    assert a.tick()[0] == 'leader'
+    state, pttl, holder = b.tick()
+    assert state == 'follower' and holder == a._lock_value and 0 < pttl <= 30000
+    assert not b._is_leader
+    assert len(redis.lrange(LeaderElection.HISTORY_KEY, 0, -1)) == 1  # 只有当选写历史
+
+
+def test_tick_recovers_own_lock_after_restart(redis):
+    _election(redis, 'node-a').tick()
+    restarted = _election(redis, 'node-a')
+    assert restarted.tick()[0] == 'leader'
+    assert restarted._is_leader
+
+
+def test_release_only_deletes_own_lock(redis):
+    a, b = _election(redis, 'node-a'), _election(redis, 'node-b')
+    a.tick()
+    redis.delete(LeaderElection.LEADER_LOCK_KEY)  # a 的锁过期，b 当选
+    assert b.tick()[0] == 'acquired'
+    assert a.release_leadership()
+    assert redis.get(LeaderElection.LEADER_LOCK_KEY) == b._lock_value
+    assert not a._is_leader
+    assert b.release_leadership()
+    assert redis.get(LeaderElection.LEADER_LOCK_KEY) is None
+
+
+def test_renew_fails_once_lock_is_taken(redis):
+    a, b = _election(redis, 'node-a'), _election(redis, 'node-b')
+    assert a.try_acquire_leadership()
+    assert not b.try_acquire_leadership()
+    assert a.renew_leadership()
+    redis.set(LeaderElection.LEADER_LOCK_KEY, 'node-b:1')
+    assert not a.renew_leadership()
+    assert not a._is_leader
+
+
+def test_evalsha_reloads_after_script_flush(redis):
+    a = _election(redis, 'node-a')
+    a.tick()
+    redis.script_flush()
+    assert a.tick()[0] == 'leader'
+
+
+def test_functions_loaded_on_first_fcall():
+    redis = _Redis7(decode_responses=True)
+    a = _election(redis, 'node-a')
+    assert a.tick()[0] == 'acquired'
+    assert a.tick()[0] == 'leader'
+    assert a.release_leadership()
+    assert redis.calls == ['FCALL openclaw_tick', 'FUNCTION LOAD', 'FCALL openclaw_tick',
+                           'FCALL openclaw_tick', 'FCALL openclaw_release']
+    assert redis.library == LeaderElection.FUNCTION_LIBRARY
+    assert redis.get(LeaderElection.LEADER_LOCK_KEY) is None
+
+
+def test_functions_unavailable_falls_back_to_evalsha():
+    redis = _Redis7(decode_responses=True, fcall_error="ERR unknown command 'FCALL'")
+    a = _election(redis, 'node-a')
+    assert a.tick()[0] == 'acquired'
+    assert a.tick()[0] == 'leader'
+    # 首次 EVALSHA 收到 NOSCRIPT，SCRIPT LOAD 后重试；之后不再尝试 FCALL
+    assert redis.calls == ['FCALL openclaw_tick', 'EVALSHA', 'EVALSHA', 'EVALSHA']
+    assert a._functions_ok is False
+
+
+def test_function_library_registers_every_script():
+    lua51 = pytest.importorskip('lupa.lua51')  # Redis 内嵌的是 Lua 5.1，与 fakeredis 使用同一运行时
+    lua = lua51.LuaRuntime()
+    # 库代码在 Lua 中编译执行，register_function 只记下函数名
+    lua.execute('names = {}; redis = {register_function = function(name, fn) names[#names + 1] = name end}')
+    library = _function_library('openclaw', LeaderElection.FUNCTIONS)
+    assert library.startswith('#!lua name=openclaw\n')
+    lua.execute(library.split('\n', 1)[1])
+    assert sorted(lua.globals().names.values()) == sorted(LeaderElection.FUNCTIONS.values())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+故障转移（scripts/failover_manager.py）测试
+失败节点集合：标记失败 SADD、恢复与重新注册 SREM、旧数据回填；会话按节点索引迁移。
+
+运行: python -m pytest -q test_failover.py（需安装 fakeredis）
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from failover_manager import FAILED_NODES_KEY, FailoverManager, node_sessions_key
+from node_discovery import NodeRegistry
+
+NODES_KEY = 'openclaw:cluster:nodes'
+
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def _add_node(redis, node_id, state):
+    redis.hset(NODES_KEY, node_id, json.dumps({'node_id': node_id, 'state': state}))
+
+
+def test_mark_failed_and_recover(redis):
+    _add_node(redis, 'node-a', 'follower')
+    fm = FailoverManager(redis, {})
+    assert fm.mark_nodes_failed(['node-b', 'node-a', 'node-b'])
+    assert redis.smembers(FAILED_NODES_KEY) == {'node-a', 'node-b'}
+    assert fm.get_failed_nodes() == ['node-a', 'node-b']
+    assert json.loads(redis.hget(NODES_KEY, 'node-a'))['state'] == 'failed'
+
+    assert fm.recover_node('node-a')
+    assert fm.get_failed_nodes() == ['node-b']
+    assert json.loads(redis.hget(NODES_KEY, 'node-a'))['state'] == 'suspected'
+    assert not fm.recover_node('node-a')  # 已不在失败状态
+    assert fm.get_failed_nodes() == ['node-b']
+
+
+def test_register_leaves_failed_set(redis):
+    fm = FailoverManager(redis, {})
+    fm.mark_node_failed('node-a')
+    assert NodeRegistry(redis).register('node-a', {'node_id': 'node-a', 'state': 'follower'})
+    assert fm.get_failed_nodes() == []
+
+
+def test_backfill_reconciles_with_node_states(redis):
+    # 集合出现之前标记为失败的节点，以及未清理的已恢复节点
+    _add_node(redis, 'old-failed', 'failed')
+    _add_node(redis, 'healthy', 'leader')
+    redis.sadd(FAILED_NODES_KEY, 'healthy')
+    redis.hset(NODES_KEY, 'garbage', 'not json')
+    fm = FailoverManager(redis, {})
+    assert fm.get_failed_nodes() == ['old-failed']
+    redis.sadd(FAILED_NODES_KEY, 'healthy')  # 每个实例只回填一次
+    assert fm.get_failed_nodes() == ['healthy', 'old-failed']
+
+
+def test_failover_migrates_indexed_and_legacy_sessions(redis):
+    fm = FailoverManager(redis, {})
+    fm.save_session('openclaw:cluster:sessions:s1', {'node_id': 'node-a'})
+    fm.save_session('openclaw:cluster:sessions:s2', {'node_id': 'node-a'})
+    fm.save_session('openclaw:cluster:sessions:s2', {'node_id': 'node-b'}, previous_node='node-a')
+    redis.set('openclaw:cluster:sessions:legacy', json.dumps({'node_id': 'node-c'}))
+
+    assert fm._migrate_sessions('node-a') == 1
+    s1 = json.loads(redis.get('openclaw:cluster:sessions:s1'))
+    assert s1['node_id'] == 'migrating' and s1['migrated_from'] == 'node-a'
+    assert json.loads(redis.get('openclaw:cluster:sessions:s2'))['node_id'] == 'node-b'
+    assert not redis.exists(node_sessions_key('node-a'))
+
+    # 没有索引的旧会话回退到 SCAN
+    assert fm._migrate_sessions('node-c') == 1
+    assert json.loads(redis.get('openclaw:cluster:sessions:legacy'))['migrated_from'] == 'node-c'
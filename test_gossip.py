@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+GossipProtocol tests (clawster/protocol/gossip.py): dedup on canonical
+digests, bounded seen-set, fanout selection and the small-cluster guard.
+
+Run: python -m pytest -q test_gossip.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from clawster.protocol.gossip import GossipProtocol, _adaptive_fanout, _message_digest
+
+
+def _message(node_id='peer_a', clock=None, **payload):
+    return {
+        'node_id': node_id,
+        'timestamp': '2026-01-01T00:00:00',
+        'output_type': 'gossip',
+        'payload': payload,
+        'version': '0.2.0',
+        'vector_clock': clock or {node_id: 1},
+    }
+
+
+def _receiver():
+    """Protocol that has already created gossip: a peer's first clock is concurrent, then equal."""
+    gp = GossipProtocol('test_node')
+    gp.vector_clock.increment()
+    return gp
+
+
+def _run_round(gp):
+    """One _gossip_round; returns the peers pushed to."""
+    sent = []
+
+    async def gossip_func(target, message):
+        sent.append(target)
+
+    asyncio.run(gp._gossip_round(gossip_func))
+    return sent
+
+
+def test_digest_ignores_key_order():
+    a = _message(data='x')
+    b = dict(reversed(list(a.items())))
+    assert _message_digest(a) == _message_digest(b)
+    assert _message_digest(a) != _message_digest(_message(data='y'))
+
+
+def test_duplicate_rejected():
+    gp = _receiver()
+    assert gp.receive_gossip(_message(data='x')) == (True, 'Accepted')
+    assert gp.receive_gossip(_message(data='x')) == (False, 'Duplicate')
+
+
+def test_seen_set_is_bounded_fifo():
+    gp = _receiver()
+    gp._seen_cap = 3
+    for i in range(5):
+        assert gp.receive_gossip(_message(data=i))[0]
+    assert len(gp._seen_messages) == 3
+    # The oldest digests were evicted, so those messages are accepted again
+    assert gp.receive_gossip(_message(data=0))[0]
+    assert gp.receive_gossip(_message(data=4)) == (False, 'Duplicate')
+
+
+def test_known_nodes_learned_from_gossip():
+    gp = _receiver()
+    assert gp.receive_gossip(_message(known_nodes=['peer_a', 'peer_b', 'peer_a']))[0]
+    assert sorted(gp._known_nodes_list) == ['peer_a', 'peer_b']
+
+
+def test_adaptive_fanout_is_logarithmic():
+    assert _adaptive_fanout(1) == 2
+    assert _adaptive_fanout(10) == 3
+    assert _adaptive_fanout(30) == 13
+    assert _adaptive_fanout(1000) == 18
+    values = [_adaptive_fanout(n) for n in range(1, 5000)]
+    assert values == sorted(values)
+
+
+@pytest.mark.parametrize('fanout, peers, expected', [(3, 10, 3), (None, 100, _adaptive_fanout(100))])
+def test_round_pushes_to_distinct_peers(fanout, peers, expected):
+    gp = GossipProtocol('test_node', fanout=fanout)
+    for i in range(peers):
+        gp.register_node(f'peer_{i}')
+    sent = _run_round(gp)
+    assert len(sent) == len(set(sent)) == expected
+    assert sorted(gp._known_nodes_list) == sorted(gp._known_nodes)  # sampling swaps in place
+
+
+def test_fixed_fanout_waits_for_enough_peers():
+    gp = GossipProtocol('test_node', fanout=3)
+    gp.register_node('peer_a')
+    gp.register_node('peer_b')
+    assert _run_round(gp) == []
+    gp.register_node('peer_c')
+    assert sorted(_run_round(gp)) == ['peer_a', 'peer_b', 'peer_c']
+
+
+def test_adaptive_fanout_gossips_with_one_peer():
+    gp = GossipProtocol('test_node', fanout=None)
+    assert _run_round(gp) == []
+    gp.register_node('peer_a')
+    assert _run_round(gp) == ['peer_a']
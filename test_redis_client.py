@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+RESP 客户端（scripts/redis_client.py）测试
+对 fakeredis 的 TcpFakeServer 走真实 socket：pipeline / MULTI、NOSCRIPT 重载、连接池耗尽与 pubsub。
+
+运行: python -m pytest -q test_redis_client.py（需安装 fakeredis）
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from redis_client import (ConnectionPool, NoScriptError, PooledRedisClient, RedisClient,
+                          RedisConnectionError, ResponseError, Script)
+
+
+@pytest.fixture(scope='module')
+def server():
+    srv = fakeredis.TcpFakeServer(('127.0.0.1', 0), server_type='redis')
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv.server_address
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def client(server):
+    host, port = server
+    r = RedisClient(host=host, port=port, socket_timeout=5)
+    r.execute_command('FLUSHALL')
+    yield r
+    r.close()
+
+
+def test_pipeline_replies_in_order(client):
+    with client.pipeline() as pipe:
+        pipe.set('k', 'v')
+        pipe.sadd('s', 'a', 'b')
+        pipe.hset('h', mapping={'a': 1, 'b': 2})
+        pipe.get('k')
+        pipe.hgetall('h')
+        assert len(pipe) == 5
+        assert pipe.execute() == [True, 2, 2, 'v', {'a': '1', 'b': '2'}]
+    assert client.smembers('s') == {'a', 'b'}
+
+
+def test_pipeline_transaction(client):
+    pipe = client.pipeline(transaction=True)
+    pipe.set('t', 1)
+    pipe.expire('t', 60)
+    pipe.lpush('l', 'x', 'y')
+    assert pipe.execute() == [True, True, 2]
+    assert client.lrange('l', 0, -1) == ['y', 'x']
+
+
+def test_pipeline_error_reply(client):
+    client.set('s', 'str')
+    pipe = client.pipeline()
+    pipe.get('s')
+    pipe.lpush('s', 'x')
+    replies = pipe.execute(raise_on_error=False)
+    assert replies[0] == 'str'
+    assert isinstance(replies[1], ResponseError)
+
+
+class _ScriptCacheStub:
+    """只模拟脚本缓存的客户端：TcpFakeServer 回复错误后会断开连接，NOSCRIPT 重试无法在其上端到端验证"""
+
+    def __init__(self):
+        self.loaded = set()
+        self.calls = []
+
+    def evalsha(self, sha, numkeys, *keys_and_args):
+        self.calls.append('EVALSHA')
+        if sha not in self.loaded:
+            raise NoScriptError('NOSCRIPT No matching script. Please use EVAL.')
+        return list(keys_and_args)
+
+    def script_load(self, script):
+        self.calls.append('SCRIPT LOAD')
+        self.loaded.add(Script(self, script).sha)
+
+
+def test_script_reloads_on_noscript():
+    stub = _ScriptCacheStub()
+    script = Script(stub, 'return ARGV[1]')
+    assert script(keys=['k'], args=[1]) == ['k', 1]
+    assert stub.calls == ['EVALSHA', 'SCRIPT LOAD', 'EVALSHA']
+    assert script(keys=['k'], args=[2]) == ['k', 2]
+    assert stub.calls[3:] == ['EVALSHA']  # 已加载后直接 EVALSHA
+
+
+def test_register_script(client):
+    script = client.register_script("return redis.call('INCRBY', KEYS[1], ARGV[1])")
+    client.script_load(script.script)
+    assert script(keys=['c'], args=[5]) == 5
+    assert script(keys=['c'], args=[2]) == 7
+
+
+def test_pool_exhaustion(server):
+    host, port = server
+    pool = ConnectionPool(max_connections=2, timeout=0.2, host=host, port=port)
+    a, b = pool.get_connection(), pool.get_connection()
+    start = time.monotonic()
+    with pytest.raises(RedisConnectionError):
+        pool.get_connection()
+    assert time.monotonic() - start >= 0.2
+    pool.release(a)
+    assert pool.get_connection() is a  # LIFO：最近归还的连接最先取出
+    pool.release(a)
+    pool.release(b)
+    pool.disconnect()
+
+
+def test_pooled_client_shares_connections(server):
+    host, port = server
+    r = PooledRedisClient(max_connections=2, host=host, port=port)
+    errors = []
+
+    def worker(i):
+        try:
+            for j in range(50):
+                r.set(f'p:{i}', j)
+                assert r.get(f'p:{i}') == str(j)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert r.connection_pool._idle.qsize() <= 2
+    r.close()
+
+
+def test_pubsub(client, server):
+    host, port = server
+    pubsub = client.pubsub()
+    pubsub.subscribe('ch')
+    assert pubsub.get_message(timeout=2.0)['type'] == 'subscribe'
+    publisher = RedisClient(host=host, port=port)
+    publisher.publish('ch', 'hello')
+    message = pubsub.get_message(ignore_subscribe_messages=True, timeout=2.0)
+    assert message['channel'] == 'ch'
+    assert message['data'] == 'hello'
+    assert pubsub.get_message(ignore_subscribe_messages=True, timeout=0.1) is None
+    pubsub.close()
+    publisher.close()
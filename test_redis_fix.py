@@ -1,10 +1,10 @@
 #!/usr/bin/env python3
-"""测试修复后的Redis客户端"""
+"""测试 Redis 客户端（原 redis_client_fixed 的修复已合并进 redis_client）"""
 import sys
 import json
 sys.path.insert(0, 'scripts')
 
-from redis_client_fixed import RedisClient
+from redis_client import RedisClient
 
 print('测试修复版Redis客户端')
 print('=' * 50)
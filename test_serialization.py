@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+JSON 编解码（scripts/serialization.py）测试
+orjson 与标准库回退两条路径的输出必须逐字节一致：紧凑格式、非 ASCII 不转义、numpy 与 datetime。
+
+运行: python -m pytest -q test_serialization.py
+"""
+import datetime
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+
+import serialization
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _orjson_dumps(value):
+    if orjson is None:
+        pytest.skip('orjson not installed')
+    return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC)
+
+
+@pytest.fixture
+def fallback(monkeypatch):
+    """未安装 orjson 时的 serialization 模块"""
+    monkeypatch.setitem(sys.modules, 'orjson', None)  # import orjson 抛出 ImportError
+    module = importlib.reload(serialization)
+    yield module
+    monkeypatch.undo()
+    importlib.reload(serialization)
+
+
+VALUES = [
+    {'node_id': 'node-a', 'state': 'leader', 'last_seen': 1.5, 'tags': ['x', None, True]},
+    {'content': '中文内容', 'nested': {'a': [1, 2, {'b': 'é'}]}},
+    {'naive': datetime.datetime(2026, 1, 1, 12, 30, 5)},
+    {'aware': datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone(datetime.timedelta(hours=8)))},
+    {'date': datetime.date(2026, 1, 1), 'time': datetime.time(12, 30)},
+]
+
+
+@pytest.mark.parametrize('value', VALUES)
+def test_fallback_matches_orjson(fallback, value):
+    assert fallback.dumps(value) == _orjson_dumps(value)
+
+
+def test_fallback_numpy_matches_orjson(fallback):
+    np = pytest.importorskip('numpy')
+    value = {'score': np.float64(0.25), 'count': np.int64(3), 'row': np.arange(3)}
+    assert fallback.dumps(value) == _orjson_dumps(value)
+
+
+def test_fallback_rejects_unknown_types(fallback):
+    with pytest.raises(TypeError):
+        fallback.dumps({'x': object()})
+
+
+@pytest.mark.parametrize('value', VALUES[:2])
+def test_round_trip_accepts_str_and_bytes(value):
+    data = serialization.dumps(value)
+    assert isinstance(data, bytes)
+    assert serialization.loads(data) == value
+    assert serialization.loads(data.decode()) == value
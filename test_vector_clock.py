@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+VectorClock tests (clawster/schemas/vector_clock.py): single-pass compare
+against the element-wise definition, and merge without aliasing.
+
+Run: python -m pytest -q test_vector_clock.py
+"""
+import itertools
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from clawster.schemas.vector_clock import VectorClock
+
+
+def _reference_compare(a, b):
+    """Element-wise definition; missing entries count as 0."""
+    keys = set(a) | set(b)
+    le = all(a.get(k, 0) <= b.get(k, 0) for k in keys)
+    ge = all(a.get(k, 0) >= b.get(k, 0) for k in keys)
+    if le and ge:
+        return 'equal'
+    if le:
+        return 'before'
+    if ge:
+        return 'after'
+    return 'concurrent'
+
+
+@pytest.mark.parametrize('a, b, expected', [
+    ({'n1': 1}, {'n1': 1}, 'equal'),
+    ({'n1': 1}, {'n1': 1, 'n2': 0}, 'equal'),
+    ({'n1': 1}, {'n1': 2}, 'before'),
+    ({'n1': 1}, {'n1': 1, 'n2': 1}, 'before'),
+    ({'n1': 2, 'n2': 1}, {'n1': 1}, 'after'),
+    ({'n1': 2}, {'n1': 1, 'n2': 1}, 'concurrent'),
+    ({'n1': 1, 'n2': 0}, {'n1': 0, 'n2': 1}, 'concurrent'),
+])
+def test_compare_cases(a, b, expected):
+    assert VectorClock('n1', dict(a)).compare(VectorClock('n2', dict(b))) == expected
+
+
+def test_compare_matches_definition():
+    rng = random.Random(0)
+    nodes = ['n1', 'n2', 'n3', 'n4']
+    for _ in range(2000):
+        a = {n: rng.randrange(3) for n in rng.sample(nodes, rng.randrange(1, 5))}
+        b = {n: rng.randrange(3) for n in rng.sample(nodes, rng.randrange(1, 5))}
+        assert VectorClock('n1', a).compare(VectorClock('n2', b)) == _reference_compare(a, b)
+
+
+def test_compare_is_antisymmetric():
+    opposite = {'before': 'after', 'after': 'before', 'equal': 'equal', 'concurrent': 'concurrent'}
+    clocks = [{'n1': x, 'n2': y} for x, y in itertools.product(range(3), repeat=2)]
+    for a, b in itertools.product(clocks, repeat=2):
+        assert VectorClock('n1', a).compare(VectorClock('n2', b)) == \
+            opposite[VectorClock('n2', b).compare(VectorClock('n1', a))]
+
+
+def test_merge_takes_max_and_copies():
+    a = VectorClock('n1', {'n1': 3, 'n2': 1})
+    b = VectorClock('n2', {'n2': 4, 'n3': 2})
+    merged = a.merge(b)
+    assert merged.clock == {'n1': 3, 'n2': 4, 'n3': 2}
+    merged.increment()
+    assert a.clock == {'n1': 3, 'n2': 1}  # the inputs are not mutated
+    assert merged.compare(a) == 'after' and merged.compare(b) == 'after'
+
+
+def test_round_trip_copies():
+    data = {'n1': 2, 'n2': 5}
+    clock = VectorClock.from_dict('n1', data)
+    clock.increment()
+    assert data == {'n1': 2, 'n2': 5}
+    assert clock.to_dict() == {'n1': 3, 'n2': 5}